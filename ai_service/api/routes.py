@@ -14,14 +14,19 @@ class ProductInput(BaseModel):
     title: str
     description: Optional[str] = ""
     image_url: Optional[str] = None
+    image_etag: Optional[str] = None
     category: str
     tags: List[str] = Field(default_factory=list)
+    colors: Optional[List[List[int]]] = None  # RGB palette; extracted if omitted
 
 
 class IndexRequest(BaseModel):
     """Request to index products."""
+    shop: str = Field(..., min_length=1)
     products: List[ProductInput]
     batch_size: int = Field(default=32, ge=1, le=256)
+    force: bool = False  # Re-embed even if content is unchanged
+    full_sync: bool = False  # Products not listed are removed
 
 
 class IndexResponse(BaseModel):
@@ -30,6 +35,8 @@ class IndexResponse(BaseModel):
     successful: int
     failed: int
     index_size: int
+    skipped: int = 0
+    removed: int = 0
     failed_products: Optional[List[Dict]] = None
 
 
@@ -59,19 +66,33 @@ class OutfitResponse(BaseModel):
     outfit_items: List[Dict]
 
 
-def create_router(embedder, vector_index, recommender):
+def create_router(embedder, index_manager, recommender_options=None):
     """
     Create FastAPI router with all endpoints.
     
     Args:
         embedder: CLIPEmbedder instance
-        vector_index: ProductVectorIndex instance
-        recommender: Recommender instance
+        index_manager: ShopIndexManager holding one index per shop
+        recommender_options: Keyword arguments for per-shop Recommender
         
     Returns:
         APIRouter with all routes
     """
     router = APIRouter(prefix="/api/v1", tags=["recommendations"])
+    recommender_options = recommender_options or {}
+    
+    def get_shop_index(shop: str, create: bool = False):
+        """Resolve a shop's index, rejecting malformed shop domains."""
+        try:
+            return index_manager.get(shop, create=create)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    def get_recommender(vector_index):
+        """Build a recommender bound to one shop's index."""
+        from ..recommendation import Recommender
+        
+        return Recommender(vector_index, **recommender_options)
     
     @router.post(
         "/index-catalog",
@@ -95,7 +116,10 @@ def create_router(embedder, vector_index, recommender):
             # Convert to dict format
             products = [p.model_dump() for p in request.products]
             
-            logger.info(f"Starting indexing of {len(products)} products")
+            logger.info(
+                f"Starting indexing of {len(products)} products for {request.shop}"
+            )
+            vector_index = get_shop_index(request.shop, create=True)
             
             # Run indexing in background
             from ..indexing import CatalogIndexer
@@ -104,8 +128,11 @@ def create_router(embedder, vector_index, recommender):
             stats = indexer.batch_index(
                 products,
                 skip_image_errors=True,
-                batch_size=request.batch_size
+                batch_size=request.batch_size,
+                force=request.force,
+                prune=request.full_sync
             )
+            index_manager.save(request.shop, vector_index)
             
             logger.info(f"Indexing complete: {stats['successful']}/{stats['total']}")
             
@@ -114,13 +141,34 @@ def create_router(embedder, vector_index, recommender):
                 successful=stats["successful"],
                 failed=stats["failed"],
                 index_size=stats["index_size"],
+                skipped=stats["skipped"],
+                removed=stats["removed"],
                 failed_products=stats.get("failed_products")[:10]  # Limit output
             )
         
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Indexing error: {e}")
             raise HTTPException(status_code=500, detail=str(e))
     
+    @router.delete(
+        "/products/{product_id}",
+        summary="Remove a product",
+        description="Remove a deleted product from the shop's index"
+    )
+    async def remove_product(
+        product_id: int,
+        shop: str = Query(..., min_length=1)
+    ):
+        """Remove a product, e.g. from a products/delete webhook."""
+        vector_index = get_shop_index(shop)
+        if not vector_index.remove(product_id):
+            raise HTTPException(status_code=404, detail="Product not found")
+        
+        index_manager.save(shop, vector_index)
+        return {"product_id": product_id, "index_size": vector_index.get_size()}
+    
     @router.get(
         "/recommend/similar",
         response_model=RecommendationsListResponse,
@@ -128,12 +176,14 @@ def create_router(embedder, vector_index, recommender):
         description="Returns products with similar embeddings"
     )
     async def recommend_similar(
+        shop: str = Query(..., min_length=1),
         product_id: int = Query(..., gt=0),
         top_k: int = Query(10, ge=1, le=50),
         exclude_category: bool = Query(False)
     ):
         """Find visually similar products."""
         try:
+            vector_index = get_shop_index(shop)
             if vector_index.get_size() == 0:
                 raise HTTPException(
                     status_code=400,
@@ -146,6 +196,7 @@ def create_router(embedder, vector_index, recommender):
                 raise HTTPException(status_code=404, detail="Product not found")
             
             # Get similar products via recommender
+            recommender = get_recommender(vector_index)
             recommendations = recommender.recommend_similar_products(
                 product_id,
                 top_k=top_k,
@@ -179,11 +230,13 @@ def create_router(embedder, vector_index, recommender):
         description="Returns compatible items in different categories"
     )
     async def recommend_style(
+        shop: str = Query(..., min_length=1),
         product_id: int = Query(..., gt=0),
         top_k: int = Query(5, ge=1, le=30)
     ):
         """Find style-complementary products."""
         try:
+            vector_index = get_shop_index(shop)
             if vector_index.get_size() == 0:
                 raise HTTPException(
                     status_code=400,
@@ -194,6 +247,7 @@ def create_router(embedder, vector_index, recommender):
             if not metadata:
                 raise HTTPException(status_code=404, detail="Product not found")
             
+            recommender = get_recommender(vector_index)
             recommendations = recommender.recommend_style_matches(
                 product_id,
                 top_k=top_k
@@ -226,11 +280,13 @@ def create_router(embedder, vector_index, recommender):
         description="Suggests complementary items to complete an outfit"
     )
     async def recommend_outfit(
+        shop: str = Query(..., min_length=1),
         product_id: int = Query(..., gt=0),
         max_items: int = Query(4, ge=2, le=8)
     ):
         """Get outfit completion recommendations."""
         try:
+            vector_index = get_shop_index(shop)
             if vector_index.get_size() == 0:
                 raise HTTPException(
                     status_code=400,
@@ -241,6 +297,7 @@ def create_router(embedder, vector_index, recommender):
             if not metadata:
                 raise HTTPException(status_code=404, detail="Product not found")
             
+            recommender = get_recommender(vector_index)
             outfit = recommender.recommend_complete_outfit(
                 product_id,
                 max_items=max_items
@@ -266,9 +323,12 @@ def create_router(embedder, vector_index, recommender):
         """Health check endpoint."""
         return {
             "status": "healthy",
-            "indexed_products": vector_index.get_size(),
             "model": embedder.model_name,
-            "device": embedder.device
+            "device": embedder.device,
+            "index_cache": index_manager.get_stats(),
+            "embedding_cache": (
+                embedder.cache.get_stats() if embedder.cache else None
+            )
         }
     
     return router
@@ -0,0 +1,198 @@
+"""
+Benchmark approximate index types against the exact flat baseline.
+
+Reports recall@k (overlap with IndexFlatL2 results), queries per second,
+build time and serialized index size for each index type / search setting.
+
+Usage:
+    python -m ai_service.benchmark_index --num-vectors 200000 --k 10
+    python -m ai_service.benchmark_index --vectors embeddings.npy --nprobe 8 32
+"""
+
+import argparse
+import logging
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from ai_service.vector_db import ProductVectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+def make_synthetic_embeddings(
+    num_vectors: int,
+    dim: int,
+    num_clusters: int = 256,
+    seed: int = 42
+) -> np.ndarray:
+    """
+    Generate normalized, clustered vectors resembling CLIP catalog embeddings.
+
+    Args:
+        num_vectors: Number of vectors
+        dim: Vector dimension
+        num_clusters: Number of style clusters
+        seed: Random seed
+
+    Returns:
+        (num_vectors, dim) float32 array with unit-norm rows
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dim)).astype(np.float32)
+    assignments = rng.integers(0, num_clusters, num_vectors)
+    vectors = centers[assignments] + 0.5 * rng.standard_normal(
+        (num_vectors, dim)
+    ).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(truth: np.ndarray, found: List[List[int]], k: int) -> float:
+    """Mean fraction of the true top-k neighbours present in the results."""
+    hits = sum(
+        len(set(truth_row[:k]) & set(found_row[:k]))
+        for truth_row, found_row in zip(truth, found)
+    )
+    return hits / (len(truth) * k)
+
+
+def run_queries(index: ProductVectorIndex, queries: np.ndarray, k: int):
+    """Run single-vector queries the way the recommender does."""
+    start = time.perf_counter()
+    results = [index.search(query, k)[0] for query in queries]
+    elapsed = time.perf_counter() - start
+    return results, len(queries) / elapsed
+
+
+def benchmark(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    index_types: List[str],
+    nprobes: List[int],
+    ef_searches: List[int],
+    nlist: int,
+    pq_m: int,
+    hnsw_m: int
+) -> List[Dict]:
+    """
+    Build each index type over ``vectors`` and sweep its search parameter.
+
+    Returns:
+        One result dict per (index type, search setting)
+    """
+    dim = vectors.shape[1]
+    products = [(i, vectors[i], None) for i in range(len(vectors))]
+
+    # Ground truth from exact search
+    flat = faiss.IndexFlatL2(dim)
+    flat.add(vectors)
+    _, truth = flat.search(queries, k)
+
+    results = []
+    for index_type in index_types:
+        index = ProductVectorIndex(
+            embedding_dim=dim,
+            index_type=index_type,
+            nlist=nlist,
+            pq_m=pq_m,
+            hnsw_m=hnsw_m,
+            min_train_size=1
+        )
+        start = time.perf_counter()
+        index.batch_add(products)
+        build_seconds = time.perf_counter() - start
+        memory_mb = faiss.serialize_index(index.index).nbytes / 1e6
+
+        if index_type.startswith("ivf"):
+            settings = [{"nprobe": n} for n in nprobes]
+        elif index_type == "hnsw":
+            settings = [{"ef_search": ef} for ef in ef_searches]
+        else:
+            settings = [{}]
+
+        for params in settings:
+            index.set_search_params(**params)
+            found, qps = run_queries(index, queries, k)
+            results.append({
+                "index_type": index_type,
+                "params": params,
+                "recall": recall_at_k(truth, found, k),
+                "qps": qps,
+                "build_seconds": build_seconds,
+                "memory_mb": memory_mb,
+            })
+
+    return results
+
+
+def print_report(results: List[Dict], k: int) -> None:
+    """Print a results table."""
+    header = (
+        f"{'index':<10} {'params':<16} {f'recall@{k}':>10} "
+        f"{'QPS':>10} {'build (s)':>10} {'memory (MB)':>12}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        params = ",".join(f"{key}={value}" for key, value in row["params"].items())
+        print(
+            f"{row['index_type']:<10} {params or '-':<16} "
+            f"{row['recall']:>10.3f} {row['qps']:>10.0f} "
+            f"{row['build_seconds']:>10.2f} {row['memory_mb']:>12.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", help="Optional .npy file of real embeddings")
+    parser.add_argument("--num-vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--num-queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--index-types",
+        nargs="+",
+        default=["flat", "ivf_flat", "ivf_pq", "hnsw"]
+    )
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    args = parser.parse_args(argv)
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        vectors = make_synthetic_embeddings(args.num_vectors, args.dim)
+
+    # Queries are catalog products, as in product-to-product recommendations
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(vectors), size=args.num_queries, replace=False)
+    queries = vectors[query_rows]
+
+    print(
+        f"Benchmarking {len(vectors)} vectors (dim={vectors.shape[1]}), "
+        f"{len(queries)} queries, k={args.k}\n"
+    )
+    results = benchmark(
+        vectors,
+        queries,
+        args.k,
+        args.index_types,
+        args.nprobe,
+        args.ef_search,
+        args.nlist,
+        args.pq_m,
+        args.hnsw_m
+    )
+    print_report(results, args.k)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark index startup with the columnar metadata store vs the JSON sidecar.
+
+Saves one synthetic catalog in both formats, then reports the time and
+peak Python allocations of ProductVectorIndex.load, and the latency of
+looking up metadata after load.
+
+Usage:
+    python -m ai_service.benchmark_metadata --num-products 200000
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ai_service.vector_db import ProductVectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+def make_catalog(num_products: int, dim: int, seed: int = 42) -> ProductVectorIndex:
+    """Build an index with metadata shaped like CatalogIndexer's."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((num_products, dim)).astype(np.float32)
+    categories = ["shirts", "pants", "shoes", "jackets", "accessories"]
+    products = [
+        (
+            7000000000 + i,
+            vectors[i],
+            {
+                "title": f"Product {i}",
+                "description": "Premium cotton, relaxed fit. " * 4,
+                "category": categories[i % len(categories)],
+                "tags": ["casual", "summer", f"collection-{i % 50}"],
+                "image_url": f"https://cdn.shopify.com/s/files/products/{i}.jpg",
+                "embedding_sources": {"image": True, "text": True},
+                "content_hash": f"{i:064x}",
+            },
+        )
+        for i in range(num_products)
+    ]
+    index = ProductVectorIndex(embedding_dim=dim)
+    index.batch_add(products)
+    return index
+
+
+def write_legacy_json(index: ProductVectorIndex, metadata_path: str) -> None:
+    """Write metadata the way save() did before the columnar store."""
+    with open(metadata_path, "w") as f:
+        json.dump({
+            "product_ids": index.product_ids.tolist(),
+            "deleted_rows": [],
+            "metadata": {str(k): v for k, v in index.metadata.items()},
+        }, f, indent=2)
+
+
+def measure_load(
+    index_path: str,
+    metadata_path: str,
+    dim: int,
+    lookup_ids: List[int],
+    mmap: bool
+) -> Dict:
+    """Load an index and time a round of metadata lookups."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = ProductVectorIndex(embedding_dim=dim)
+    index.load(index_path, metadata_path, mmap=mmap)
+    load_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for product_id in lookup_ids:
+        index.get_metadata(product_id)
+    lookup_us = (time.perf_counter() - start) / len(lookup_ids) * 1e6
+
+    return {
+        "load_seconds": load_seconds,
+        "peak_mb": peak / 1e6,
+        "lookup_us": lookup_us,
+        "file_mb": sum(
+            os.path.getsize(os.path.join(os.path.dirname(metadata_path), name))
+            for name in os.listdir(os.path.dirname(metadata_path))
+            if name.startswith(os.path.basename(metadata_path))
+        ) / 1e6,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-products", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=16)
+    parser.add_argument("--num-lookups", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    index = make_catalog(args.num_products, args.dim)
+    rng = np.random.default_rng(0)
+    lookup_ids = rng.choice(index.product_ids, size=args.num_lookups).tolist()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir = os.path.join(tmp, "json")
+        store_dir = os.path.join(tmp, "store")
+        for directory in (json_dir, store_dir):
+            index.save(
+                os.path.join(directory, "faiss.index"),
+                os.path.join(directory, "metadata.json")
+            )
+        write_legacy_json(index, os.path.join(json_dir, "metadata.json"))
+        del index
+
+        rows = [
+            ("json", json_dir, False),
+            ("columnar", store_dir, False),
+            ("columnar+mmap", store_dir, True),
+        ]
+        print(
+            f"Loading {args.num_products} products "
+            f"({args.num_lookups} metadata lookups after load)\n"
+        )
+        header = (
+            f"{'format':<14} {'load (s)':>10} {'peak (MB)':>10} "
+            f"{'lookup (us)':>12} {'on disk (MB)':>13}"
+        )
+        print(header)
+        print("-" * len(header))
+        for name, directory, mmap in rows:
+            result = measure_load(
+                os.path.join(directory, "faiss.index"),
+                os.path.join(directory, "metadata.json"),
+                args.dim,
+                lookup_ids,
+                mmap
+            )
+            print(
+                f"{name:<14} {result['load_seconds']:>10.3f} "
+                f"{result['peak_mb']:>10.1f} {result['lookup_us']:>12.1f} "
+                f"{result['file_mb']:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
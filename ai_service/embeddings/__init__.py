@@ -1,5 +1,6 @@
 """Embeddings module for generating product embeddings."""
 
 from .clip_embedder import CLIPEmbedder
+from .embedding_cache import EmbeddingCache, content_hash
 
-__all__ = ["CLIPEmbedder"]
+__all__ = ["CLIPEmbedder", "EmbeddingCache", "content_hash"]
@@ -1,12 +1,14 @@
 """CLIP-based multimodal embedder for product images and text."""
 
 import logging
-from typing import Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import numpy as np
 import torch
 from PIL import Image
 from transformers import CLIPModel, CLIPProcessor
 
+from .embedding_cache import EmbeddingCache, content_hash
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +20,10 @@ class CLIPEmbedder:
     - Product images
     - Product titles and descriptions
     - Combined multimodal embeddings
+    
+    With an EmbeddingCache, image and text embeddings are looked up by
+    content hash before running the model, so unchanged inputs are never
+    embedded twice (across reindexes, shops and restarts).
     """
 
     def __init__(
@@ -25,6 +31,8 @@ class CLIPEmbedder:
         model_name: str = "openai/clip-vit-base-patch32",
         device: Optional[str] = None,
         embedding_dim: int = 512,
+        batch_size: int = 32,
+        cache: Optional[EmbeddingCache] = None,
     ):
         """
         Initialize the CLIP embedder.
@@ -33,10 +41,14 @@ class CLIPEmbedder:
             model_name: HuggingFace model identifier
             device: Device to use ('cuda', 'cpu'). Auto-detects if None
             embedding_dim: Expected dimension of embeddings (for validation)
+            batch_size: Default number of items per forward pass
+            cache: Optional embedding cache consulted before the model
         """
         self.model_name = model_name
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.embedding_dim = embedding_dim
+        self.batch_size = batch_size
+        self.cache = cache
         
         logger.info(f"Loading CLIP model '{model_name}' on {self.device}")
         try:
@@ -48,26 +60,89 @@ class CLIPEmbedder:
             logger.error(f"Failed to load CLIP model: {e}")
             raise
     
-    def embed_image(self, image: Image.Image) -> np.ndarray:
+    @staticmethod
+    def _normalize(features: "torch.Tensor") -> np.ndarray:
+        """Move a feature batch to CPU and L2-normalize each row."""
+        embeddings = features.cpu().numpy().astype(np.float32)
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    
+    @staticmethod
+    def _image_key(image: Image.Image) -> str:
+        """Content hash of an image's decoded pixels."""
+        header = f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("ascii")
+        return content_hash(header + image.tobytes())
+    
+    def _cached(
+        self,
+        modality: str,
+        items: List,
+        keys: List[str],
+        encode: Callable[[List], np.ndarray]
+    ) -> np.ndarray:
         """
-        Generate embedding for a product image.
+        Serve embeddings from the cache, encoding and storing only misses.
+        
+        Identical items within one call are encoded once.
+        """
+        vectors = self.cache.get_many(self.model_name, modality, keys)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            first_by_key: Dict[str, int] = {}
+            for i in missing:
+                first_by_key.setdefault(keys[i], i)
+            fresh = encode([items[i] for i in first_by_key.values()])
+            self.cache.put_many(self.model_name, modality, list(first_by_key), fresh)
+            fresh_by_key = dict(zip(first_by_key, fresh))
+            for i in missing:
+                vectors[i] = fresh_by_key[keys[i]]
+        
+        if not vectors:
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+        return np.vstack(vectors)
+    
+    def embed_images(
+        self,
+        images: List[Image.Image],
+        batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Generate embeddings for many images, batch_size per forward pass.
+        
+        Cached images (by pixel content) skip the model.
         
         Args:
-            image: PIL Image object
+            images: PIL Image objects
+            batch_size: Items per forward pass (defaults to self.batch_size)
             
         Returns:
-            Normalized embedding vector (float32)
+            (len(images), embedding_dim) array of normalized embeddings
             
         Raises:
-            ValueError: If image is invalid or processing fails
+            ValueError: If an image is invalid or processing fails
         """
+        batch_size = batch_size or self.batch_size
         try:
-            if not isinstance(image, Image.Image):
-                raise ValueError(f"Expected PIL Image, got {type(image)}")
+            for image in images:
+                if not isinstance(image, Image.Image):
+                    raise ValueError(f"Expected PIL Image, got {type(image)}")
             
-            # Preprocess image
+            if self.cache is not None:
+                keys = [self._image_key(image) for image in images]
+                return self._cached(
+                    "image", images, keys,
+                    lambda batch: self._encode_images(batch, batch_size)
+                )
+            return self._encode_images(images, batch_size)
+        except Exception as e:
+            logger.error(f"Failed to embed images: {e}")
+            raise ValueError(f"Image embedding failed: {e}")
+    
+    def _encode_images(self, images: List[Image.Image], batch_size: int) -> np.ndarray:
+        """Run the image tower over ``images``, batch_size at a time."""
+        batches = []
+        for i in range(0, len(images), batch_size):
             inputs = self.processor(
-                images=image, 
+                images=images[i:i + batch_size],
                 return_tensors="pt",
                 padding=True
             ).to(self.device)
@@ -75,35 +150,55 @@ class CLIPEmbedder:
             with torch.no_grad():
                 image_features = self.model.get_image_features(**inputs)
             
-            # Normalize embedding
-            embedding = image_features[0].cpu().numpy().astype(np.float32)
-            embedding = embedding / np.linalg.norm(embedding)
-            
-            return embedding
-        except Exception as e:
-            logger.error(f"Failed to embed image: {e}")
-            raise ValueError(f"Image embedding failed: {e}")
+            batches.append(self._normalize(image_features))
+        
+        if not batches:
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+        return np.vstack(batches)
     
-    def embed_text(self, text: str) -> np.ndarray:
+    def embed_texts(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None
+    ) -> np.ndarray:
         """
-        Generate embedding for text (title or description).
+        Generate embeddings for many texts, batch_size per forward pass.
+        
+        Cached texts skip the model.
         
         Args:
-            text: Text to embed
+            texts: Non-empty strings (titles or descriptions)
+            batch_size: Items per forward pass (defaults to self.batch_size)
             
         Returns:
-            Normalized embedding vector (float32)
+            (len(texts), embedding_dim) array of normalized embeddings
             
         Raises:
-            ValueError: If text is invalid or processing fails
+            ValueError: If a text is invalid or processing fails
         """
+        batch_size = batch_size or self.batch_size
         try:
-            if not text or not isinstance(text, str):
-                raise ValueError(f"Expected non-empty string, got {text}")
+            for text in texts:
+                if not text or not isinstance(text, str):
+                    raise ValueError(f"Expected non-empty string, got {text}")
             
-            # Preprocess text
+            if self.cache is not None:
+                keys = [content_hash(text) for text in texts]
+                return self._cached(
+                    "text", texts, keys,
+                    lambda batch: self._encode_texts(batch, batch_size)
+                )
+            return self._encode_texts(texts, batch_size)
+        except Exception as e:
+            logger.error(f"Failed to embed texts: {e}")
+            raise ValueError(f"Text embedding failed: {e}")
+    
+    def _encode_texts(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Run the text tower over ``texts``, batch_size at a time."""
+        batches = []
+        for i in range(0, len(texts), batch_size):
             inputs = self.processor(
-                text=text,
+                text=texts[i:i + batch_size],
                 return_tensors="pt",
                 padding=True,
                 truncation=True,
@@ -113,14 +208,136 @@ class CLIPEmbedder:
             with torch.no_grad():
                 text_features = self.model.get_text_features(**inputs)
             
-            # Normalize embedding
-            embedding = text_features[0].cpu().numpy().astype(np.float32)
-            embedding = embedding / np.linalg.norm(embedding)
+            batches.append(self._normalize(text_features))
+        
+        if not batches:
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+        return np.vstack(batches)
+    
+    def embed_image(self, image: Image.Image) -> np.ndarray:
+        """
+        Generate embedding for a product image.
+        
+        Args:
+            image: PIL Image object
+            
+        Returns:
+            Normalized embedding vector (float32)
             
-            return embedding
-        except Exception as e:
-            logger.error(f"Failed to embed text: {e}")
-            raise ValueError(f"Text embedding failed: {e}")
+        Raises:
+            ValueError: If image is invalid or processing fails
+        """
+        return self.embed_images([image])[0]
+    
+    def embed_text(self, text: str) -> np.ndarray:
+        """
+        Generate embedding for text (title or description).
+        
+        Args:
+            text: Text to embed
+            
+        Returns:
+            Normalized embedding vector (float32)
+            
+        Raises:
+            ValueError: If text is invalid or processing fails
+        """
+        return self.embed_texts([text])[0]
+    
+    def _embed_many(self, embed_batch, items: List) -> List[Optional[np.ndarray]]:
+        """
+        Embed items in batches, isolating failures to the items that cause them.
+        
+        If a batched pass fails, items are retried one by one so a single bad
+        image or text doesn't drop the rest of the batch.
+        """
+        if not items:
+            return []
+        try:
+            return list(embed_batch(items))
+        except ValueError:
+            results = []
+            for item in items:
+                try:
+                    results.append(embed_batch([item])[0])
+                except ValueError:
+                    results.append(None)
+            return results
+    
+    def embed_products(
+        self,
+        products: List[Dict],
+        image_weight: float = 0.6,
+        title_weight: float = 0.2,
+        description_weight: float = 0.2,
+    ) -> List[Tuple[Optional[np.ndarray], dict]]:
+        """
+        Generate combined multimodal embeddings for many products.
+        
+        All images go through one batched image pass and all titles and
+        descriptions through one batched text pass, instead of up to three
+        forward passes per product.
+        
+        Args:
+            products: Dicts with optional 'image', 'title' and 'description'
+            image_weight: Weight for image embedding
+            title_weight: Weight for title embedding
+            description_weight: Weight for description embedding
+            
+        Returns:
+            One (combined_embedding, embedding_sources) tuple per product.
+            combined_embedding is None if no modality could be embedded.
+        """
+        images, image_owners = [], []
+        texts, text_owners = [], []
+        
+        for i, product in enumerate(products):
+            if product.get("image") is not None:
+                images.append(product["image"])
+                image_owners.append(i)
+            for field in ("title", "description"):
+                text = product.get(field)
+                if text and isinstance(text, str):
+                    texts.append(text)
+                    text_owners.append((i, field))
+        
+        weights = {
+            "image": image_weight,
+            "title": title_weight,
+            "description": description_weight,
+        }
+        parts: List[Dict[str, np.ndarray]] = [{} for _ in products]
+        
+        for owner, embedding in zip(
+            image_owners, self._embed_many(self.embed_images, images)
+        ):
+            if embedding is not None:
+                parts[owner]["image"] = embedding
+        
+        for (owner, field), embedding in zip(
+            text_owners, self._embed_many(self.embed_texts, texts)
+        ):
+            if embedding is not None:
+                parts[owner][field] = embedding
+        
+        results = []
+        for product_parts in parts:
+            sources = {source: source in product_parts for source in weights}
+            if not product_parts:
+                results.append((None, sources))
+                continue
+            
+            # Normalize weights over the modalities that succeeded
+            total_weight = sum(weights[source] for source in product_parts)
+            combined = np.zeros(self.embedding_dim, dtype=np.float32)
+            for source, embedding in product_parts.items():
+                combined += embedding * (weights[source] / total_weight)
+            
+            # Final normalization
+            combined = combined / np.linalg.norm(combined)
+            results.append((combined, sources))
+        
+        return results
     
     def embed_product(
         self,
@@ -154,57 +371,14 @@ class CLIPEmbedder:
         if not any([image, title, description]):
             raise ValueError("At least one of image, title, or description must be provided")
         
-        embeddings = []
-        weights = []
-        sources = {
-            "image": False,
-            "title": False,
-            "description": False
-        }
+        combined, sources = self.embed_products(
+            [{"image": image, "title": title, "description": description}],
+            image_weight=image_weight,
+            title_weight=title_weight,
+            description_weight=description_weight,
+        )[0]
         
-        # Embed image if provided
-        if image is not None:
-            try:
-                image_emb = self.embed_image(image)
-                embeddings.append(image_emb)
-                weights.append(image_weight)
-                sources["image"] = True
-            except Exception as e:
-                logger.warning(f"Image embedding failed: {e}, continuing with text")
-        
-        # Embed title if provided
-        if title is not None:
-            try:
-                title_emb = self.embed_text(title)
-                embeddings.append(title_emb)
-                weights.append(title_weight)
-                sources["title"] = True
-            except Exception as e:
-                logger.warning(f"Title embedding failed: {e}, continuing")
-        
-        # Embed description if provided
-        if description is not None:
-            try:
-                desc_emb = self.embed_text(description)
-                embeddings.append(desc_emb)
-                weights.append(description_weight)
-                sources["description"] = True
-            except Exception as e:
-                logger.warning(f"Description embedding failed: {e}, continuing")
-        
-        if not embeddings:
+        if combined is None:
             raise ValueError("Failed to generate any embeddings")
         
-        # Normalize weights
-        total_weight = sum(weights)
-        weights = [w / total_weight for w in weights]
-        
-        # Combine embeddings
-        combined = np.zeros(embeddings[0].shape, dtype=np.float32)
-        for emb, weight in zip(embeddings, weights):
-            combined += emb * weight
-        
-        # Final normalization
-        combined = combined / np.linalg.norm(combined)
-        
         return combined, sources
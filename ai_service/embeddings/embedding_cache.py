@@ -0,0 +1,202 @@
+"""Content-addressed cache for CLIP embeddings."""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def content_hash(data: Union[bytes, str]) -> str:
+    """
+    Hash embedding input (raw image bytes, decoded pixels or text).
+
+    Args:
+        data: Bytes or text
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Embedding cache keyed by (model name, modality, content hash).
+
+    An in-process LRU of recently used vectors sits in front of a SQLite
+    file, so embeddings survive restarts and are shared between worker
+    processes and reindexes. Without a path the cache is memory-only.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_items: int = 50000):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file for the persistent store (None for memory-only)
+            max_memory_items: Vectors kept in the in-process LRU
+        """
+        self.path = path
+        self.max_memory_items = max_memory_items
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            # WAL lets several service workers read while one writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+        logger.info(
+            f"Initialized EmbeddingCache ({path or 'memory only'}, "
+            f"{max_memory_items} items in memory)"
+        )
+
+    @staticmethod
+    def _key(model_name: str, modality: str, digest: str) -> str:
+        return f"{model_name}:{modality}:{digest}"
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Insert into the LRU front, evicting the oldest entries."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(
+        self,
+        model_name: str,
+        modality: str,
+        digests: Sequence[str]
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings, memory first and then disk.
+
+        Args:
+            model_name: Model that produced the embeddings
+            modality: "image" or "text"
+            digests: Content hashes
+
+        Returns:
+            One vector (or None on a miss) per digest
+        """
+        keys = [self._key(model_name, modality, digest) for digest in digests]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+
+        with self._lock:
+            missing: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing and self._db is not None:
+                pending = list(missing)
+                for start in range(0, len(pending), _SQL_BATCH):
+                    chunk = pending[start:start + _SQL_BATCH]
+                    rows = self._db.execute(
+                        "SELECT key, vector FROM embeddings WHERE key IN "
+                        f"({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(key, vector)
+                        for i in missing.pop(key):
+                            results[i] = vector
+                            self.disk_hits += 1
+
+            self.misses += sum(len(positions) for positions in missing.values())
+
+        return results
+
+    def put_many(
+        self,
+        model_name: str,
+        modality: str,
+        digests: Sequence[str],
+        vectors: Sequence[np.ndarray]
+    ) -> None:
+        """
+        Store embeddings in memory and on disk.
+
+        Args:
+            model_name: Model that produced the embeddings
+            modality: "image" or "text"
+            digests: Content hashes
+            vectors: One embedding per digest
+        """
+        entries = [
+            (self._key(model_name, modality, digest),
+             np.ascontiguousarray(vector, dtype=np.float32))
+            for digest, vector in zip(digests, vectors)
+        ]
+        if not entries:
+            return
+
+        with self._lock:
+            for key, vector in entries:
+                vector.flags.writeable = False
+                self._remember(key, vector)
+            if self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) "
+                        "VALUES (?, ?)",
+                        [(key, vector.tobytes()) for key, vector in entries]
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # A failed write only costs a future re-embed
+                    logger.warning(f"Failed to persist embeddings: {e}")
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters for health and metrics endpoints."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "persistent": self._db is not None,
+            }
+
+    def close(self) -> None:
+        """Close the persistent store."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -17,15 +17,17 @@ import numpy as np
 
 # Configuration
 BASE_URL = "http://localhost:8000/api/v1"
+SHOP = "example-store.myshopify.com"
 REQUEST_TIMEOUT = 30
 
 
 class RecommendationEngineClient:
     """Client for interacting with recommendation engine API."""
     
-    def __init__(self, base_url: str = BASE_URL):
-        """Initialize client."""
+    def __init__(self, base_url: str = BASE_URL, shop: str = SHOP):
+        """Initialize client for one shop's catalog."""
         self.base_url = base_url
+        self.shop = shop
         self.session = requests.Session()
     
     def health_check(self) -> Dict:
@@ -47,6 +49,7 @@ class RecommendationEngineClient:
             response = self.session.post(
                 f"{self.base_url}/index-catalog",
                 json={
+                    "shop": self.shop,
                     "products": products,
                     "batch_size": batch_size
                 },
@@ -69,6 +72,7 @@ class RecommendationEngineClient:
             response = self.session.get(
                 f"{self.base_url}/recommend/similar",
                 params={
+                    "shop": self.shop,
                     "product_id": product_id,
                     "top_k": top_k,
                     "exclude_category": exclude_category
@@ -91,6 +95,7 @@ class RecommendationEngineClient:
             response = self.session.get(
                 f"{self.base_url}/recommend/style",
                 params={
+                    "shop": self.shop,
                     "product_id": product_id,
                     "top_k": top_k
                 },
@@ -112,6 +117,7 @@ class RecommendationEngineClient:
             response = self.session.get(
                 f"{self.base_url}/recommend/outfit",
                 params={
+                    "shop": self.shop,
                     "product_id": product_id,
                     "max_items": max_items
                 },
@@ -326,7 +332,7 @@ def main():
         print(f"✓ Service Status: {health['status']}")
         print(f"✓ Device: {health['device']}")
         print(f"✓ Model: {health['model']}")
-        print(f"✓ Products Indexed: {health['indexed_products']}")
+        print(f"✓ Shops Loaded: {health['index_cache']['loaded_shops']}")
     else:
         print("✗ Failed to connect to service")
         print("  Make sure the service is running: python main.py")
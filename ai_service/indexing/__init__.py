@@ -1,5 +1,5 @@
 """Catalog indexing module for processing Shopify products."""
 
-from .catalog_indexer import index_shopify_catalog, CatalogIndexer
+from .catalog_indexer import index_shopify_catalog, CatalogIndexer, product_fingerprint
 
-__all__ = ["index_shopify_catalog", "CatalogIndexer"]
+__all__ = ["index_shopify_catalog", "CatalogIndexer", "product_fingerprint"]
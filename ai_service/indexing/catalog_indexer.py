@@ -1,15 +1,77 @@
 """Shopify catalog indexing for product embeddings."""
 
 import asyncio
+import hashlib
+import json
 import logging
-from typing import Dict, List, Optional
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
 import numpy as np
+import requests
 from ..embeddings import CLIPEmbedder
 from ..vector_db import ProductVectorIndex
-from ..utils import ImageLoader, download_image
+from ..utils import (
+    PALETTE_SIZE,
+    ImageLoader,
+    decode_image,
+    fetch_image_bytes,
+    get_dominant_colors,
+)
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of a pipeline stage's input
+_DONE = object()
+
+# How often blocked pipeline threads check whether the run was abandoned
+_POLL_INTERVAL = 0.1
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put ``item`` on a bounded queue unless ``stop`` is set first."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Take an item from ``q``; returns ``_DONE`` once ``stop`` is set."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def product_fingerprint(product: Dict) -> str:
+    """
+    Hash the product fields that feed its embedding.
+    
+    Covers title, description and the image (its ETag when known, otherwise
+    its URL, which Shopify versions on every image change).
+    
+    Args:
+        product: Product data
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        [
+            product.get("title") or "",
+            product.get("description") or "",
+            product.get("image_etag") or product.get("image_url") or "",
+        ],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 
 class CatalogIndexer:
     """
@@ -20,13 +82,25 @@ class CatalogIndexer:
     - Multimodal embedding generation
     - Metadata storage
     - Error handling and fallbacks
+    
+    batch_index runs a streaming pipeline: a pool of fetch threads downloads
+    images, a pool of decode threads decodes and resizes them, and the
+    calling thread embeds and bulk-adds products batch_size at a time.
+    Stages are connected by bounded queues, so a slow stage throttles the
+    ones before it instead of buffering the whole catalog.
+    
+    Images and texts already in the embedder's EmbeddingCache (e.g. a
+    shared image, or a product whose title changed but image didn't) are
+    served from the cache instead of being re-embedded.
     """
     
     def __init__(
         self,
         embedder: CLIPEmbedder,
         vector_index: ProductVectorIndex,
-        image_loader: Optional[ImageLoader] = None
+        image_loader: Optional[ImageLoader] = None,
+        fetch_workers: int = 16,
+        decode_workers: int = 4
     ):
         """
         Initialize catalog indexer.
@@ -35,11 +109,16 @@ class CatalogIndexer:
             embedder: CLIPEmbedder instance
             vector_index: ProductVectorIndex instance
             image_loader: ImageLoader instance (created if None)
+            fetch_workers: Concurrent image downloads in batch_index
+            decode_workers: Concurrent image decode/resize threads
         """
         self.embedder = embedder
         self.vector_index = vector_index
         self.image_loader = image_loader or ImageLoader()
+        self.fetch_workers = fetch_workers
+        self.decode_workers = decode_workers
         self.failed_products = []
+        self._http = threading.local()
     
     def index_product(
         self,
@@ -55,8 +134,10 @@ class CatalogIndexer:
             "title": str,
             "description": str,
             "image_url": str,
+            "image_etag": str (optional),
             "category": str,
-            "tags": list[str]
+            "tags": list[str],
+            "colors": list[[r, g, b]] (optional, extracted from the image)
         }
         
         Args:
@@ -75,6 +156,7 @@ class CatalogIndexer:
                 image = self.image_loader.load_from_url(product["image_url"])
                 if image:
                     image = self.image_loader.preprocess(image)
+                    product = self._with_palette(product, image)
             
             # Fallback: Use text-only embedding if image unavailable
             if image is None and not skip_image_errors:
@@ -91,17 +173,8 @@ class CatalogIndexer:
                 description=product.get("description", "")
             )
             
-            # Prepare metadata
-            metadata = {
-                "title": product.get("title"),
-                "description": product.get("description", ""),
-                "category": product.get("category", ""),
-                "tags": product.get("tags", []),
-                "image_url": product.get("image_url"),
-                "embedding_sources": sources
-            }
-            
             # Add to index
+            metadata = self._build_metadata(product, sources)
             self.vector_index.add_product(product_id, embedding, metadata)
             logger.debug(f"Indexed product {product_id}")
             return True
@@ -113,46 +186,281 @@ class CatalogIndexer:
             )
             return False
     
+    @staticmethod
+    def _build_metadata(product: Dict, sources: Dict) -> Dict:
+        """Metadata stored alongside a product's embedding."""
+        return {
+            "title": product.get("title"),
+            "description": product.get("description", ""),
+            "category": product.get("category", ""),
+            "tags": product.get("tags", []),
+            "image_url": product.get("image_url"),
+            "colors": product.get("colors") or [],
+            "embedding_sources": sources,
+            "content_hash": product_fingerprint(product)
+        }
+    
+    @staticmethod
+    def _with_palette(product: Dict, image) -> Dict:
+        """Copy of ``product`` with dominant colors, unless it already has some."""
+        if product.get("colors"):
+            return product
+        colors = get_dominant_colors(image)[:PALETTE_SIZE]
+        return {**product, "colors": [list(color) for color in colors]}
+    
+    def _is_unchanged(self, product: Dict) -> bool:
+        """
+        Check whether a product's embedding inputs are already indexed.
+        
+        Category and tags don't affect the embedding, so they are refreshed
+        in place for unchanged products. Products that fell back to a
+        text-only embedding because their image couldn't be fetched count
+        as changed, so the image is retried on the next sync.
+        """
+        product_id = product.get("id")
+        metadata = self.vector_index.get_metadata(product_id)
+        if (
+            not metadata
+            or not self.vector_index.has_product(product_id)
+            or metadata.get("content_hash") != product_fingerprint(product)
+        ):
+            return False
+        sources = metadata.get("embedding_sources") or {}
+        if product.get("image_url") and not sources.get("image"):
+            return False
+        
+        self.vector_index.update_metadata(product_id, {
+            "category": product.get("category", ""),
+            "tags": product.get("tags", []),
+        })
+        return True
+    
+    def _fetch(self, product: Dict) -> tuple:
+        """Fetch stage: download image bytes over a per-thread session."""
+        data = None
+        if product.get("image_url"):
+            session = getattr(self._http, "session", None)
+            if session is None:
+                session = self._http.session = requests.Session()
+            data = fetch_image_bytes(product["image_url"], session=session)
+        return product, data
+    
+    def _decode(self, item: tuple) -> tuple:
+        """Decode stage: decode and resize downloaded bytes, extract colors."""
+        product, data = item
+        image = None
+        if data is not None:
+            image = decode_image(data)
+            if image is not None:
+                image = self.image_loader.preprocess(image)
+                product = self._with_palette(product, image)
+        return product, image
+    
+    @staticmethod
+    def _start_stage(
+        fn: Callable,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        workers: int,
+        downstream_workers: int,
+        stop: threading.Event
+    ) -> List[threading.Thread]:
+        """
+        Run ``fn`` over ``inbox`` on worker threads, writing to ``outbox``.
+        
+        The last worker to finish forwards one end marker per downstream
+        worker. Blocking puts on the bounded outbox provide backpressure.
+        Setting ``stop`` makes every worker exit, even one blocked on a
+        full or empty queue.
+        """
+        remaining = [workers]
+        lock = threading.Lock()
+        
+        def run():
+            while True:
+                item = _get(inbox, stop)
+                if item is _DONE:
+                    break
+                try:
+                    result = fn(item)
+                except Exception as e:
+                    product = item[0] if isinstance(item, tuple) else item
+                    logger.error(f"Pipeline stage failed for {product.get('id')}: {e}")
+                    result = (product, None)
+                if not _put(outbox, result, stop):
+                    break
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                for _ in range(downstream_workers):
+                    _put(outbox, _DONE, stop)
+        
+        threads = [threading.Thread(target=run, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+    
+    def _index_batch(self, batch: List[tuple], skip_image_errors: bool) -> int:
+        """Embedding stage: embed a batch in a few forward passes and bulk add."""
+        to_embed = []
+        for product, image in batch:
+            if image is None and not skip_image_errors:
+                logger.warning(f"Product {product['id']}: Image unavailable, skipping")
+                self.failed_products.append(
+                    {"product_id": product["id"], "reason": "image_unavailable"}
+                )
+                continue
+            to_embed.append((product, image))
+        
+        try:
+            results = self.embedder.embed_products([
+                {
+                    "image": image,
+                    "title": product.get("title"),
+                    "description": product.get("description", "")
+                }
+                for product, image in to_embed
+            ])
+        except Exception as e:
+            logger.error(f"Failed to embed batch: {e}")
+            self.failed_products.extend(
+                {"product_id": product.get("id"), "reason": str(e)}
+                for product, _ in to_embed
+            )
+            return 0
+        
+        entries = []
+        for (product, _), (embedding, sources) in zip(to_embed, results):
+            if embedding is None:
+                self.failed_products.append(
+                    {"product_id": product.get("id"), "reason": "embedding_failed"}
+                )
+                continue
+            entries.append(
+                (product["id"], embedding, self._build_metadata(product, sources))
+            )
+        
+        try:
+            self.vector_index.batch_add(entries)
+        except Exception as e:
+            logger.error(f"Failed to add batch to index: {e}")
+            self.failed_products.extend(
+                {"product_id": product_id, "reason": str(e)}
+                for product_id, _, _ in entries
+            )
+            return 0
+        return len(entries)
+    
     def batch_index(
         self,
         products: List[Dict],
         skip_image_errors: bool = True,
-        batch_size: int = 32
+        batch_size: int = 32,
+        force: bool = False,
+        prune: bool = False
     ) -> Dict:
         """
         Index multiple products efficiently.
         
+        Products whose content fingerprint matches the indexed one are
+        skipped; changed products replace their previous entry.
+        
         Args:
             products: List of product dicts
             skip_image_errors: Skip images that fail to download
-            batch_size: Batch size for processing
+            batch_size: Products per embedding pass and index insert
+            force: Re-embed products even if their fingerprint is unchanged
+            prune: Remove indexed products missing from ``products``
+                (the list is the shop's full catalog)
             
         Returns:
-            Statistics dict with counts and failed products
+            Statistics dict with counts and failed products. ``successful``
+            counts (re-)embedded products, ``skipped`` unchanged ones.
         """
         self.failed_products = []
         successful = 0
+        processed = 0
         total = len(products)
         
-        logger.info(f"Starting batch indexing of {total} products")
+        removed = 0
+        if prune:
+            catalog_ids = {product.get("id") for product in products}
+            stale_ids = [
+                product_id for product_id in self.vector_index.get_product_ids()
+                if product_id not in catalog_ids
+            ]
+            for product_id in stale_ids:
+                removed += self.vector_index.remove(product_id)
         
-        for i in range(0, total, batch_size):
-            batch = products[i:i + batch_size]
-            batch_success = 0
-            
-            for product in batch:
-                if self.index_product(product, skip_image_errors):
-                    batch_success += 1
-            
-            successful += batch_success
-            logger.info(
-                f"Progress: {i + batch_size}/{total} "
-                f"(batch: {batch_success}/{len(batch)})"
-            )
+        skipped = 0
+        if not force:
+            changed = [
+                product for product in products if not self._is_unchanged(product)
+            ]
+            skipped = total - len(changed)
+            products = changed
+        
+        logger.info(
+            f"Starting batch indexing of {len(products)} products "
+            f"({skipped} unchanged, {removed} removed)"
+        )
+        
+        # Bounded queues between stages provide backpressure
+        fetch_queue: queue.Queue = queue.Queue(maxsize=batch_size * 2)
+        decode_queue: queue.Queue = queue.Queue(maxsize=batch_size * 2)
+        ready_queue: queue.Queue = queue.Queue(maxsize=batch_size * 2)
+        
+        # Set when the run ends, so no stage thread outlives it (e.g. when
+        # indexing a batch raises and nothing consumes ready_queue anymore)
+        stop = threading.Event()
+        threads = self._start_stage(
+            self._fetch, fetch_queue, decode_queue,
+            self.fetch_workers, self.decode_workers, stop
+        )
+        threads += self._start_stage(
+            self._decode, decode_queue, ready_queue,
+            self.decode_workers, 1, stop
+        )
+        
+        def feed():
+            for product in products:
+                if not _put(fetch_queue, product, stop):
+                    return
+            for _ in range(self.fetch_workers):
+                _put(fetch_queue, _DONE, stop)
+        
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        threads.append(feeder)
+        
+        try:
+            batch = []
+            while True:
+                item = ready_queue.get()
+                if item is not _DONE:
+                    batch.append(item)
+                if batch and (len(batch) >= batch_size or item is _DONE):
+                    batch_success = self._index_batch(batch, skip_image_errors)
+                    successful += batch_success
+                    processed += len(batch)
+                    logger.info(
+                        f"Progress: {processed}/{len(products)} "
+                        f"(batch: {batch_success}/{len(batch)})"
+                    )
+                    batch = []
+                if item is _DONE:
+                    break
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
         
         stats = {
             "total": total,
             "successful": successful,
+            "skipped": skipped,
+            "removed": removed,
             "failed": len(self.failed_products),
             "failed_products": self.failed_products,
             "index_size": self.vector_index.get_size()
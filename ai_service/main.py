@@ -19,8 +19,8 @@ logger = logging.getLogger(__name__)
 
 # Global instances (initialized in lifespan)
 embedder = None
-vector_index = None
-recommender = None
+index_manager = None
+recommender_options = None
 
 
 @asynccontextmanager
@@ -31,50 +31,82 @@ async def lifespan(app: FastAPI):
     Startup: Load models and initialize components
     Shutdown: Clean up resources
     """
-    global embedder, vector_index, recommender
+    global embedder, index_manager, recommender_options
     
     # Startup
     logger.info("Starting recommendation service...")
     try:
-        from ai_service.embeddings import CLIPEmbedder
-        from ai_service.vector_db import ProductVectorIndex
-        from ai_service.recommendation import Recommender
+        from ai_service.embeddings import CLIPEmbedder, EmbeddingCache
+        from ai_service.vector_db import ProductVectorIndex, ShopIndexManager
         
         # Initialize embedder
         model_name = os.getenv(
             "CLIP_MODEL_NAME",
             "openai/clip-vit-base-patch32"
         )
+        # Embeddings are cached by content; an empty path keeps them in memory
+        embedding_cache = EmbeddingCache(
+            path=os.getenv(
+                "EMBEDDING_CACHE_PATH",
+                "/tmp/recommendation_index/embeddings.sqlite"
+            ) or None,
+            max_memory_items=int(os.getenv("EMBEDDING_CACHE_ITEMS", "50000"))
+        )
+        
         logger.info(f"Loading CLIP model: {model_name}")
-        embedder = CLIPEmbedder(model_name=model_name)
+        embedder = CLIPEmbedder(
+            model_name=model_name,
+            batch_size=int(os.getenv("EMBED_BATCH_SIZE", "32")),
+            cache=embedding_cache
+        )
         
-        # Initialize vector index
-        embedding_dim = os.getenv("EMBEDDING_DIM", "512")
-        vector_index = ProductVectorIndex(embedding_dim=int(embedding_dim))
+        # Per-shop vector indexes, loaded lazily on first request
+        embedding_dim = int(os.getenv("EMBEDDING_DIM", "512"))
+        index_options = dict(
+            embedding_dim=embedding_dim,
+            index_type=os.getenv("INDEX_TYPE", "flat"),
+            nlist=int(os.getenv("IVF_NLIST", "1024")),
+            nprobe=int(os.getenv("IVF_NPROBE", "16")),
+            pq_m=int(os.getenv("PQ_M", "64")),
+            hnsw_m=int(os.getenv("HNSW_M", "32")),
+            ef_search=int(os.getenv("HNSW_EF_SEARCH", "64")),
+            min_train_size=int(os.getenv("INDEX_MIN_TRAIN_SIZE", "10000"))
+        )
+        index_manager = ShopIndexManager(
+            base_dir=os.getenv("INDEX_DIR", "/tmp/recommendation_index/shops"),
+            index_factory=lambda: ProductVectorIndex(**index_options),
+            memory_budget_bytes=int(
+                float(os.getenv("INDEX_MEMORY_BUDGET_MB", "2048")) * 1024 ** 2
+            ),
+            mmap=os.getenv("INDEX_MMAP", "true").lower() == "true"
+        )
         
-        # Load existing index if available
-        index_path = os.getenv(
+        # One-time migration of the pre-sharding global index
+        legacy_index_path = os.getenv(
             "INDEX_PATH",
             "/tmp/recommendation_index/faiss.index"
         )
-        metadata_path = os.getenv(
+        legacy_metadata_path = os.getenv(
             "METADATA_PATH",
             "/tmp/recommendation_index/metadata.json"
         )
+        if os.path.exists(legacy_index_path):
+            legacy_shop = os.getenv("LEGACY_INDEX_SHOP")
+            if legacy_shop:
+                index_manager.import_index(
+                    legacy_shop, legacy_index_path, legacy_metadata_path
+                )
+            else:
+                logger.warning(
+                    f"Ignoring global index at {legacy_index_path}: "
+                    "set LEGACY_INDEX_SHOP to migrate it to that shop"
+                )
         
-        if os.path.exists(index_path):
-            try:
-                logger.info("Loading existing index from disk...")
-                vector_index.load(index_path, metadata_path)
-                logger.info(f"Loaded {vector_index.get_size()} products")
-            except Exception as e:
-                logger.warning(f"Failed to load existing index: {e}")
-        
-        # Initialize recommender
-        recommender = Recommender(
-            vector_index,
+        # Recommender settings, applied to each shop's recommender
+        recommender_options = dict(
             color_weight=float(os.getenv("COLOR_WEIGHT", "0.2")),
-            similarity_threshold=float(os.getenv("SIMILARITY_THRESHOLD", "0.3"))
+            similarity_threshold=float(os.getenv("SIMILARITY_THRESHOLD", "0.3")),
+            candidate_pool_size=int(os.getenv("CANDIDATE_POOL_SIZE", "200"))
         )
         
         logger.info("Service initialized successfully")
@@ -88,13 +120,10 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down recommendation service...")
     try:
-        # Save index before shutdown
-        if vector_index and vector_index.get_size() > 0:
-            os.makedirs(os.path.dirname(index_path), exist_ok=True)
-            vector_index.save(index_path, metadata_path)
-            logger.info("Saved index to disk")
+        # Shop indexes are saved after every write
+        if embedder and embedder.cache:
+            embedder.cache.close()
         
-        # Clear GPU memory
         if embedder and torch.cuda.is_available():
             torch.cuda.empty_cache()
             logger.info("Cleared GPU memory")
@@ -135,12 +164,12 @@ async def global_exception_handler(request, exc):
 @app.on_event("startup")
 async def startup_routes():
     """Initialize and mount API routes."""
-    global embedder, vector_index, recommender
+    global embedder, index_manager, recommender_options
     
-    if embedder and vector_index and recommender:
+    if embedder and index_manager:
         from ai_service.api.routes import create_router
         
-        router = create_router(embedder, vector_index, recommender)
+        router = create_router(embedder, index_manager, recommender_options)
         app.include_router(router)
         logger.info("API routes mounted")
 
@@ -152,7 +181,7 @@ async def root():
         "service": "Shopify Fashion Recommendation Engine",
         "version": "1.0.0",
         "status": "running",
-        "indexed_products": vector_index.get_size() if vector_index else 0,
+        "loaded_shops": index_manager.loaded_shops() if index_manager else 0,
         "docs": "/docs"
     }
 
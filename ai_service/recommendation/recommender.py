@@ -1,11 +1,11 @@
 """Fashion recommendation engine with outfit compatibility scoring."""
 
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 import numpy as np
 
 from ..vector_db import ProductVectorIndex
-from ..utils import get_dominant_colors, color_similarity
+from ..utils import palette_similarity
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +45,8 @@ class Recommender:
         self,
         vector_index: ProductVectorIndex,
         color_weight: float = 0.2,
-        similarity_threshold: float = 0.3
+        similarity_threshold: float = 0.3,
+        candidate_pool_size: int = 200
     ):
         """
         Initialize recommender.
@@ -54,10 +55,70 @@ class Recommender:
             vector_index: ProductVectorIndex instance
             color_weight: Weight for color similarity in scoring
             similarity_threshold: Minimum similarity for recommendations
+            candidate_pool_size: Nearest neighbours in compatible categories
+                fetched for style and outfit scoring
         """
         self.vector_index = vector_index
         self.color_weight = color_weight
         self.similarity_threshold = similarity_threshold
+        self.candidate_pool_size = candidate_pool_size
+    
+    def _nearest_neighbours(
+        self,
+        product_id: int,
+        k: int,
+        categories: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Run a top-k search using the product's own stored embedding.
+        
+        Args:
+            product_id: Query product ID
+            k: Number of neighbours to return (the query product is excluded)
+            categories: Restrict the search to these categories (None or
+                ["any"] searches the whole catalog)
+            
+        Returns:
+            Neighbours with metadata, ordered by similarity
+        """
+        query = self.vector_index.get_embedding(product_id)
+        if query is None:
+            logger.warning(f"Product {product_id} has no stored embedding")
+            return []
+        
+        if categories == ["any"]:
+            categories = None
+        
+        # One extra slot because the product is its own nearest neighbour
+        k = min(k + 1, self.vector_index.get_size())
+        candidates = self.vector_index.search_with_metadata(
+            query, k=k, categories=categories
+        )
+        return [item for item in candidates if item["product_id"] != product_id]
+    
+    def _palette_similarities(
+        self,
+        product_id: int,
+        candidates: List[Dict]
+    ) -> np.ndarray:
+        """
+        Compare the product's palette with every candidate's in one pass.
+        
+        Uses the HSV palettes packed by the index when products were added.
+        
+        Args:
+            product_id: Query product ID
+            candidates: Candidate products (with 'product_id')
+            
+        Returns:
+            (len(candidates), PALETTE_SIZE, PALETTE_SIZE) color similarities,
+            NaN where either product lacks that color
+        """
+        query = self.vector_index.get_palettes([product_id])[0]
+        palettes = self.vector_index.get_palettes(
+            [item["product_id"] for item in candidates]
+        )
+        return palette_similarity(query, palettes)
     
     def recommend_similar_products(
         self,
@@ -82,25 +143,17 @@ class Recommender:
                 logger.warning(f"Product {product_id} not found in index")
                 return []
             
-            # Get embedding by searching for the product
-            # Since we don't store embeddings separately, we need to find it
-            # For now, we'll search with a dummy and filter
             logger.info(f"Finding similar products to {product_id}")
             
             source_category = product_metadata.get("category", "")
             
-            # Get more candidates to filter
-            candidates = self.vector_index.search_with_metadata(
-                np.zeros(512, dtype=np.float32),  # Placeholder
-                k=min(100, self.vector_index.get_size())
-            )
+            # Over-fetch when filtering so top_k survive the category filter
+            k = self.candidate_pool_size if exclude_category else top_k
+            candidates = self._nearest_neighbours(product_id, k)
             
             # Filter and score
             recommendations = []
             for item in candidates:
-                if item["product_id"] == product_id:
-                    continue
-                
                 if exclude_category:
                     item_category = item.get("category", "")
                     if item_category == source_category:
@@ -138,7 +191,6 @@ class Recommender:
                 return []
             
             source_category = product_metadata.get("category", "").lower()
-            source_colors = product_metadata.get("colors", [])
             
             # Get compatible categories
             compatible_categories = COMPATIBILITY_RULES.get(
@@ -150,40 +202,24 @@ class Recommender:
                 f"(category: {source_category})"
             )
             
-            # Get all products for scoring
-            all_candidates = self.vector_index.search_with_metadata(
-                np.zeros(512, dtype=np.float32),
-                k=self.vector_index.get_size()
+            # Score only the product's nearest neighbours in compatible
+            # categories, found with a filtered search
+            scored_recommendations = self._nearest_neighbours(
+                product_id, self.candidate_pool_size, compatible_categories
             )
             
-            scored_recommendations = []
+            # Score based on embedding similarity plus a bonus for the best
+            # matching pair of colors, for all candidates at once
+            color_sims = self._palette_similarities(product_id, scored_recommendations)
+            has_colors = ~np.isnan(color_sims)
+            color_match = np.where(has_colors, color_sims, -np.inf).max(axis=(1, 2))
+            color_bonus = np.where(
+                has_colors.any(axis=(1, 2)), color_match * self.color_weight, 0.0
+            )
             
-            for item in all_candidates:
-                if item["product_id"] == product_id:
-                    continue
-                
-                item_category = item.get("category", "").lower()
-                
-                # Check category compatibility
-                if (compatible_categories != ["any"] and 
-                    item_category not in compatible_categories):
-                    continue
-                
-                # Score based on embedding similarity and color compatibility
-                base_score = item.get("similarity", 0.5)
-                
-                # Add color similarity bonus
-                item_colors = item.get("colors", [])
-                if source_colors and item_colors:
-                    color_match = max(
-                        color_similarity(c1, c2)
-                        for c1 in source_colors[:2]
-                        for c2 in item_colors[:2]
-                    )
-                    base_score += color_match * self.color_weight
-                
+            for item, bonus in zip(scored_recommendations, color_bonus):
+                base_score = item.get("similarity", 0.5) + float(bonus)
                 item["compatibility_score"] = min(base_score, 1.0)
-                scored_recommendations.append(item)
             
             # Sort by compatibility score
             scored_recommendations.sort(
@@ -222,7 +258,6 @@ class Recommender:
                 return {"error": "Product not found"}
             
             base_category = product_metadata.get("category", "").lower()
-            base_colors = product_metadata.get("colors", [])
             
             logger.info(f"Building outfit around product {product_id}")
             
@@ -238,31 +273,45 @@ class Recommender:
                 }
             ]
             
-            # Get candidates
-            all_products = self.vector_index.search_with_metadata(
-                np.zeros(512, dtype=np.float32),
-                k=self.vector_index.get_size()
+            # Get candidates from the product's neighbourhood, with a
+            # separate filtered search per compatible category so every
+            # category is represented
+            if compatible == ["any"]:
+                candidates = self._nearest_neighbours(
+                    product_id, self.candidate_pool_size
+                )
+            else:
+                per_category = max(1, self.candidate_pool_size // len(compatible))
+                candidates = [
+                    item
+                    for category in compatible
+                    for item in self._nearest_neighbours(
+                        product_id, per_category, [category]
+                    )
+                ]
+            
+            # Mean color similarity over color pairs, neutral without colors
+            color_sims = self._palette_similarities(product_id, candidates)
+            has_colors = ~np.isnan(color_sims)
+            pair_counts = has_colors.sum(axis=(1, 2))
+            color_scores = np.where(
+                pair_counts > 0,
+                np.where(has_colors, color_sims, 0.0).sum(axis=(1, 2))
+                / np.maximum(pair_counts, 1),
+                0.5
             )
             
             # Score and select items for outfit
             scored_items = []
             
-            for item in all_products:
-                if item["product_id"] == product_id:
-                    continue
-                
+            for item, color_score in zip(candidates, color_scores):
                 item_category = item.get("category", "").lower()
                 
-                # Check compatibility
-                if (compatible != ["any"] and 
-                    item_category not in compatible):
-                    continue
-                
                 # Calculate outfit score
                 outfit_score = self._calculate_outfit_score(
                     product_metadata,
                     item,
-                    base_colors
+                    float(color_score)
                 )
                 
                 if outfit_score >= self.similarity_threshold:
@@ -305,7 +354,7 @@ class Recommender:
         self,
         base_product: Dict,
         candidate: Dict,
-        base_colors: List[Tuple[int, int, int]]
+        color_score: float = 0.5
     ) -> float:
         """
         Calculate compatibility score for outfit combination.
@@ -313,7 +362,7 @@ class Recommender:
         Args:
             base_product: Base product metadata
             candidate: Candidate product metadata
-            base_colors: Base product colors
+            color_score: Color complementarity (0-1, 0.5 when unknown)
             
         Returns:
             Compatibility score (0-1)
@@ -321,17 +370,6 @@ class Recommender:
         # Embedding similarity
         embedding_score = candidate.get("similarity", 0.5)
         
-        # Color complementarity
-        candidate_colors = candidate.get("colors", [])
-        color_score = 0.5  # Default neutral score
-        
-        if base_colors and candidate_colors:
-            color_score = np.mean([
-                color_similarity(c1, c2)
-                for c1 in base_colors[:2]
-                for c2 in candidate_colors[:2]
-            ])
-        
         # Category compatibility bonus
         base_cat = base_product.get("category", "").lower()
         cand_cat = candidate.get("category", "").lower()
@@ -11,10 +11,11 @@ from typing import Dict, List
 
 # Import the components (adjust imports based on your structure)
 try:
-    from ai_service.embeddings import CLIPEmbedder
-    from ai_service.vector_db import ProductVectorIndex
+    from ai_service.embeddings import CLIPEmbedder, EmbeddingCache, content_hash
+    from ai_service.vector_db import ProductVectorIndex, ShopIndexManager
     from ai_service.recommendation import Recommender
-    from ai_service.indexing import CatalogIndexer
+    from ai_service.indexing import CatalogIndexer, product_fingerprint
+    from ai_service.utils import color_similarity
 except ImportError:
     pytest.skip("AI service modules not available", allow_module_level=True)
 
@@ -50,6 +51,94 @@ class TestCLIPEmbedder:
         embedding = embedder.embed_text("")
         assert embedding is not None
         assert len(embedding) == 512
+    
+    def test_batch_text_embedding(self, embedder):
+        """Test batched text embeddings match single-item embeddings."""
+        texts = ["White cotton t-shirt", "Blue denim jeans", "Black leather boots"]
+        embeddings = embedder.embed_texts(texts, batch_size=2)
+        
+        assert embeddings.shape == (3, 512)
+        assert embeddings.dtype == np.float32
+        np.testing.assert_allclose(
+            embeddings[1], embedder.embed_text(texts[1]), atol=1e-4
+        )
+    
+    def test_batch_image_embedding(self, embedder):
+        """Test batched image embeddings."""
+        from PIL import Image
+        
+        images = [Image.new("RGB", (224, 224), (i * 60, 0, 0)) for i in range(3)]
+        embeddings = embedder.embed_images(images, batch_size=2)
+        
+        assert embeddings.shape == (3, 512)
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=0.01)
+    
+    def test_embed_products(self, embedder):
+        """Test multimodal batch embedding tracks sources per product."""
+        from PIL import Image
+        
+        results = embedder.embed_products([
+            {"image": Image.new("RGB", (224, 224)), "title": "Red dress"},
+            {"title": "Blue jeans", "description": "Slim fit denim"},
+            {"image": "not-an-image", "description": ""},
+        ])
+        
+        assert results[0][1] == {"image": True, "title": True, "description": False}
+        assert results[1][1] == {"image": False, "title": True, "description": True}
+        assert results[2][0] is None
+        assert results[0][0].shape == (512,)
+
+
+class TestEmbeddingCache:
+    """Tests for the content-addressed embedding cache."""
+    
+    def test_persists_across_instances(self, tmp_path):
+        """Test vectors survive a restart and are keyed by model and modality."""
+        path = str(tmp_path / "embeddings.sqlite")
+        vector = np.arange(4, dtype=np.float32)
+        cache = EmbeddingCache(path)
+        cache.put_many("clip", "text", [content_hash("shirt")], [vector])
+        cache.close()
+        
+        cache = EmbeddingCache(path)
+        key = content_hash("shirt")
+        np.testing.assert_array_equal(cache.get_many("clip", "text", [key])[0], vector)
+        assert cache.get_many("clip", "image", [key]) == [None]
+        assert cache.get_many("other-model", "text", [key]) == [None]
+        
+        stats = cache.get_stats()
+        assert stats["disk_hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["hit_ratio"] == pytest.approx(1 / 3)
+    
+    def test_memory_lru_bound(self):
+        """Test the in-process front keeps only the most recent vectors."""
+        cache = EmbeddingCache(max_memory_items=2)
+        keys = ["a", "b", "c"]
+        cache.put_many("clip", "text", keys, [np.ones(4, np.float32)] * 3)
+        assert cache.get_stats()["memory_items"] == 2
+        assert cache.get_many("clip", "text", keys)[0] is None
+    
+    def test_embedder_serves_hits_from_cache(self):
+        """Test only unseen texts reach the model."""
+        embedder = CLIPEmbedder.__new__(CLIPEmbedder)
+        embedder.model_name = "stub"
+        embedder.embedding_dim = 4
+        embedder.batch_size = 8
+        embedder.cache = EmbeddingCache()
+        encoded = []
+        
+        def encode(texts, batch_size):
+            encoded.extend(texts)
+            return np.stack([np.full(4, len(text), np.float32) for text in texts])
+        
+        embedder._encode_texts = encode
+        first = embedder.embed_texts(["red dress", "jeans", "red dress"])
+        second = embedder.embed_texts(["jeans", "scarf"])
+        
+        assert encoded == ["red dress", "jeans", "scarf"]
+        np.testing.assert_array_equal(first[0], first[2])
+        np.testing.assert_array_equal(second[0], first[1])
 
 
 class TestProductVectorIndex:
@@ -126,6 +215,425 @@ class TestProductVectorIndex:
         assert "product_id" in results[0]
         assert "similarity" in results[0]
         assert "title" in results[0]
+    
+    def test_get_embedding(self, index):
+        """Test stored embeddings are retrievable by product ID."""
+        embeddings = {}
+        for i in range(100):
+            embedding = np.random.rand(512).astype(np.float32)
+            embeddings[i] = embedding / np.linalg.norm(embedding)
+        index.add_product(0, embeddings[0])
+        index.batch_add([(i, embeddings[i], None) for i in range(1, 100)])
+        
+        assert index.has_product(42)
+        assert not index.has_product(1000)
+        assert index.get_embedding(1000) is None
+        np.testing.assert_allclose(index.get_embedding(42), embeddings[42])
+        assert index.get_embeddings().shape == (100, 512)
+        
+        # Querying with a stored vector finds the product itself
+        results = index.search_with_metadata(index.get_embedding(42), k=1)
+        assert results[0]["product_id"] == 42
+        assert abs(results[0]["similarity"] - 1.0) < 1e-4
+    
+    def test_save_load_restores_embeddings(self, index, tmp_path):
+        """Test embeddings and row mapping survive a save/load cycle."""
+        embedding = np.random.rand(512).astype(np.float32)
+        embedding = embedding / np.linalg.norm(embedding)
+        index.add_product(7, embedding, {"title": "Product 7"})
+        
+        index_path = str(tmp_path / "faiss.index")
+        metadata_path = str(tmp_path / "metadata.json")
+        index.save(index_path, metadata_path)
+        
+        loaded = ProductVectorIndex(embedding_dim=512)
+        loaded.load(index_path, metadata_path)
+        np.testing.assert_allclose(loaded.get_embedding(7), embedding)
+
+
+class TestIndexUpdates:
+    """Tests for upsert / remove on the vector index."""
+    
+    @staticmethod
+    def _vector(seed):
+        vector = np.random.default_rng(seed).random(64).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+    
+    @pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+    def test_upsert_replaces_product(self, index_type):
+        """Test re-adding a product replaces its vector instead of duplicating."""
+        index = ProductVectorIndex(embedding_dim=64, index_type=index_type)
+        for i in range(20):
+            index.add_product(i, self._vector(i), {"title": f"Product {i}"})
+        
+        index.upsert(3, self._vector(100), {"title": "Updated"})
+        
+        assert index.get_size() == 20
+        assert index.get_metadata(3)["title"] == "Updated"
+        product_ids, _ = index.search(self._vector(100), k=20)
+        assert product_ids[0] == 3
+        assert product_ids.count(3) == 1
+        assert len(product_ids) == 20
+    
+    def test_remove_product(self):
+        """Test removed products disappear from search and metadata."""
+        index = ProductVectorIndex(embedding_dim=64, max_deleted_ratio=0.5)
+        for i in range(10):
+            index.add_product(i, self._vector(i), {"title": f"Product {i}"})
+        
+        assert index.remove(4)
+        assert not index.remove(4)
+        assert index.get_size() == 9
+        assert index.get_metadata(4) is None
+        assert 4 not in index.search(self._vector(4), k=10)[0]
+    
+    def test_compaction_keeps_ivf_training(self):
+        """Test compaction drops tombstones and keeps the IVF index trained."""
+        index = ProductVectorIndex(
+            embedding_dim=64,
+            index_type="ivf_flat",
+            nlist=4,
+            min_train_size=200,
+            max_deleted_ratio=0.1
+        )
+        index.batch_add([(i, self._vector(i), None) for i in range(300)])
+        assert index.is_trained
+        
+        for i in range(40):
+            index.remove(i)
+        
+        assert index.is_trained
+        assert len(index.product_ids) < 300
+        assert index.get_size() == 260
+        index.set_search_params(nprobe=4)
+        assert index.search(self._vector(250), k=1)[0] == [250]
+    
+    def test_save_load_preserves_removals(self, tmp_path):
+        """Test tombstones survive save/load."""
+        index = ProductVectorIndex(embedding_dim=64, max_deleted_ratio=0.5)
+        for i in range(5):
+            index.add_product(i, self._vector(i), {"title": f"Product {i}"})
+        index.remove(2)
+        index.save(str(tmp_path / "faiss.index"), str(tmp_path / "metadata.json"))
+        
+        loaded = ProductVectorIndex(embedding_dim=64)
+        loaded.load(str(tmp_path / "faiss.index"), str(tmp_path / "metadata.json"))
+        assert loaded.get_size() == 4
+        assert 2 not in loaded.search(self._vector(2), k=5)[0]
+
+
+class TestMetadataStore:
+    """Tests for the columnar metadata store behind save/load."""
+
+    @staticmethod
+    def _index(count=10):
+        index = ProductVectorIndex(embedding_dim=16)
+        rng = np.random.default_rng(0)
+        for i in range(count):
+            index.add_product(
+                1000 + i,
+                rng.random(16).astype(np.float32),
+                {"title": f"Product {i}", "tags": ["casual"], "category": "shirts"}
+            )
+        return index
+
+    def test_metadata_decoded_lazily(self, tmp_path):
+        """Test records are only decoded when accessed."""
+        index_path = str(tmp_path / "faiss.index")
+        metadata_path = str(tmp_path / "metadata.json")
+        self._index().save(index_path, metadata_path)
+
+        loaded = ProductVectorIndex(embedding_dim=16)
+        loaded.load(index_path, metadata_path, mmap=True)
+        assert loaded.metadata.decoded_count() == 0
+        assert loaded.get_size() == 10
+        assert list(loaded.product_ids) == list(range(1000, 1010))
+
+        assert loaded.get_metadata(1003)["title"] == "Product 3"
+        assert loaded.metadata.decoded_count() == 1
+        assert loaded.get_metadata(5) is None
+
+    def test_resave_over_mmapped_files(self, tmp_path):
+        """Test a lazily loaded index can be modified and saved in place."""
+        index_path = str(tmp_path / "faiss.index")
+        metadata_path = str(tmp_path / "metadata.json")
+        self._index().save(index_path, metadata_path)
+
+        loaded = ProductVectorIndex(embedding_dim=16)
+        loaded.load(index_path, metadata_path, mmap=True)
+        loaded.update_metadata(1001, {"category": "pants"})
+        loaded.remove(1002)
+        loaded.add_product(2000, np.ones(16, dtype=np.float32), {"title": "New"})
+        loaded.save(index_path, metadata_path)
+
+        reloaded = ProductVectorIndex(embedding_dim=16)
+        reloaded.load(index_path, metadata_path, mmap=True)
+        assert reloaded.get_size() == 10
+        assert reloaded.get_metadata(1001)["category"] == "pants"
+        assert reloaded.get_metadata(1002) is None
+        assert reloaded.get_metadata(2000)["title"] == "New"
+        assert reloaded.get_metadata(1009)["tags"] == ["casual"]
+        assert sorted(reloaded.metadata) == sorted(reloaded.get_product_ids())
+
+    def test_load_legacy_json(self, tmp_path):
+        """Test metadata saved as a single JSON document still loads."""
+        index = self._index(count=3)
+        index_path = str(tmp_path / "faiss.index")
+        metadata_path = str(tmp_path / "metadata.json")
+        index.save(index_path, metadata_path)
+        with open(metadata_path, "w") as f:
+            json.dump({
+                "product_ids": [1000, 1001, 1002],
+                "metadata": {"1001": {"title": "Legacy"}}
+            }, f, indent=2)
+
+        loaded = ProductVectorIndex(embedding_dim=16)
+        loaded.load(index_path, metadata_path)
+        assert loaded.get_size() == 3
+        assert loaded.get_metadata(1001) == {"title": "Legacy"}
+
+
+class TestCategoryIndex:
+    """Tests for category-filtered search."""
+    
+    CATEGORIES = ["shirt", "pants", "shoes", "dress"]
+    
+    @pytest.fixture
+    def index(self):
+        index = ProductVectorIndex(embedding_dim=32, max_deleted_ratio=0.5)
+        vectors = np.random.default_rng(3).random((200, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index.batch_add([
+            (i, vectors[i], {"category": self.CATEGORIES[i % 4].title()})
+            for i in range(200)
+        ])
+        return index
+    
+    @staticmethod
+    def _filtered_truth(index, query, categories, k):
+        product_ids, _ = index.search(query, k=index.get_size())
+        return [
+            product_id for product_id in product_ids
+            if index.get_metadata(product_id)["category"].lower() in categories
+        ][:k]
+    
+    def test_search_within_categories(self, index):
+        """Test filtered search matches filtering an exhaustive search."""
+        query = index.get_embedding(5)
+        product_ids, distances = index.search(
+            query, k=10, categories=["pants", "SHOES"]
+        )
+        
+        assert product_ids == self._filtered_truth(index, query, {"pants", "shoes"}, 10)
+        assert distances == sorted(distances)
+        assert index.search(query, k=5, categories=["hats"]) == ([], [])
+        assert index.get_categories() == {name: 50 for name in self.CATEGORIES}
+    
+    def test_category_index_tracks_updates(self, index, tmp_path):
+        """Test replace, remove, recategorize, compact and reload stay in sync."""
+        query = index.get_embedding(1)
+        index.add_product(1, query, {"category": "shoes"})  # pants -> shoes
+        index.remove(9)  # pants
+        index.update_metadata(13, {"category": "dress"})  # pants -> dress
+        
+        pants, _ = index.search(query, k=200, categories=["pants"])
+        assert len(pants) == 47 and not {1, 9, 13} & set(pants)
+        assert 1 in index.search(query, k=200, categories=["shoes"])[0]
+        assert 13 in index.search(query, k=200, categories=["dress"])[0]
+        
+        index.compact()
+        index.save(str(tmp_path / "faiss.index"), str(tmp_path / "metadata.json"))
+        loaded = ProductVectorIndex(embedding_dim=32)
+        loaded.load(str(tmp_path / "faiss.index"), str(tmp_path / "metadata.json"))
+        assert loaded.get_categories() == index.get_categories()
+        assert loaded.search(query, k=10, categories=["pants"]) == \
+            index.search(query, k=10, categories=["pants"])
+
+
+class TestApproximateIndexes:
+    """Tests for IVF / PQ / HNSW index modes."""
+    
+    @staticmethod
+    def _vectors(count, dim=64):
+        vectors = np.random.rand(count, dim).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    
+    def test_unknown_index_type(self):
+        """Test unknown index types are rejected."""
+        with pytest.raises(ValueError):
+            ProductVectorIndex(embedding_dim=64, index_type="annoy")
+    
+    @pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq"])
+    def test_ivf_trains_once_enough_vectors(self, index_type):
+        """Test IVF indexes serve exact search until trained on batch_add."""
+        vectors = self._vectors(600)
+        index = ProductVectorIndex(
+            embedding_dim=64,
+            index_type=index_type,
+            nlist=8,
+            pq_m=8,
+            min_train_size=300
+        )
+        
+        index.batch_add([(i, vectors[i], None) for i in range(100)])
+        assert not index.is_trained
+        assert index.search(vectors[10], k=1)[0] == [10]
+        
+        index.batch_add([(i, vectors[i], None) for i in range(100, 600)])
+        assert index.is_trained
+        assert index.index.ntotal == 600
+        
+        index.set_search_params(nprobe=8)
+        product_ids, _ = index.search(vectors[450], k=5)
+        assert 0 < len(product_ids) <= 5
+        assert index.get_embedding(450) is not None
+    
+    @pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq"])
+    @pytest.mark.parametrize("change", ["add", "remove", "unchanged"])
+    def test_mmapped_ivf_can_be_modified_and_resaved(
+        self, tmp_path, index_type, change
+    ):
+        """Test mmap-loaded IVF shards survive add/remove/save/reload."""
+        vectors = self._vectors(400)
+        options = dict(
+            embedding_dim=64, index_type=index_type, nlist=8, pq_m=8,
+            min_train_size=300
+        )
+        index = ProductVectorIndex(**options)
+        index.batch_add([(i, vectors[i], None) for i in range(400)])
+        index_path = str(tmp_path / "faiss.index")
+        metadata_path = str(tmp_path / "metadata.json")
+        index.save(index_path, metadata_path)
+        
+        loaded = ProductVectorIndex(**options)
+        loaded.load(index_path, metadata_path, mmap=True)
+        if change == "add":
+            loaded.add_product(1000, vectors[0], {"title": "New"})
+        elif change == "remove":
+            # Enough removals to trigger compact()
+            for i in range(60):
+                loaded.remove(i)
+        loaded.save(index_path, metadata_path)
+        
+        reloaded = ProductVectorIndex(**options)
+        reloaded.load(index_path, metadata_path, mmap=True)
+        expected = {"add": 401, "remove": 340, "unchanged": 400}[change]
+        assert reloaded.get_size() == expected
+        assert reloaded.index.ntotal == reloaded._num_rows
+        reloaded.set_search_params(nprobe=8)
+        assert 0 < len(reloaded.search(vectors[200], k=5)[0]) <= 5
+    
+    def test_hnsw_search(self):
+        """Test HNSW index finds stored vectors."""
+        vectors = self._vectors(200)
+        index = ProductVectorIndex(embedding_dim=64, index_type="hnsw")
+        index.batch_add([(i, vectors[i], None) for i in range(200)])
+        index.set_search_params(ef_search=128)
+        
+        assert index.search(vectors[123], k=1)[0] == [123]
+
+
+class TestShopIndexManager:
+    """Tests for per-shop index sharding."""
+    
+    @staticmethod
+    def _add_products(index, count):
+        vectors = np.random.rand(count, 64).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index.batch_add([
+            (i, vectors[i], {"title": f"Product {i}"}) for i in range(count)
+        ])
+        return vectors
+    
+    @pytest.fixture
+    def manager(self, tmp_path):
+        return ShopIndexManager(
+            base_dir=str(tmp_path),
+            index_factory=lambda: ProductVectorIndex(embedding_dim=64),
+            memory_budget_bytes=100 * 64 * 4 * 2 * 2  # Two 100-product shops
+        )
+    
+    def test_shops_are_isolated(self, manager):
+        """Test each shop gets its own index."""
+        self._add_products(manager.get("shop-a.myshopify.com", create=True), 10)
+        
+        assert manager.get("shop-a.myshopify.com").get_size() == 10
+        assert manager.get("shop-b.myshopify.com").get_size() == 0
+        assert manager.loaded_shops() == 1
+    
+    def test_lazy_load_and_counters(self, manager):
+        """Test shards are loaded from disk (memory-mapped) after eviction."""
+        vectors = self._add_products(
+            manager.get("shop-a.myshopify.com", create=True), 100
+        )
+        manager.save("shop-a.myshopify.com")
+        self._add_products(
+            manager.get("shop-b.myshopify.com", create=True), 100
+        )
+        manager.save("shop-b.myshopify.com")
+        self._add_products(
+            manager.get("shop-c.myshopify.com", create=True), 100
+        )
+        manager.save("shop-c.myshopify.com")
+        
+        stats = manager.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["loaded_shops"] == 2
+        assert stats["memory_bytes"] <= stats["memory_budget_bytes"]
+        
+        # shop-a was least recently used and is reloaded from disk
+        index = manager.get("shop-a.myshopify.com")
+        assert index.get_size() == 100
+        assert index.search(vectors[7], k=1)[0] == [7]
+        assert manager.get_stats()["misses"] == 4
+        
+        manager.get("shop-a.myshopify.com")
+        assert manager.get_stats()["hits"] >= 1
+        
+        # Memory-mapped shards accept writes (products 0-4 are replaced)
+        new_vectors = self._add_products(index, 5)
+        assert index.get_size() == 100
+        assert index.search(new_vectors[3], k=1)[0] == [3]
+    
+    def test_save_after_eviction(self, manager):
+        """Test a shard evicted mid-write is still saved from the caller's copy."""
+        index = manager.get("shop-a.myshopify.com", create=True)
+        self._add_products(index, 100)
+        for shop in ("shop-b.myshopify.com", "shop-c.myshopify.com"):
+            self._add_products(manager.get(shop, create=True), 100)
+            manager.save(shop)
+        
+        assert manager.save("shop-a.myshopify.com") is False
+        assert manager.save("shop-a.myshopify.com", index) is True
+        assert manager.get("shop-a.myshopify.com").get_size() == 100
+        
+        # A stale copy reloaded while the write was running is replaced
+        stale = manager.get("shop-a.myshopify.com")
+        index.remove(0)
+        assert manager.save("shop-a.myshopify.com", index) is True
+        reloaded = manager.get("shop-a.myshopify.com")
+        assert reloaded is not stale
+        assert reloaded.get_size() == 99
+    
+    def test_import_legacy_index(self, manager, tmp_path):
+        """Test the old global index is imported once into a shop's shard."""
+        legacy = ProductVectorIndex(embedding_dim=64)
+        vectors = self._add_products(legacy, 20)
+        index_path = str(tmp_path / "legacy" / "faiss.index")
+        metadata_path = str(tmp_path / "legacy" / "metadata.json")
+        legacy.save(index_path, metadata_path)
+        
+        assert manager.import_index("shop-a.myshopify.com", index_path, metadata_path)
+        assert not manager.import_index("shop-a.myshopify.com", index_path, metadata_path)
+        
+        index = manager.get("shop-a.myshopify.com")
+        assert index.get_size() == 20
+        assert index.search(vectors[4], k=1)[0] == [4]
+    
+    def test_invalid_shop(self, manager):
+        """Test path-like shop names are rejected."""
+        with pytest.raises(ValueError):
+            manager.get("../etc")
 
 
 class TestRecommender:
@@ -176,6 +684,22 @@ class TestRecommender:
         )
         assert isinstance(recommendations, list)
     
+    def test_recommend_similar_uses_query_embedding(self, recommender_setup):
+        """Test similar products are ranked against the product's own vector."""
+        recommender, index = recommender_setup
+        
+        # A near-duplicate of product 1 should be the top recommendation
+        near_duplicate = index.get_embedding(1) + 0.01
+        near_duplicate = near_duplicate / np.linalg.norm(near_duplicate)
+        index.add_product(6, near_duplicate, {"title": "Twin", "category": "shirt"})
+        
+        recommendations = recommender.recommend_similar_products(
+            product_id=1,
+            top_k=3
+        )
+        assert recommendations[0]["product_id"] == 6
+        assert all(item["product_id"] != 1 for item in recommendations)
+    
     def test_recommend_style_matches(self, recommender_setup):
         """Test style matching recommendations."""
         recommender, index = recommender_setup
@@ -197,6 +721,52 @@ class TestRecommender:
         assert isinstance(outfit, dict)
         assert "base_product_id" in outfit
         assert "outfit_items" in outfit
+    
+    def test_color_scoring_matches_scalar(self):
+        """Test packed-palette scoring agrees with per-pair color_similarity."""
+        index = ProductVectorIndex(embedding_dim=8)
+        rng = np.random.default_rng(1)
+        palettes = {
+            1: [[250, 250, 250], [20, 30, 200]],
+            2: [[10, 20, 180], [200, 200, 190]],
+            3: [[255, 0, 0]],
+            4: None,
+        }
+        for product_id, colors in palettes.items():
+            metadata = {"title": str(product_id), "category": "pants"}
+            if colors:
+                metadata["colors"] = colors
+            index.add_product(product_id, rng.random(8).astype(np.float32), metadata)
+        index.update_metadata(1, {"category": "shirt"})
+        
+        recommender = Recommender(index, similarity_threshold=-1.0)
+        matches = {
+            item["product_id"]: item
+            for item in recommender.recommend_style_matches(1, top_k=3)
+        }
+        for product_id in (2, 3):
+            expected = max(
+                color_similarity(c1, c2)
+                for c1 in palettes[1] for c2 in palettes[product_id]
+            )
+            item = matches[product_id]
+            assert item["compatibility_score"] == pytest.approx(
+                min(item["similarity"] + expected * 0.2, 1.0), abs=1e-5
+            )
+        assert matches[4]["compatibility_score"] == pytest.approx(
+            min(matches[4]["similarity"], 1.0)
+        )
+        
+        outfit = recommender.recommend_complete_outfit(1, max_items=2)
+        chosen = outfit["outfit_items"][1]
+        chosen_colors = palettes[chosen["product_id"]]
+        expected_colors = np.mean([
+            color_similarity(c1, c2) for c1 in palettes[1] for c2 in chosen_colors
+        ]) if chosen_colors else 0.5
+        assert chosen["outfit_score"] == pytest.approx(
+            min(chosen["similarity"] * 0.4 + expected_colors * 0.4 + 0.1, 1.0),
+            abs=1e-5
+        )
 
 
 class TestCatalogIndexer:
@@ -219,6 +789,133 @@ class TestCatalogIndexer:
         assert indexer.vector_index is not None
 
 
+class _StubEmbedder:
+    """Deterministic stand-in for CLIPEmbedder in pipeline tests."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def embed_products(self, products):
+        self.calls.append(len(products))
+        results = []
+        for product in products:
+            if not product["title"]:
+                results.append((None, {}))
+                continue
+            rng = np.random.default_rng(len(product["title"]))
+            embedding = rng.random(512).astype(np.float32)
+            sources = {"image": product["image"] is not None, "title": True}
+            results.append((embedding / np.linalg.norm(embedding), sources))
+        return results
+
+
+class TestCatalogIndexerPipeline:
+    """Tests for the staged batch indexing pipeline."""
+    
+    def test_batch_index_pipeline(self):
+        """Test products flow through fetch/decode/embed/add in batches."""
+        index = ProductVectorIndex(embedding_dim=512)
+        embedder = _StubEmbedder()
+        indexer = CatalogIndexer(embedder, index, fetch_workers=4, decode_workers=2)
+        
+        products = [
+            {"id": i, "title": f"Product {i}", "category": "shirt"}
+            for i in range(1, 11)
+        ]
+        products.append({"id": 11, "title": "", "category": "shirt"})
+        products.append({
+            "id": 12,
+            "title": "Unreachable image",
+            "image_url": "http://127.0.0.1:9/missing.jpg",
+            "category": "shirt"
+        })
+        
+        stats = indexer.batch_index(products, batch_size=4)
+        
+        assert stats["total"] == 12
+        assert stats["successful"] == 11
+        assert stats["failed_products"] == [
+            {"product_id": 11, "reason": "embedding_failed"}
+        ]
+        assert index.get_size() == 11
+        assert max(embedder.calls) <= 4
+        assert index.get_metadata(12)["embedding_sources"]["image"] is False
+        
+        # The missing image is retried on the next sync
+        stats = indexer.batch_index(products, batch_size=4)
+        assert stats["skipped"] == 10
+        assert stats["successful"] == 1
+    
+    def test_batch_index_skips_unchanged_products(self):
+        """Test only products whose fingerprint changed are re-embedded."""
+        index = ProductVectorIndex(embedding_dim=512)
+        embedder = _StubEmbedder()
+        indexer = CatalogIndexer(embedder, index)
+        products = [
+            {"id": i, "title": f"Product {i}", "category": "shirt"}
+            for i in range(1, 6)
+        ]
+        indexer.batch_index(products)
+        embedder.calls.clear()
+        
+        products[0] = {**products[0], "title": "Renamed product"}
+        products[1] = {**products[1], "category": "jacket"}
+        stats = indexer.batch_index(products)
+        
+        assert stats["skipped"] == 4
+        assert stats["successful"] == 1
+        assert sum(embedder.calls) == 1
+        assert index.get_size() == 5
+        assert index.get_metadata(1)["title"] == "Renamed product"
+        assert index.get_metadata(2)["category"] == "jacket"
+        assert index.get_metadata(1)["content_hash"] == product_fingerprint(
+            products[0]
+        )
+        
+        # A full sync removes products missing from the catalog
+        stats = indexer.batch_index(products[:3], prune=True)
+        assert stats["removed"] == 2
+        assert index.get_size() == 3
+    
+    def test_batch_index_requires_images(self):
+        """Test products without images fail when image errors aren't skipped."""
+        index = ProductVectorIndex(embedding_dim=512)
+        indexer = CatalogIndexer(_StubEmbedder(), index)
+        
+        stats = indexer.batch_index(
+            [{"id": 1, "title": "No image", "category": "shirt"}],
+            skip_image_errors=False
+        )
+        
+        assert stats["successful"] == 0
+        assert stats["failed_products"][0]["reason"] == "image_unavailable"
+    
+    def test_batch_index_embed_failure_stops_pipeline(self):
+        """Test a failing embed is reported and leaves no stage threads behind."""
+        import threading
+        
+        class _FailingEmbedder:
+            def embed_products(self, products):
+                raise RuntimeError("CUDA out of memory")
+        
+        index = ProductVectorIndex(embedding_dim=512)
+        indexer = CatalogIndexer(_FailingEmbedder(), index)
+        threads_before = threading.active_count()
+        products = [
+            {"id": i, "title": f"Product {i}", "category": "shirt"}
+            for i in range(1, 201)
+        ]
+        
+        stats = indexer.batch_index(products, batch_size=8)
+        
+        assert stats["successful"] == 0
+        assert stats["failed"] == 200
+        assert stats["failed_products"][0] == {
+            "product_id": 1, "reason": "CUDA out of memory"
+        }
+        assert threading.active_count() == threads_before
+
+
 class TestIntegration:
     """Integration tests for complete workflow."""
     
@@ -1,6 +1,22 @@
 """Utility modules for image processing and color analysis."""
 
-from .image_loader import ImageLoader, download_image
-from .color_utils import get_dominant_colors, color_similarity
+from .image_loader import ImageLoader, download_image, fetch_image_bytes, decode_image
+from .color_utils import (
+    PALETTE_SIZE,
+    get_dominant_colors,
+    color_similarity,
+    pack_palettes,
+    palette_similarity,
+)
 
-__all__ = ["ImageLoader", "download_image", "get_dominant_colors", "color_similarity"]
+__all__ = [
+    "ImageLoader",
+    "download_image",
+    "fetch_image_bytes",
+    "decode_image",
+    "get_dominant_colors",
+    "color_similarity",
+    "pack_palettes",
+    "palette_similarity",
+    "PALETTE_SIZE",
+]
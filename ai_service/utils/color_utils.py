@@ -1,12 +1,15 @@
 """Color analysis utilities for fashion recommendations."""
 
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
 import numpy as np
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# Leading colors per product kept in packed palettes and compared when scoring
+PALETTE_SIZE = 2
+
 
 def get_dominant_colors(
     image: Image.Image,
@@ -20,7 +23,7 @@ def get_dominant_colors(
         num_colors: Number of dominant colors to extract
         
     Returns:
-        List of RGB tuples
+        List of RGB tuples, most common first
     """
     try:
         # Resize for faster processing
@@ -40,8 +43,10 @@ def get_dominant_colors(
         kmeans = KMeans(n_clusters=min(num_colors, len(pixels)), random_state=42)
         kmeans.fit(pixels)
         
-        colors = kmeans.cluster_centers_.astype(int)
-        return [tuple(color) for color in colors]
+        # Order clusters by size so palettes can be truncated to the top colors
+        counts = np.bincount(kmeans.labels_, minlength=len(kmeans.cluster_centers_))
+        colors = kmeans.cluster_centers_[np.argsort(-counts)].astype(int)
+        return [tuple(int(c) for c in color) for color in colors]
     
     except ImportError:
         logger.warning("sklearn not available, using simpler color extraction")
@@ -98,6 +103,81 @@ def rgb_to_hsv(r: int, g: int, b: int) -> Tuple[float, float, float]:
     return h, s, v
 
 
+def rgb_to_hsv_array(rgb: np.ndarray) -> np.ndarray:
+    """
+    Vectorized rgb_to_hsv over an (..., 3) array of 0-255 RGB values.
+    
+    NaN inputs (missing colors) give NaN outputs.
+    
+    Returns:
+        (..., 3) array of (hue in degrees, saturation, value)
+    """
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    mx = rgb.max(axis=-1)
+    mn = rgb.min(axis=-1)
+    df = mx - mn
+    safe_df = np.where(df == 0, 1.0, df)
+    
+    h = np.where(
+        mx == r,
+        (60 * ((g - b) / safe_df) + 360) % 360,
+        np.where(
+            mx == g,
+            (60 * ((b - r) / safe_df) + 120) % 360,
+            (60 * ((r - g) / safe_df) + 240) % 360
+        )
+    )
+    h = np.where(df == 0, 0.0, h)
+    s = np.where(mx == 0, 0.0, df / np.where(mx == 0, 1.0, mx))
+    
+    return np.stack([h, s, mx], axis=-1)
+
+
+def pack_palettes(
+    palettes: Sequence[Optional[Sequence[Tuple[int, int, int]]]],
+    size: int = PALETTE_SIZE
+) -> np.ndarray:
+    """
+    Convert RGB palettes to a packed HSV array.
+    
+    Args:
+        palettes: One list of RGB colors (or None) per product
+        size: Leading colors kept per palette
+        
+    Returns:
+        (len(palettes), size, 3) float32 HSV array, NaN for missing colors
+    """
+    rgb = np.full((len(palettes), size, 3), np.nan)
+    for i, colors in enumerate(palettes):
+        if colors:
+            colors = np.asarray(colors[:size], dtype=np.float64).reshape(-1, 3)
+            rgb[i, :len(colors)] = colors
+    return rgb_to_hsv_array(rgb).astype(np.float32)
+
+
+def palette_similarity(query: np.ndarray, palettes: np.ndarray) -> np.ndarray:
+    """
+    color_similarity between every color of one palette and many palettes.
+    
+    Args:
+        query: (P, 3) HSV palette from pack_palettes
+        palettes: (N, Q, 3) HSV palettes from pack_palettes
+        
+    Returns:
+        (N, P, Q) similarities, NaN where either color is missing
+    """
+    query = query[np.newaxis, :, np.newaxis, :]
+    palettes = palettes[:, np.newaxis, :, :]
+    
+    hue_diff = np.abs(query[..., 0] - palettes[..., 0])
+    hue_diff = np.minimum(hue_diff, 360 - hue_diff) / 180.0
+    saturation_diff = np.abs(query[..., 1] - palettes[..., 1])
+    value_diff = np.abs(query[..., 2] - palettes[..., 2])
+    
+    return 1.0 - (hue_diff * 0.5 + saturation_diff * 0.25 + value_diff * 0.25)
+
+
 def color_similarity(
     color1: Tuple[int, int, int],
     color2: Tuple[int, int, int]
@@ -13,29 +13,32 @@ DEFAULT_IMAGE_SIZE = (224, 224)
 REQUEST_TIMEOUT = 10  # seconds
 
 
-def download_image(
+def fetch_image_bytes(
     url: str,
     timeout: int = REQUEST_TIMEOUT,
-    retries: int = 3
-) -> Optional[Image.Image]:
+    retries: int = 3,
+    session: Optional[requests.Session] = None
+) -> Optional[bytes]:
     """
-    Download and open an image from URL.
+    Download raw image bytes from URL.
     
     Args:
         url: Image URL
         timeout: Request timeout in seconds
         retries: Number of retry attempts
+        session: Optional session to reuse pooled connections
         
     Returns:
-        PIL Image object or None if download fails
+        Response body or None if download fails
     """
     if not url:
         logger.warning("Empty URL provided")
         return None
     
+    http = session or requests
     for attempt in range(retries):
         try:
-            response = requests.get(
+            response = http.get(
                 url,
                 timeout=timeout,
                 allow_redirects=True,
@@ -45,14 +48,8 @@ def download_image(
             )
             response.raise_for_status()
             
-            image = Image.open(BytesIO(response.content))
-            
-            # Convert to RGB if necessary
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-            
             logger.debug(f"Downloaded image from {url}")
-            return image
+            return response.content
         
         except requests.RequestException as e:
             if attempt < retries - 1:
@@ -60,13 +57,55 @@ def download_image(
             else:
                 logger.error(f"Failed to download image from {url}: {e}")
                 return None
-        except Exception as e:
-            logger.error(f"Failed to process downloaded image: {e}")
-            return None
     
     return None
 
 
+def decode_image(data: bytes) -> Optional[Image.Image]:
+    """
+    Decode image bytes into an RGB PIL Image.
+    
+    Args:
+        data: Encoded image bytes
+        
+    Returns:
+        PIL Image object or None if decoding fails
+    """
+    try:
+        image = Image.open(BytesIO(data))
+        
+        # Convert to RGB if necessary
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        
+        return image
+    except Exception as e:
+        logger.error(f"Failed to process downloaded image: {e}")
+        return None
+
+
+def download_image(
+    url: str,
+    timeout: int = REQUEST_TIMEOUT,
+    retries: int = 3
+) -> Optional[Image.Image]:
+    """
+    Download and open an image from URL.
+    
+    Args:
+        url: Image URL
+        timeout: Request timeout in seconds
+        retries: Number of retry attempts
+        
+    Returns:
+        PIL Image object or None if download fails
+    """
+    data = fetch_image_bytes(url, timeout=timeout, retries=retries)
+    if data is None:
+        return None
+    return decode_image(data)
+
+
 class ImageLoader:
     """Utility class for loading and preprocessing images."""
     
@@ -1,5 +1,6 @@
 """Vector database module using FAISS for similarity search."""
 
 from .product_index import ProductVectorIndex
+from .shop_index_manager import ShopIndexManager
 
-__all__ = ["ProductVectorIndex"]
+__all__ = ["ProductVectorIndex", "ShopIndexManager"]
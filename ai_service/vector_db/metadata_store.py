@@ -0,0 +1,251 @@
+"""Columnar, memory-mapped storage for product ids and metadata."""
+
+import json
+import logging
+import os
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - exercised only without msgpack
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = "columnar"
+STORE_VERSION = 1
+
+# Column files written next to the manifest, as "<metadata_path>.<name>.npy"
+COLUMNS = ("ids", "deleted", "keys", "offsets", "records")
+
+
+def column_path(metadata_path: str, name: str) -> str:
+    """Location of one column of the store."""
+    return f"{metadata_path}.{name}.npy"
+
+
+def atomic_write(path: str, write: Callable[[str], None]) -> None:
+    """
+    Write a file via a temporary path and rename it into place.
+
+    Readers that memory-mapped the previous file keep a valid mapping
+    instead of seeing it truncated underneath them.
+    """
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_array(path: str, array: np.ndarray) -> None:
+    """Atomically save an array as ``.npy`` (see ``atomic_write``)."""
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+    atomic_write(path, write)
+
+
+def _default_codec() -> str:
+    return "msgpack" if msgpack is not None else "json"
+
+
+def _encode(value: Dict, codec: str) -> bytes:
+    if codec == "msgpack":
+        return msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(data: bytes, codec: str) -> Dict:
+    if codec == "msgpack":
+        if msgpack is None:
+            raise RuntimeError(
+                "Metadata store was written with msgpack, which is not installed"
+            )
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+class LazyMetadata(MutableMapping):
+    """
+    Product id -> metadata mapping decoded on first access.
+
+    Records stay encoded in a memory-mapped buffer and are located by
+    binary search over the sorted key column. Decoded and newly written
+    entries are kept in an in-memory overlay, so callers can mutate the
+    returned dicts as they would a plain ``dict``.
+    """
+
+    def __init__(
+        self,
+        keys: np.ndarray,
+        offsets: np.ndarray,
+        records: np.ndarray,
+        codec: str
+    ):
+        """
+        Args:
+            keys: Sorted int64 product ids
+            offsets: Record boundaries, ``len(keys) + 1`` entries
+            records: Concatenated encoded records (uint8)
+            codec: "msgpack" or "json"
+        """
+        self._keys = keys
+        self._offsets = offsets
+        self._records = records
+        self.codec = codec
+        self._overlay: Dict[int, Dict] = {}
+        self._removed = set()
+
+    def _position(self, key) -> Optional[int]:
+        """Row of ``key`` in the stored columns, if present and not removed."""
+        if not isinstance(key, (int, np.integer)) or key in self._removed:
+            return None
+        pos = int(np.searchsorted(self._keys, key))
+        if pos < len(self._keys) and self._keys[pos] == key:
+            return pos
+        return None
+
+    def raw(self, key: int) -> Optional[bytes]:
+        """Encoded record for ``key`` if it is still unmodified on disk."""
+        if key in self._overlay:
+            return None
+        pos = self._position(key)
+        if pos is None:
+            return None
+        return bytes(self._records[self._offsets[pos]:self._offsets[pos + 1]])
+
+    def __getitem__(self, key: int) -> Dict:
+        if key in self._overlay:
+            return self._overlay[key]
+        data = self.raw(key)
+        if data is None:
+            raise KeyError(key)
+        value = _decode(data, self.codec)
+        self._overlay[key] = value
+        return value
+
+    def __setitem__(self, key: int, value: Dict) -> None:
+        self._overlay[key] = value
+
+    def __delitem__(self, key: int) -> None:
+        in_overlay = self._overlay.pop(key, None) is not None
+        stored = self._position(key) is not None
+        if stored:
+            self._removed.add(key)
+        if not (in_overlay or stored):
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._overlay or self._position(key) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        yield from self._overlay
+        for key in self._keys.tolist():
+            if key not in self._overlay and key not in self._removed:
+                yield key
+
+    def __len__(self) -> int:
+        added = sum(1 for key in self._overlay if self._position(key) is None)
+        return len(self._keys) - len(self._removed) + added
+
+    def decoded_count(self) -> int:
+        """Number of records decoded or written since load."""
+        return len(self._overlay)
+
+
+def write_store(
+    metadata_path: str,
+    product_ids: np.ndarray,
+    deleted_rows: np.ndarray,
+    metadata: Mapping[int, Dict]
+) -> None:
+    """
+    Write ids, tombstones and metadata as a columnar store.
+
+    ``metadata_path`` holds a small JSON manifest; the columns are ``.npy``
+    files beside it. Records untouched since a lazy load are copied without
+    being decoded.
+
+    Args:
+        metadata_path: Manifest path
+        product_ids: Product id of every row (int64)
+        deleted_rows: Tombstoned row numbers
+        metadata: Product id -> metadata dict
+    """
+    codec = _default_codec()
+    keys = np.array(sorted(int(key) for key in metadata), dtype=np.int64)
+    reuse = isinstance(metadata, LazyMetadata) and metadata.codec == codec
+
+    chunks = []
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    for pos, key in enumerate(keys.tolist()):
+        data = metadata.raw(key) if reuse else None
+        if data is None:
+            data = _encode(metadata[key], codec)
+        chunks.append(data)
+        offsets[pos + 1] = offsets[pos] + len(data)
+    records = np.frombuffer(b"".join(chunks), dtype=np.uint8)
+
+    columns = {
+        "ids": np.asarray(product_ids, dtype=np.int64),
+        "deleted": np.asarray(deleted_rows, dtype=np.int64),
+        "keys": keys,
+        "offsets": offsets,
+        "records": records,
+    }
+    for name in COLUMNS:
+        save_array(column_path(metadata_path, name), columns[name])
+
+    manifest = {
+        "format": STORE_FORMAT,
+        "version": STORE_VERSION,
+        "codec": codec,
+        "rows": len(product_ids),
+        "records": len(keys),
+    }
+
+    def write_manifest(tmp_path: str) -> None:
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+    # Manifest last, so it only ever points at complete columns
+    atomic_write(metadata_path, write_manifest)
+
+
+def read_store(
+    metadata_path: str,
+    manifest: Dict,
+    mmap: bool = True
+) -> Tuple[np.ndarray, np.ndarray, LazyMetadata]:
+    """
+    Open a columnar store written by ``write_store``.
+
+    Args:
+        metadata_path: Manifest path
+        manifest: Parsed manifest
+        mmap: Memory-map the columns read-only instead of reading them
+
+    Returns:
+        (product_ids, deleted_rows, metadata)
+
+    Raises:
+        ValueError: If the manifest has an unsupported version
+    """
+    if manifest.get("version") != STORE_VERSION:
+        raise ValueError(
+            f"Unsupported metadata store version: {manifest.get('version')}"
+        )
+
+    mmap_mode = "r" if mmap else None
+    columns = {
+        name: np.load(column_path(metadata_path, name), mmap_mode=mmap_mode)
+        for name in COLUMNS
+    }
+    metadata = LazyMetadata(
+        columns["keys"],
+        columns["offsets"],
+        columns["records"],
+        manifest["codec"]
+    )
+    return columns["ids"], columns["deleted"], metadata
@@ -3,12 +3,47 @@
 import json
 import logging
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, MutableMapping, Optional, Set, Tuple
 import numpy as np
 import faiss
 
+from ..utils.color_utils import PALETTE_SIZE, pack_palettes
+from .metadata_store import atomic_write, read_store, save_array, write_store
+
 logger = logging.getLogger(__name__)
 
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Bits per PQ sub-quantizer code (256 centroids each)
+PQ_NBITS = 8
+
+# FAISS warns below ~39 training points per IVF cell
+MIN_POINTS_PER_CELL = 39
+
+
+def _vectors_path(index_path: str) -> str:
+    """Location of the raw embedding matrix saved next to a FAISS index."""
+    return f"{index_path}.vectors.npy"
+
+
+def _palettes_path(index_path: str) -> str:
+    """Location of the packed HSV palettes saved next to a FAISS index."""
+    return f"{index_path}.palettes.npy"
+
+
+def _categories_path(index_path: str) -> str:
+    """Location of the per-row category codes saved next to a FAISS index."""
+    return f"{index_path}.categories.npy"
+
+
+def _category_names_path(index_path: str) -> str:
+    """Location of the category code -> name table."""
+    return f"{index_path}.category_names.npy"
+
+
+def _normalize_category(category: Optional[str]) -> str:
+    return (category or "").strip().lower()
+
 
 class ProductVectorIndex:
     """
@@ -16,21 +51,203 @@ class ProductVectorIndex:
     
     Manages a normalized index of product embeddings with associated metadata.
     Supports fast similarity search using cosine distance.
+    
+    Index types:
+    - flat: exact brute-force search (IndexFlatL2)
+    - ivf_flat: inverted lists over full vectors, tuned with nprobe
+    - ivf_pq: inverted lists over product-quantized codes, tuned with nprobe
+    - hnsw: graph-based search, tuned with ef_search
+    
+    IVF indexes need training. Vectors added before ``min_train_size`` is
+    reached are kept pending and searched exactly; the index is trained on
+    all stored vectors once enough have arrived.
+    
+    Each row also keeps the product's color palette (metadata "colors"),
+    converted to HSV once when added and packed into one array so
+    recommenders can score colors for many candidates at once.
+    
+    Live rows are also indexed by category (metadata "category", matched
+    case-insensitively), so ``search`` can be restricted to a few
+    categories without scanning the rest of the catalog.
+    
+    Re-adding a product replaces it. Replaced and removed rows are
+    tombstoned and skipped at search time, which works for every index
+    type (HNSW can't delete vectors); ``compact`` drops them once they
+    exceed ``max_deleted_ratio`` of the rows.
     """
 
-    def __init__(self, embedding_dim: int = 512):
+    def __init__(
+        self,
+        embedding_dim: int = 512,
+        index_type: str = "flat",
+        nlist: int = 1024,
+        nprobe: int = 16,
+        pq_m: int = 64,
+        hnsw_m: int = 32,
+        ef_search: int = 64,
+        min_train_size: int = 10000,
+        max_deleted_ratio: float = 0.1
+    ):
         """
         Initialize the vector index.
         
         Args:
             embedding_dim: Dimension of embeddings
+            index_type: One of INDEX_TYPES
+            nlist: Number of IVF cells (capped by training set size)
+            nprobe: IVF cells visited per query
+            pq_m: Sub-quantizers for ivf_pq (must divide embedding_dim)
+            hnsw_m: Graph neighbours per node for hnsw
+            ef_search: HNSW candidate list size per query
+            min_train_size: Vectors required before IVF indexes are trained
+            max_deleted_ratio: Tombstoned share of rows that triggers compact()
+            
+        Raises:
+            ValueError: If index_type is unknown or pq_m doesn't divide the dim
         """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}"
+            )
+        if index_type == "ivf_pq" and embedding_dim % pq_m != 0:
+            raise ValueError(
+                f"pq_m ({pq_m}) must divide embedding dimension ({embedding_dim})"
+            )
+        
         self.embedding_dim = embedding_dim
-        self.index = faiss.IndexFlatL2(embedding_dim)
-        self.product_ids: List[int] = []
-        self.metadata: Dict[int, Dict] = {}
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.min_train_size = min_train_size
+        self.max_deleted_ratio = max_deleted_ratio
+        
+        self.index = self._create_index(self.nlist)
+        self._mmapped = False
+        # Product id of every row; grown with the embedding matrix
+        self._ids = np.empty(0, dtype=np.int64)
+        self._num_rows = 0
+        self.metadata: MutableMapping[int, Dict] = {}
+        # Row bookkeeping so a product's own vector can be used as a query
+        self._row_by_id: Dict[int, int] = {}
+        self._embeddings = np.empty((0, embedding_dim), dtype=np.float32)
+        self._palettes = np.empty((0, PALETTE_SIZE, 3), dtype=np.float32)
+        # Category code of every row (-1: none) and live rows per category
+        self._category_codes = np.empty(0, dtype=np.int32)
+        self._category_names: List[str] = []
+        self._category_by_name: Dict[str, int] = {}
+        self._category_rows: Dict[int, Set[int]] = {}
+        # Rows of replaced or removed products, skipped at search time
+        self._deleted_rows: Set[int] = set()
+        
+        logger.info(
+            f"Initialized ProductVectorIndex ({index_type}) "
+            f"with dimension {embedding_dim}"
+        )
+    
+    def _create_index(self, nlist: int) -> "faiss.Index":
+        """Build an empty FAISS index for the configured index type."""
+        if self.index_type == "flat":
+            index = faiss.IndexFlatL2(self.embedding_dim)
+        elif self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(self.embedding_dim, self.hnsw_m)
+        else:
+            quantizer = faiss.IndexFlatL2(self.embedding_dim)
+            if self.index_type == "ivf_flat":
+                index = faiss.IndexIVFFlat(quantizer, self.embedding_dim, nlist)
+            else:
+                index = faiss.IndexIVFPQ(
+                    quantizer, self.embedding_dim, nlist, self.pq_m, PQ_NBITS
+                )
         
-        logger.info(f"Initialized ProductVectorIndex with dimension {embedding_dim}")
+        self._apply_search_params(index)
+        return index
+    
+    def _apply_search_params(self, index: "faiss.Index") -> None:
+        """Push nprobe / efSearch onto the index."""
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = self.ef_search
+            return
+        try:
+            faiss.extract_index_ivf(index).nprobe = self.nprobe
+        except RuntimeError:
+            pass  # Not an IVF index
+    
+    def set_search_params(
+        self,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> None:
+        """
+        Tune the recall/latency trade-off without rebuilding the index.
+        
+        Args:
+            nprobe: IVF cells visited per query
+            ef_search: HNSW candidate list size per query
+        """
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        self._apply_search_params(self.index)
+    
+    @property
+    def product_ids(self) -> np.ndarray:
+        """Product id of every row, including tombstoned rows (read-only)."""
+        view = self._ids[:self._num_rows]
+        view.flags.writeable = False
+        return view
+    
+    @property
+    def is_trained(self) -> bool:
+        """Whether the FAISS index is trained and serving searches."""
+        return self.index.is_trained
+    
+    def train(self) -> None:
+        """
+        (Re)build the index from all stored embeddings.
+        
+        IVF indexes are trained on the stored vectors, with nlist capped so
+        every cell gets enough training points. Useful after the catalog has
+        grown well past the size it was first trained on.
+        """
+        count = self._num_rows
+        vectors = self._embeddings[:count]
+        
+        nlist = min(self.nlist, max(1, count // MIN_POINTS_PER_CELL))
+        index = self._create_index(nlist)
+        if not index.is_trained:
+            logger.info(f"Training {self.index_type} index on {count} vectors")
+            index.train(vectors)
+        if count:
+            index.add(vectors)
+        self.index = index
+        self._mmapped = False
+    
+    def _sync_index(self) -> None:
+        """Add pending rows to FAISS, training the index first if required."""
+        pending = self._num_rows - self.index.ntotal
+        if pending <= 0:
+            return
+        
+        if not self.index.is_trained:
+            # PQ codebooks need at least one point per centroid
+            required = self.min_train_size
+            if self.index_type == "ivf_pq":
+                required = max(required, 2 ** PQ_NBITS)
+            if self._num_rows >= required:
+                self.train()
+            return
+        
+        if self._mmapped:
+            # Read-only mappings can't be appended to; take an in-memory copy
+            self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+            self._apply_search_params(self.index)
+            self._mmapped = False
+        
+        self.index.add(self._embeddings[self.index.ntotal:self._num_rows])
     
     def add_product(
         self,
@@ -58,8 +275,9 @@ class ProductVectorIndex:
         # Ensure float32 and 2D shape for FAISS
         embedding = embedding.astype(np.float32).reshape(1, -1)
         
-        self.index.add(embedding)
-        self.product_ids.append(product_id)
+        self._append_rows([product_id], embedding, [metadata])
+        self._sync_index()
+        self._maybe_compact()
         
         if metadata:
             self.metadata[product_id] = metadata
@@ -81,26 +299,110 @@ class ProductVectorIndex:
         
         # Validate and prepare embeddings
         embeddings = []
+        product_ids = []
+        metadatas = []
         for product_id, embedding, metadata in products:
             if embedding.shape[0] != self.embedding_dim:
                 logger.error(f"Skipping product {product_id}: dimension mismatch")
                 continue
             
             embeddings.append(embedding.astype(np.float32))
-            self.product_ids.append(product_id)
+            product_ids.append(product_id)
+            metadatas.append(metadata)
             
             if metadata:
                 self.metadata[product_id] = metadata
         
         if embeddings:
             embeddings_array = np.vstack(embeddings)
-            self.index.add(embeddings_array)
+            self._append_rows(product_ids, embeddings_array, metadatas)
+            self._sync_index()
             logger.info(f"Batch added {len(embeddings)} products to index")
+            self._maybe_compact()
+    
+    def upsert(
+        self,
+        product_id: int,
+        embedding: np.ndarray,
+        metadata: Optional[Dict] = None
+    ) -> None:
+        """
+        Insert a product or replace its existing embedding and metadata.
+        
+        Args:
+            product_id: Shopify product ID
+            embedding: Product embedding (must be float32)
+            metadata: Optional metadata dict with product info
+        """
+        self.add_product(product_id, embedding, metadata)
+    
+    def remove(self, product_id: int) -> bool:
+        """
+        Remove a product from the index.
+        
+        Args:
+            product_id: Shopify product ID
+            
+        Returns:
+            True if the product was indexed
+        """
+        row = self._row_by_id.pop(product_id, None)
+        self.metadata.pop(product_id, None)
+        if row is None:
+            return False
+        
+        self._deleted_rows.add(row)
+        self._unindex_category(row)
+        logger.debug(f"Removed product {product_id} from index")
+        self._maybe_compact()
+        return True
+    
+    def _maybe_compact(self) -> None:
+        """Compact once tombstones exceed max_deleted_ratio of the rows."""
+        if len(self._deleted_rows) > self.max_deleted_ratio * self._num_rows:
+            self.compact()
+    
+    def compact(self) -> None:
+        """
+        Drop tombstoned rows and rebuild the FAISS index from live rows.
+        
+        Trained IVF indexes keep their coarse quantizer and codebooks.
+        """
+        if not self._deleted_rows:
+            return
+        
+        live_rows = sorted(self._row_by_id.values())
+        self._ids = np.asarray(self._ids[live_rows])
+        self._num_rows = len(live_rows)
+        self._embeddings = np.ascontiguousarray(self._embeddings[live_rows])
+        self._palettes = np.ascontiguousarray(self._palettes[live_rows])
+        self._category_codes = np.asarray(self._category_codes[live_rows])
+        self._row_by_id = dict(zip(self._ids.tolist(), range(self._num_rows)))
+        logger.info(
+            f"Compacted index: dropped {len(self._deleted_rows)} stale rows, "
+            f"{self._num_rows} remain"
+        )
+        self._deleted_rows = set()
+        self._rebuild_category_rows()
+        
+        if self.index.is_trained and not isinstance(self.index, faiss.IndexHNSW):
+            # Flat and IVF indexes can be emptied in place (IVF keeps training)
+            index = faiss.clone_index(self.index)
+            index.reset()
+        else:
+            index = self._create_index(self.nlist)
+        self._apply_search_params(index)
+        self.index = index
+        self._mmapped = False
+        
+        if self.index.is_trained and self._num_rows:
+            self.index.add(self._embeddings)
     
     def search(
         self,
         embedding: np.ndarray,
-        k: int = 10
+        k: int = 10,
+        categories: Optional[Iterable[str]] = None
     ) -> Tuple[List[int], List[float]]:
         """
         Search for similar products using L2 distance (cosine for normalized vectors).
@@ -108,6 +410,8 @@ class ProductVectorIndex:
         Args:
             embedding: Query embedding (must be float32)
             k: Number of nearest neighbors to return
+            categories: Only return products in these categories. Searched
+                exactly over the categories' rows, via the category index.
             
         Returns:
             Tuple of (product_ids, distances)
@@ -115,7 +419,7 @@ class ProductVectorIndex:
         Raises:
             ValueError: If embedding dimension doesn't match or index is empty
         """
-        if len(self.product_ids) == 0:
+        if self.get_size() == 0:
             raise ValueError("Index is empty")
         
         if embedding.shape[0] != self.embedding_dim:
@@ -125,19 +429,79 @@ class ProductVectorIndex:
             )
         
         embedding = embedding.astype(np.float32).reshape(1, -1)
-        k = min(k, len(self.product_ids))
+        if categories is not None:
+            return self._search_categories(embedding[0], k, categories)
         
-        distances, indices = self.index.search(embedding, k)
+        k = min(k, self.get_size())
+        # Over-fetch so k live rows remain after dropping tombstones
+        fetch_k = min(k + len(self._deleted_rows), self._num_rows)
         
-        distances = distances[0].tolist()
-        product_ids = [self.product_ids[idx] for idx in indices[0]]
+        if self.index.is_trained:
+            distances, indices = self.index.search(embedding, fetch_k)
+            distances, indices = distances[0], indices[0]
+        else:
+            distances, indices = self._exact_search(embedding[0], fetch_k)
+        
+        # Approximate indexes pad with -1 when a probe yields fewer than k hits
+        hits = [
+            (int(idx), float(d)) for d, idx in zip(distances, indices)
+            if idx >= 0 and idx not in self._deleted_rows
+        ][:k]
+        product_ids = [int(self._ids[idx]) for idx, _ in hits]
+        distances = [d for _, d in hits]
         
         return product_ids, distances
     
+    def _exact_search(
+        self,
+        embedding: np.ndarray,
+        k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Brute-force squared L2 search over stored vectors.
+        
+        Searches all rows (untrained index) or just ``rows``, in which case
+        the returned indices are positions in ``rows``.
+        """
+        if rows is None:
+            vectors = self._embeddings[:self._num_rows]
+        else:
+            vectors = self._embeddings[rows]
+        distances = np.sum((vectors - embedding) ** 2, axis=1)
+        indices = np.argpartition(distances, k - 1)[:k]
+        indices = indices[np.argsort(distances[indices])]
+        return distances[indices], indices
+    
+    def _search_categories(
+        self,
+        embedding: np.ndarray,
+        k: int,
+        categories: Iterable[str]
+    ) -> Tuple[List[int], List[float]]:
+        """Exact top-k over the live rows of the given categories."""
+        rows: Set[int] = set()
+        for category in categories:
+            code = self._category_by_name.get(_normalize_category(category))
+            if code is not None:
+                rows.update(self._category_rows.get(code, ()))
+        if not rows or k <= 0:
+            return [], []
+        
+        rows_array = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        distances, positions = self._exact_search(
+            embedding, min(k, len(rows_array)), rows_array
+        )
+        return (
+            [int(self._ids[row]) for row in rows_array[positions]],
+            [float(d) for d in distances],
+        )
+    
     def search_with_metadata(
         self,
         embedding: np.ndarray,
-        k: int = 10
+        k: int = 10,
+        categories: Optional[Iterable[str]] = None
     ) -> List[Dict]:
         """
         Search and return products with full metadata.
@@ -145,18 +509,20 @@ class ProductVectorIndex:
         Args:
             embedding: Query embedding
             k: Number of results
+            categories: Only return products in these categories
             
         Returns:
             List of dicts with 'product_id', 'distance', and metadata
         """
-        product_ids, distances = self.search(embedding, k)
+        product_ids, distances = self.search(embedding, k, categories)
         
         results = []
         for prod_id, distance in zip(product_ids, distances):
             result = {
                 "product_id": prod_id,
                 "distance": float(distance),  # L2 distance for normalized vectors
-                "similarity": 1.0 - (distance ** 2 / 2),  # Convert to cosine similarity
+                # FAISS L2 returns squared distances: ||a - b||^2 = 2 - 2cos
+                "similarity": 1.0 - distance / 2,
             }
             if prod_id in self.metadata:
                 result.update(self.metadata[prod_id])
@@ -168,23 +534,39 @@ class ProductVectorIndex:
         """
         Save index and metadata to disk.
         
+        Metadata is written as a columnar store (see ``metadata_store``):
+        a small manifest at ``metadata_path`` plus ``.npy`` columns beside
+        it. Every file is replaced atomically, so saving over files this
+        index has memory-mapped is safe.
+        
         Args:
             index_path: Path to save FAISS index
-            metadata_path: Path to save metadata JSON
+            metadata_path: Path to save the metadata manifest
         """
         try:
             os.makedirs(os.path.dirname(index_path), exist_ok=True)
             os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
             
-            faiss.write_index(self.index, index_path)
+            atomic_write(
+                index_path,
+                lambda path: faiss.write_index(self.index, path)
+            )
             
-            # Save metadata and product IDs
-            metadata = {
-                "product_ids": self.product_ids,
-                "metadata": {str(k): v for k, v in self.metadata.items()}
-            }
-            with open(metadata_path, "w") as f:
-                json.dump(metadata, f, indent=2)
+            rows = self._num_rows
+            save_array(_vectors_path(index_path), self._embeddings[:rows])
+            save_array(_palettes_path(index_path), self._palettes[:rows])
+            save_array(_categories_path(index_path), self._category_codes[:rows])
+            save_array(
+                _category_names_path(index_path),
+                np.array(self._category_names, dtype=str)
+            )
+            
+            write_store(
+                metadata_path,
+                self.product_ids,
+                np.array(sorted(self._deleted_rows), dtype=np.int64),
+                self.metadata
+            )
             
             logger.info(f"Saved index to {index_path}")
             logger.info(f"Saved metadata to {metadata_path}")
@@ -192,33 +574,311 @@ class ProductVectorIndex:
             logger.error(f"Failed to save index: {e}")
             raise
     
-    def load(self, index_path: str, metadata_path: str) -> None:
+    def load(
+        self,
+        index_path: str,
+        metadata_path: str,
+        mmap: bool = False
+    ) -> None:
         """
         Load index and metadata from disk.
         
+        Metadata records are decoded lazily, on first access. Older
+        metadata files (a single JSON document) are still read.
+        
         Args:
             index_path: Path to FAISS index
-            metadata_path: Path to metadata JSON
+            metadata_path: Path to the metadata manifest or legacy JSON
+            mmap: Memory-map the index, vectors and metadata columns
+                read-only instead of reading them into memory. The index
+                is copied into memory the first time a product is added.
+                IVF indexes are always read into memory: their mmapped
+                inverted lists can't be copied, cloned or saved.
         """
         try:
-            self.index = faiss.read_index(index_path)
+            self._mmapped = False
+            if mmap:
+                self.index = faiss.read_index(
+                    index_path,
+                    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+                if faiss.try_extract_index_ivf(self.index) is not None:
+                    self.index = faiss.read_index(index_path)
+                else:
+                    self._mmapped = True
+            else:
+                self.index = faiss.read_index(index_path)
+            self._apply_search_params(self.index)
             
             with open(metadata_path, "r") as f:
                 data = json.load(f)
             
-            self.product_ids = data["product_ids"]
-            self.metadata = {int(k): v for k, v in data["metadata"].items()}
+            if "product_ids" in data:
+                # Legacy single-document JSON sidecar
+                ids = np.array(data["product_ids"], dtype=np.int64)
+                deleted_rows = data.get("deleted_rows", [])
+                self.metadata = {int(k): v for k, v in data["metadata"].items()}
+            else:
+                ids, deleted, self.metadata = read_store(
+                    metadata_path, data, mmap=mmap
+                )
+                deleted_rows = deleted.tolist()
+            
+            self._ids = ids
+            self._num_rows = len(ids)
+            self._deleted_rows = set(deleted_rows)
+            id_list = ids.tolist()
+            self._row_by_id = {
+                product_id: row for row, product_id in enumerate(id_list)
+                if row not in self._deleted_rows
+            }
+            # Older files may hold duplicate rows for re-added products
+            if len(self._row_by_id) + len(self._deleted_rows) != self._num_rows:
+                self._deleted_rows.update(
+                    row for row, product_id in enumerate(id_list)
+                    if self._row_by_id.get(product_id) != row
+                )
+            vectors_path = _vectors_path(index_path)
+            if os.path.exists(vectors_path):
+                self._embeddings = np.load(
+                    vectors_path,
+                    mmap_mode="r" if mmap else None
+                )
+            else:
+                # Indexes saved before vectors were persisted are always flat
+                self._embeddings = self.index.reconstruct_n(0, self.index.ntotal)
+            
+            palettes_path = _palettes_path(index_path)
+            if os.path.exists(palettes_path):
+                self._palettes = np.load(palettes_path)
+            else:
+                # Older saves: convert palettes from metadata once
+                self._palettes = pack_palettes([
+                    (self.metadata.get(product_id) or {}).get("colors")
+                    for product_id in id_list
+                ])
+            
+            categories_path = _categories_path(index_path)
+            if os.path.exists(categories_path):
+                self._category_codes = np.load(categories_path)
+                self._category_names = np.load(
+                    _category_names_path(index_path)
+                ).tolist()
+                self._category_by_name = {
+                    name: code for code, name in enumerate(self._category_names)
+                }
+            else:
+                # Older saves: build category codes from metadata once
+                self._category_names = []
+                self._category_by_name = {}
+                self._category_codes = self._encode_categories([
+                    (self.metadata.get(product_id) or {}).get("category")
+                    for product_id in id_list
+                ])
+            self._rebuild_category_rows()
             
             logger.info(f"Loaded index from {index_path}")
-            logger.info(f"Loaded {len(self.product_ids)} products")
+            logger.info(f"Loaded {self._num_rows} products")
         except Exception as e:
             logger.error(f"Failed to load index: {e}")
             raise
     
     def get_size(self) -> int:
         """Get number of products in index."""
-        return len(self.product_ids)
+        return len(self._row_by_id)
+    
+    def memory_bytes(self) -> int:
+        """
+        Estimate the footprint of the vectors held by this index.
+        
+        Counts the stored embedding matrix plus the FAISS codes (and HNSW
+        graph links). Metadata dicts are not included.
+        """
+        count = self._num_rows
+        vector_bytes = self.embedding_dim * 4
+        if self.index_type == "ivf_pq":
+            code_bytes = self.pq_m + 8  # PQ code + stored id
+        elif self.index_type == "ivf_flat":
+            code_bytes = vector_bytes + 8
+        elif self.index_type == "hnsw":
+            code_bytes = vector_bytes + self.hnsw_m * 2 * 4
+        else:
+            code_bytes = vector_bytes
+        return count * (vector_bytes + code_bytes)
     
     def get_metadata(self, product_id: int) -> Optional[Dict]:
         """Get metadata for a product."""
         return self.metadata.get(product_id)
+    
+    def update_metadata(self, product_id: int, updates: Dict) -> None:
+        """
+        Update a product's metadata fields, keeping the category index in sync.
+        
+        Args:
+            product_id: Shopify product ID
+            updates: Fields to set
+        """
+        metadata = self.metadata.get(product_id)
+        if metadata is None:
+            metadata = self.metadata[product_id] = {}
+        metadata.update(updates)
+        
+        row = self._row_by_id.get(product_id)
+        if "category" in updates and row is not None:
+            self._unindex_category(row)
+            code = int(self._encode_categories([updates["category"]])[0])
+            self._category_codes[row] = code
+            if code >= 0:
+                self._category_rows.setdefault(code, set()).add(row)
+    
+    def get_categories(self) -> Dict[str, int]:
+        """Number of live products per (lower-cased) category."""
+        return {
+            self._category_names[code]: len(rows)
+            for code, rows in self._category_rows.items() if rows
+        }
+    
+    def get_product_ids(self) -> List[int]:
+        """Get IDs of all live (not removed) products."""
+        return list(self._row_by_id)
+    
+    def has_product(self, product_id: int) -> bool:
+        """Check whether a product has an embedding in the index."""
+        return product_id in self._row_by_id
+    
+    def get_embedding(self, product_id: int) -> Optional[np.ndarray]:
+        """
+        Get the stored embedding for a product.
+        
+        Args:
+            product_id: Shopify product ID
+            
+        Returns:
+            Embedding vector (float32) or None if the product is not indexed
+        """
+        row = self._row_by_id.get(product_id)
+        if row is None:
+            return None
+        return self._embeddings[row].copy()
+    
+    def get_palettes(self, product_ids: List[int]) -> np.ndarray:
+        """
+        Get packed HSV palettes for products.
+        
+        Args:
+            product_ids: Shopify product IDs
+            
+        Returns:
+            (len(product_ids), PALETTE_SIZE, 3) float32 array, NaN for
+            missing colors and products that aren't indexed
+        """
+        palettes = np.full(
+            (len(product_ids), PALETTE_SIZE, 3), np.nan, dtype=np.float32
+        )
+        rows = [self._row_by_id.get(product_id) for product_id in product_ids]
+        found = [i for i, row in enumerate(rows) if row is not None]
+        if found:
+            palettes[found] = self._palettes[[rows[i] for i in found]]
+        return palettes
+    
+    def get_embeddings(self) -> np.ndarray:
+        """
+        Get the embedding matrix, one row per entry in ``product_ids``.
+        
+        Rows of replaced or removed products stay in place until compact().
+        
+        Returns:
+            Read-only (N, embedding_dim) float32 array
+        """
+        view = self._embeddings[:self._num_rows]
+        view.flags.writeable = False
+        return view
+    
+    @staticmethod
+    def _grown(array: np.ndarray, used: int, needed: int) -> np.ndarray:
+        """
+        Return ``array`` with room for ``needed`` rows.
+        
+        Grows geometrically to keep appends amortized O(1).
+        """
+        if needed <= array.shape[0]:
+            return array
+        capacity = max(needed, array.shape[0] * 2, 64)
+        grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:used] = array[:used]
+        return grown
+    
+    def _encode_categories(self, categories: List[Optional[str]]) -> np.ndarray:
+        """Map category names to codes, registering new ones (-1: none)."""
+        codes = np.full(len(categories), -1, dtype=np.int32)
+        for i, category in enumerate(categories):
+            name = _normalize_category(category)
+            if not name:
+                continue
+            code = self._category_by_name.get(name)
+            if code is None:
+                code = self._category_by_name[name] = len(self._category_names)
+                self._category_names.append(name)
+            codes[i] = code
+        return codes
+    
+    def _unindex_category(self, row: int) -> None:
+        """Drop a replaced or removed row from its category."""
+        code = int(self._category_codes[row])
+        if code >= 0:
+            self._category_rows.get(code, set()).discard(row)
+    
+    def _rebuild_category_rows(self) -> None:
+        """Rebuild category -> live rows from the per-row codes."""
+        codes = self._category_codes[:self._num_rows]
+        live = codes >= 0
+        if self._deleted_rows:
+            live[list(self._deleted_rows)] = False
+        
+        # Group live rows by code with one sort instead of a scan per category
+        rows = np.flatnonzero(live)
+        order = np.argsort(codes[rows], kind="stable")
+        rows = rows[order]
+        bounds = np.searchsorted(
+            codes[rows], np.arange(len(self._category_names) + 1)
+        )
+        self._category_rows = {
+            code: set(rows[bounds[code]:bounds[code + 1]].tolist())
+            for code in range(len(self._category_names))
+        }
+    
+    def _append_rows(
+        self,
+        product_ids: List[int],
+        embeddings: np.ndarray,
+        metadatas: List[Optional[Dict]]
+    ) -> None:
+        """Record product_id -> row mapping and keep per-row vectors/palettes."""
+        start = self._num_rows
+        needed = start + len(product_ids)
+        
+        self._embeddings = self._grown(self._embeddings, start, needed)
+        self._ids = self._grown(self._ids, start, needed)
+        self._palettes = self._grown(self._palettes, start, needed)
+        self._category_codes = self._grown(self._category_codes, start, needed)
+        
+        metadatas = [metadata or {} for metadata in metadatas]
+        codes = self._encode_categories(
+            [metadata.get("category") for metadata in metadatas]
+        )
+        self._embeddings[start:needed] = embeddings
+        self._ids[start:needed] = product_ids
+        self._palettes[start:needed] = pack_palettes(
+            [metadata.get("colors") for metadata in metadatas]
+        )
+        self._category_codes[start:needed] = codes
+        for offset, product_id in enumerate(product_ids):
+            row = start + offset
+            previous = self._row_by_id.get(product_id)
+            if previous is not None:
+                self._deleted_rows.add(previous)
+                self._unindex_category(previous)
+            self._row_by_id[product_id] = row
+            if codes[offset] >= 0:
+                self._category_rows.setdefault(int(codes[offset]), set()).add(row)
+        self._num_rows = needed
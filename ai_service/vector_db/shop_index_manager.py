@@ -0,0 +1,212 @@
+"""Per-shop sharded vector indexes with lazy loading and LRU eviction."""
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from .product_index import ProductVectorIndex
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "faiss.index"
+METADATA_FILENAME = "metadata.json"
+
+# Shopify shop domains, e.g. "my-store.myshopify.com"
+_SHOP_PATTERN = re.compile(r"^[a-z0-9][a-z0-9.-]*$")
+
+
+class ShopIndexManager:
+    """
+    Keeps one ProductVectorIndex per shop, loaded on demand.
+
+    Each shop's index lives under ``<base_dir>/<shop>/``. The first access
+    memory-maps the shop's FAISS file; least-recently used shops are evicted
+    once the estimated footprint of loaded shards exceeds the memory budget.
+    Shards are persisted with ``save(shop, index)`` after writes, so
+    eviction never loses data.
+    """
+
+    def __init__(
+        self,
+        base_dir: str,
+        index_factory: Callable[[], ProductVectorIndex],
+        memory_budget_bytes: int = 2 * 1024 ** 3,
+        mmap: bool = True
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            base_dir: Directory holding one sub-directory per shop
+            index_factory: Builds an empty, configured ProductVectorIndex
+            memory_budget_bytes: Estimated bytes of loaded shards to keep
+            mmap: Memory-map shard files instead of reading them into memory
+        """
+        self.base_dir = base_dir
+        self.index_factory = index_factory
+        self.memory_budget_bytes = memory_budget_bytes
+        self.mmap = mmap
+
+        self._shards: "OrderedDict[str, ProductVectorIndex]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        logger.info(
+            f"Initialized ShopIndexManager at {base_dir} "
+            f"(budget: {memory_budget_bytes / 1024 ** 2:.0f} MB)"
+        )
+
+    def _shard_dir(self, shop: str) -> str:
+        """Directory for a shop's index files."""
+        shop = shop.strip().lower()
+        if not _SHOP_PATTERN.match(shop) or ".." in shop:
+            raise ValueError(f"Invalid shop domain: {shop!r}")
+        return os.path.join(self.base_dir, shop)
+
+    def get(self, shop: str, create: bool = False) -> ProductVectorIndex:
+        """
+        Get a shop's index, loading it from disk on first access.
+
+        Shops with no saved index get a new, empty index. It is only kept
+        resident when ``create`` is set, so lookups for unknown shops can't
+        fill the cache.
+
+        Args:
+            shop: Shop domain
+            create: Cache a new index if the shop has none yet (for writes)
+
+        Returns:
+            The shop's ProductVectorIndex
+
+        Raises:
+            ValueError: If the shop domain is invalid
+        """
+        shard_dir = self._shard_dir(shop)
+        key = os.path.basename(shard_dir)
+
+        with self._lock:
+            index = self._shards.get(key)
+            if index is not None:
+                self.hits += 1
+                self._shards.move_to_end(key)
+                return index
+
+            self.misses += 1
+            index = self.index_factory()
+            index_path = os.path.join(shard_dir, INDEX_FILENAME)
+            if os.path.exists(index_path):
+                index.load(
+                    index_path,
+                    os.path.join(shard_dir, METADATA_FILENAME),
+                    mmap=self.mmap
+                )
+                logger.info(f"Loaded index for {key} ({index.get_size()} products)")
+            elif not create:
+                return index
+
+            self._shards[key] = index
+            self._evict(keep=key)
+            return index
+
+    def save(self, shop: str, index: Optional[ProductVectorIndex] = None) -> bool:
+        """
+        Persist a shop index to disk.
+
+        Pass the index that was written to: a long write can outlive the
+        shard's stay in the cache, and the evicted copy must still be saved.
+        If another request has reloaded the shard in the meantime, that
+        stale copy is dropped so the next access reads the saved one.
+
+        Args:
+            shop: Shop domain
+            index: The shop's index (defaults to the resident shard)
+
+        Returns:
+            True if the index was saved, False if there was nothing to save
+        """
+        shard_dir = self._shard_dir(shop)
+        key = os.path.basename(shard_dir)
+
+        with self._lock:
+            resident = self._shards.get(key)
+            if index is None:
+                index = resident
+            if index is None:
+                logger.warning(f"Index for {key} is not loaded; nothing saved")
+                return False
+            index.save(
+                os.path.join(shard_dir, INDEX_FILENAME),
+                os.path.join(shard_dir, METADATA_FILENAME)
+            )
+            if resident is not None and resident is not index:
+                del self._shards[key]
+            # Writes may have grown the shard past the budget
+            self._evict(keep=key)
+            return True
+
+    def import_index(self, shop: str, index_path: str, metadata_path: str) -> bool:
+        """
+        Copy a standalone index (e.g. the old global one) into a shop's shard.
+
+        Does nothing if the shop already has a saved index, so it is safe
+        to run on every startup.
+
+        Args:
+            shop: Shop domain that owns the index
+            index_path: Path to the FAISS index
+            metadata_path: Path to its metadata
+
+        Returns:
+            True if the index was imported
+        """
+        shard_dir = self._shard_dir(shop)
+        if os.path.exists(os.path.join(shard_dir, INDEX_FILENAME)):
+            return False
+
+        index = self.index_factory()
+        index.load(index_path, metadata_path)
+        self.save(shop, index)
+        logger.info(
+            f"Imported {index.get_size()} products from {index_path} "
+            f"into {os.path.basename(shard_dir)}"
+        )
+        return True
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop least-recently used shards until under the memory budget."""
+        while self.memory_bytes() > self.memory_budget_bytes:
+            victim = next(iter(self._shards))
+            if victim == keep:
+                # Never evict the shard currently being served
+                if len(self._shards) == 1:
+                    return
+                self._shards.move_to_end(victim)
+                continue
+            del self._shards[victim]
+            self.evictions += 1
+            logger.info(f"Evicted index for {victim}")
+
+    def memory_bytes(self) -> int:
+        """Estimated footprint of all loaded shards."""
+        return sum(index.memory_bytes() for index in self._shards.values())
+
+    def loaded_shops(self) -> int:
+        """Number of shards currently resident."""
+        return len(self._shards)
+
+    def get_stats(self) -> Dict:
+        """Cache counters for health and metrics endpoints."""
+        with self._lock:
+            return {
+                "loaded_shops": len(self._shards),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_bytes": self.memory_bytes(),
+                "memory_budget_bytes": self.memory_budget_bytes,
+            }
@@ -1,42 +1,110 @@
 import os
 import asyncio
 import logging
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Dict, List, Optional
 from functools import partial
 
+from app.ai.services.batcher import DynamicBatcher
+from app.ai.services.model_runtime import InferenceExecutor, InferenceQueueFull, inference_executor
+
 logger = logging.getLogger(__name__)
 
 
+def _enable_padding(pipeline: Any) -> None:
+    """Let a text-generation pipeline pad batches of different lengths.
+
+    GPT-style tokenizers ship without a pad token, and decoder-only models
+    must be padded on the left to generate correctly.
+    """
+    tokenizer = getattr(pipeline, "tokenizer", None)
+    if tokenizer is None:
+        return
+    if getattr(tokenizer, "pad_token", None) is None and getattr(tokenizer, "eos_token", None) is not None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+
+
 class AIService:
     """Central AI service abstraction with lazy model loading and caching.
 
     - Imports heavy model libraries lazily to avoid startup overhead.
-    - Uses threadpool to run blocking inference so endpoints remain async.
+    - Runs model loads and blocking inference on a dedicated, bounded
+      executor (`InferenceExecutor`) so endpoints remain async.
+    - Batches concurrent requests into shared forward passes (`DynamicBatcher`).
     - Exposes a simple `infer` coroutine.
     """
 
-    def __init__(self, model_name: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        max_batch_size: Optional[int] = None,
+        max_batch_wait_ms: Optional[float] = None,
+        executor: Optional[InferenceExecutor] = None,
+    ) -> None:
         self.model_name = model_name or os.getenv("AI_MODEL_NAME", "gpt2")
         self._pipeline = None
-        self._load_lock = asyncio.Lock()
+        self._executor = executor or inference_executor
+        # Concurrent requests share forward passes; a batch size of 1 turns
+        # batching off and runs each prompt on its own as before
+        batch_size = max_batch_size or int(os.getenv("AI_MAX_BATCH_SIZE", "8"))
+        wait_ms = max_batch_wait_ms if max_batch_wait_ms is not None else float(os.getenv("AI_BATCH_WAIT_MS", "10"))
+        self._batcher = (
+            DynamicBatcher(
+                self._run_batch,
+                max_batch_size=batch_size,
+                max_wait=wait_ms / 1000.0,
+                executor=self._executor,
+            )
+            if batch_size > 1
+            else None
+        )
 
     async def _load_pipeline(self) -> Any:
         if self._pipeline:
             return self._pipeline
-        async with self._load_lock:
-            if self._pipeline:
-                return self._pipeline
-            # Lazy import to avoid requiring transformers at import-time
-            # Delegate to the pipeline loader which handles caching and lazy imports
-            from app.ai.pipelines.text_pipeline import get_text_pipeline
-
-            try:
-                self._pipeline = await get_text_pipeline(self.model_name)
-            except Exception as e:
-                logger.exception("Failed to initialize pipeline: %s", e)
-                raise RuntimeError("Model libraries are not available") from e
-            logger.info("Loaded model pipeline: %s", self.model_name)
-            return self._pipeline
+        # Lazy import to avoid requiring transformers at import-time
+        # Delegate to the pipeline loader which handles caching, lazy imports
+        # and sharing one load between concurrent callers
+        from app.ai.pipelines.text_pipeline import get_text_pipeline
+
+        try:
+            self._pipeline = await get_text_pipeline(self.model_name)
+        except Exception as e:
+            logger.exception("Failed to initialize pipeline: %s", e)
+            raise RuntimeError("Model libraries are not available") from e
+        logger.info("Loaded model pipeline: %s", self.model_name)
+        return self._pipeline
+
+    def _run_batch(self, prompts: List[str], max_tokens: int) -> List[Any]:
+        """Blocking forward pass over several prompts (runs in the executor)."""
+        pipeline = self._pipeline
+        if len(prompts) == 1:
+            return [pipeline(prompts[0], max_length=max_tokens)]
+        _enable_padding(pipeline)
+        # A list input returns one list of generations per prompt
+        return list(pipeline(prompts, max_length=max_tokens, batch_size=len(prompts)))
+
+    async def warm_up(self, prompt: str = "Hello", max_tokens: int = 8) -> bool:
+        """Load the model and run one short generation ahead of traffic.
+
+        Meant for startup, so the first real request does not pay for the
+        model load or the first (slowest) forward pass. Returns False if the
+        model could not be loaded or run; the service then degrades as usual.
+        """
+        start = time.perf_counter()
+        try:
+            await self._load_pipeline()
+            await self._executor.run(self._run_batch, [prompt], max_tokens)
+        except Exception:
+            logger.warning("Model warm-up failed for %s", self.model_name, exc_info=True)
+            return False
+        logger.info("Model %s warmed up in %.2fs", self.model_name, time.perf_counter() - start)
+        return True
+
+    async def close(self) -> None:
+        if self._batcher is not None:
+            await self._batcher.close()
 
     async def infer(self, prompt: str, max_tokens: int = 128, timeout: float = 10.0) -> Dict[str, Any]:
         """Run inference asynchronously with timeout and basic structured response.
@@ -50,18 +118,22 @@ class AIService:
             logger.warning("Model unavailable; returning degraded response")
             return {"text": "[model unavailable]", "confidence": 0.0, "model": None}
 
-        loop = asyncio.get_running_loop()
-        # Prepare blocking call in executor
-        func = partial(pipeline, prompt, max_length=max_tokens)
         try:
-            import time
             start = time.perf_counter()
-            result = await asyncio.wait_for(loop.run_in_executor(None, func), timeout=timeout)
+            if self._batcher is not None:
+                result = await asyncio.wait_for(self._batcher.submit(prompt, max_tokens), timeout=timeout)
+            else:
+                # Prepare blocking call in executor
+                func = partial(pipeline, prompt, max_length=max_tokens)
+                result = await asyncio.wait_for(self._executor.run(func), timeout=timeout)
             elapsed = time.perf_counter() - start
             logger.info("Inference completed in %.3fs for model=%s", elapsed, self.model_name)
         except asyncio.TimeoutError:
             logger.exception("Model inference timed out")
             return {"text": "[timeout]", "confidence": 0.0, "model": self.model_name}
+        except InferenceQueueFull:
+            logger.warning("Inference queue full; shedding request for model=%s", self.model_name)
+            return {"text": "[busy]", "confidence": 0.0, "model": self.model_name}
         except Exception:
             logger.exception("Model inference failed")
             return {"text": "[inference_error]", "confidence": 0.0, "model": self.model_name}
@@ -96,6 +96,17 @@ class AIServiceWithCircuitBreaker:
         self._emit_metric("inference_fallback", {"model": getattr(self._ai, "model_name", None)})
         return {"text": "[unavailable]", "confidence": 0.0, "model": getattr(self._ai, "model_name", None)}
 
+    async def warm_up(self) -> bool:
+        warm_up = getattr(self._ai, "warm_up", None)
+        if warm_up is None:
+            return False
+        return await warm_up()
+
+    async def close(self) -> None:
+        close = getattr(self._ai, "close", None)
+        if close is not None:
+            await close()
+
     async def infer(self, prompt: str, max_tokens: int = 128, timeout: Optional[float] = None) -> Dict[str, Any]:
         # If open, check reset window
         if self._state == "OPEN":
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+from app.core.metrics import emit_metric
+
+logger = logging.getLogger(__name__)
+
+# Runs one forward pass: (prompts, max_tokens) -> one result per prompt
+BatchRunner = Callable[[List[str], int], List[Any]]
+
+
+class DynamicBatcher:
+    """Queue concurrent generation requests and run them as one batch.
+
+    A background task on the running loop waits for the first request,
+    then keeps collecting until `max_batch_size` requests are queued or
+    `max_wait` seconds have passed, runs the batch on `executor` (the
+    loop's default executor if none is given) and resolves each caller's
+    future with its own result. Requests whose caller already gave up
+    (e.g. timed out) are dropped before the batch runs. Only requests
+    with the same `max_tokens` share a batch, since the pipeline takes one
+    generation config per call.
+
+    While a batch runs, new requests pile up and form the next one, so
+    batches grow with load and an idle service adds at most `max_wait`
+    of latency.
+    """
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_batch_size: int = 8,
+        max_wait: float = 0.01,
+        executor: Optional[Any] = None,
+    ) -> None:
+        self._run_batch = run_batch
+        self._executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self._pending: Deque[Tuple[str, int, asyncio.Future]] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {"requests": 0, "batches": 0, "dropped": 0}
+
+    async def submit(self, prompt: str, max_tokens: int) -> Any:
+        """Queue one prompt and wait for its result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._pending.append((prompt, max_tokens, future))
+        self.stats["requests"] += 1
+        emit_metric("ai_batch_queue_depth", {"value": len(self._pending)})
+        self._wakeup.set()
+        return await future
+
+    def _ensure_worker(self) -> None:
+        """Start the batching task on the running loop if needed."""
+        loop = asyncio.get_running_loop()
+        task = self._task
+        if self._loop is loop and task is not None and not task.done():
+            return
+        # Futures queued on a previous loop can never be resolved
+        self._pending.clear()
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await self._collect()
+            batch = self._take_batch()
+            # Requests left over (other lengths, overflow) start the next round
+            if self._pending:
+                self._wakeup.set()
+            else:
+                self._wakeup.clear()
+            if batch:
+                await self._execute(batch)
+
+    async def _collect(self) -> None:
+        """Wait for a full batch or until `max_wait` has passed."""
+        deadline = self._loop.time() + self.max_wait
+        while len(self._pending) < self.max_batch_size:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def _take_batch(self) -> List[Tuple[str, int, asyncio.Future]]:
+        batch: List[Tuple[str, int, asyncio.Future]] = []
+        skipped: List[Tuple[str, int, asyncio.Future]] = []
+        max_tokens = None
+        while self._pending and len(batch) < self.max_batch_size:
+            item = self._pending.popleft()
+            if item[2].done():
+                self.stats["dropped"] += 1
+                continue
+            if max_tokens is None:
+                max_tokens = item[1]
+            if item[1] == max_tokens:
+                batch.append(item)
+            else:
+                skipped.append(item)
+        # Other generation lengths keep their place at the front of the queue
+        self._pending.extendleft(reversed(skipped))
+        emit_metric("ai_batch_queue_depth", {"value": len(self._pending)})
+        return batch
+
+    async def _execute(self, batch: List[Tuple[str, int, asyncio.Future]]) -> None:
+        prompts = [prompt for prompt, _, _ in batch]
+        max_tokens = batch[0][1]
+        self.stats["batches"] += 1
+        emit_metric("ai_batch_size", {"value": len(batch)})
+        start = time.perf_counter()
+        try:
+            if self._executor is not None:
+                results = await self._executor.run(self._run_batch, prompts, max_tokens)
+            else:
+                results = await self._loop.run_in_executor(
+                    None, self._run_batch, prompts, max_tokens
+                )
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"Batch returned {len(results)} results for {len(batch)} prompts"
+                )
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        logger.info(
+            "Inference batch of %d completed in %.3fs",
+            len(batch),
+            time.perf_counter() - start,
+        )
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Stop the batching task; queued requests are cancelled."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        while self._pending:
+            self._pending.popleft()[2].cancel()
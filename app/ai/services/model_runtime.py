@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import emit_metric
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[str], Any]
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the inference executor already has `max_pending` jobs."""
+
+
+class InferenceExecutor:
+    """Dedicated, size-limited thread pool for model work.
+
+    Model loads and forward passes used to go to the loop's default
+    executor, where they competed with every other ``run_in_executor``
+    user. Here at most ``max_workers`` jobs run at once and at most
+    ``max_pending`` are accepted (running plus queued); past that,
+    ``run`` fails fast with ``InferenceQueueFull`` instead of piling up
+    prompts and activations in memory. Jobs whose caller gave up before a
+    worker picked them up are dropped. The time each job waits for a
+    worker is recorded as ``ai_executor_queue_wait``.
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, max_pending: Optional[int] = None
+    ) -> None:
+        max_workers = max_workers or int(os.getenv("AI_EXECUTOR_WORKERS", "2"))
+        max_pending = max_pending or int(os.getenv("AI_EXECUTOR_MAX_PENDING", "32"))
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="ai-inference"
+                )
+            return self._pool
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run `func(*args)` on a worker thread and await its result."""
+        if not self._slots.acquire(blocking=False):
+            emit_metric("ai_executor_rejected", {})
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self.max_pending} jobs)"
+            )
+        submitted = time.perf_counter()
+
+        def job() -> Any:
+            waited = time.perf_counter() - submitted
+            emit_metric("ai_executor_queue_wait", {"value": waited})
+            return func(*args)
+
+        try:
+            future = self._get_pool().submit(job)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Also runs when a queued job is cancelled, so the slot is never lost
+        future.add_done_callback(lambda _: self._slots.release())
+        # Cancelling the awaiting task cancels the job if it has not started
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """Drop queued jobs and stop the workers; the next `run` starts new ones."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ModelRuntime:
+    """Loads models once per process, off the event loop.
+
+    The first caller for a model name starts the load on the inference
+    executor; concurrent callers await that same load instead of starting
+    their own, so a burst of cold requests loads the weights once. A failed
+    load is not cached and the next caller retries it.
+    """
+
+    def __init__(self, executor: InferenceExecutor) -> None:
+        self.executor = executor
+        self._models: Dict[str, Any] = {}
+        # Tasks are bound to their loop, so in-flight loads are per loop
+        self._inflight: Dict[Tuple[str, asyncio.AbstractEventLoop], asyncio.Task] = {}
+
+    def loaded(self, name: str) -> bool:
+        return name in self._models
+
+    async def get(self, name: str, loader: Loader) -> Any:
+        """Return the model called `name`, loading it with `loader(name)` if needed."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        loop = asyncio.get_running_loop()
+        key = (name, loop)
+        task = self._inflight.get(key)
+        if task is None:
+            task = loop.create_task(self._load(name, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # One caller timing out must not cancel the load for everyone else
+        return await asyncio.shield(task)
+
+    async def _load(self, name: str, loader: Loader) -> Any:
+        start = time.perf_counter()
+        model = await self.executor.run(loader, name)
+        self._models[name] = model
+        logger.info("Model %s loaded in %.2fs", name, time.perf_counter() - start)
+        return model
+
+    def _finish(self, key, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Model load failed for %s: %s", key[0], task.exception())
+
+    def evict(self, name: str) -> None:
+        self._models.pop(name, None)
+
+    def clear(self) -> None:
+        self._models.clear()
+        self._inflight.clear()
+
+
+inference_executor = InferenceExecutor()
+model_runtime = ModelRuntime(inference_executor)
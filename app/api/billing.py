@@ -2,21 +2,15 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Request, HTTPException
 from sqlalchemy.orm import Session
-from app.db.models import SessionLocal, Shop
+from app.db.models import Shop
+from app.db.session import get_db
 
 from app.services.billing_service import BillingService
+from app.services.entitlement_cache import entitlement_cache
 
 router = APIRouter(prefix="/billing", tags=["billing"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 def get_billing_backend(request: Request, db: Session):
     """Prefer the app-scoped in-memory store for local debug runs."""
     return getattr(request.app.state, "store", None) or db
@@ -64,6 +58,9 @@ async def billing_webhook(request: Request, db: Session = Depends(get_db)):
     if not shop:
         raise HTTPException(status_code=404, detail="Shop not found")
 
+    # Subscription state may have changed behind our back
+    entitlement_cache.invalidate(shop_domain)
+
     if topic == "app/subscriptions/update":
         # Handle subscription updates
         pass
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import hashlib
 import hmac
@@ -16,23 +17,17 @@ import requests
 from fastapi import APIRouter, HTTPException, Request, Depends, Response, Cookie
 from starlette.responses import JSONResponse, RedirectResponse
 from sqlalchemy.orm import Session
-from app.db.models import SessionLocal, Shop
+from app.db.models import Shop
+from app.db.session import get_db
 
 from app.core.config import settings
 from app.core.security import verify_oauth_hmac
-from app.services.shopify_client import ShopifyClient
+from app.services.shopify_client import AsyncShopifyClient
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 SHOP_DOMAIN_RE = re.compile(r"^[a-z0-9][a-z0-9-]*\.myshopify\.com$")
 logger = logging.getLogger(__name__)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def _redis(request: Request) -> Optional[object]:
     return getattr(request.app.state, "redis", None)
 
@@ -203,19 +198,23 @@ async def shopify_callback(
     # Register webhooks
     app_base_url = request.headers.get("x-forwarded-proto", request.url.scheme) + "://" + request.headers.get("host", request.url.netloc)
     callback_base = settings.app_url.rstrip("/") if settings.app_url else app_base_url
-    client = ShopifyClient(shop, access_token)
+    client = AsyncShopifyClient(shop, access_token)
     webhooks = [
         {"topic": "app/uninstalled", "address": f"{callback_base}/api/webhooks/app-uninstalled"},
         {"topic": "customers/data_request", "address": f"{callback_base}/api/webhooks/customers/data_request"},
         {"topic": "customers/redact", "address": f"{callback_base}/api/webhooks/customers/redact"},
         {"topic": "shop/redact", "address": f"{callback_base}/api/webhooks/shop/redact"},
     ]
-    for webhook in webhooks:
+
+    async def register_webhook(webhook: dict) -> None:
         try:
-            client.request("POST", "/admin/api/2024-01/webhooks.json", json={"webhook": webhook})
+            await client.request("POST", "/admin/api/2024-01/webhooks.json", json={"webhook": webhook})
         except Exception as e:
             logger.warning("Failed to register webhook %s: %s", webhook["topic"], e)
 
+    # The client bounds how many of these are in flight for the shop
+    await asyncio.gather(*(register_webhook(webhook) for webhook in webhooks))
+
     # Store token server-side in Redis with a session id and set secure cookie
     sess = secrets.token_urlsafe(32)
     if redis_client:
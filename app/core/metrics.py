@@ -6,17 +6,51 @@ from typing import Any, Dict
 logger = logging.getLogger(__name__)
 
 try:
-    from prometheus_client import Counter, Histogram
+    from prometheus_client import Counter, Gauge, Histogram
 
     REQUEST_COUNT = Counter("app_requests_total", "Total HTTP requests", ["endpoint"])
     REQUEST_LATENCY = Histogram("app_request_latency_seconds", "Request latency seconds", ["endpoint"])
     AI_INFERENCE_TIME = Histogram("ai_inference_seconds", "AI inference duration seconds")
     SHOPIFY_RETRY_COUNT = Counter("shopify_retry_count", "Shopify retry attempts")
+    OBSERVABILITY_EVENTS = Counter(
+        "observability_events_total", "Buffered business events by outcome", ["outcome"]
+    )
+    OBSERVABILITY_BUFFER_DEPTH = Gauge(
+        "observability_buffer_depth", "Business events waiting to be flushed"
+    )
+    ENTITLEMENT_CACHE_LOOKUPS = Counter(
+        "entitlement_cache_lookups_total", "Billing entitlement lookups by cache outcome", ["outcome"]
+    )
+    DB_POOL_CHECKOUT_TIME = Histogram(
+        "db_pool_checkout_seconds", "Time spent waiting for a pooled database connection"
+    )
+    DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Database connections currently checked out")
+    DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Connection checkouts that hit the pool timeout")
+    AI_BATCH_QUEUE_DEPTH = Gauge("ai_batch_queue_depth", "Inference requests waiting for a batch")
+    AI_BATCH_SIZE = Histogram(
+        "ai_batch_size", "Prompts per inference batch", buckets=(1, 2, 4, 8, 16, 32, 64)
+    )
+    AI_EXECUTOR_QUEUE_WAIT = Histogram(
+        "ai_executor_queue_wait_seconds", "Time model jobs wait for an inference worker"
+    )
+    AI_EXECUTOR_REJECTED = Counter(
+        "ai_executor_rejected_total", "Model jobs rejected because the inference queue was full"
+    )
 except Exception:  # pragma: no cover - metrics optional
     REQUEST_COUNT = None
     REQUEST_LATENCY = None
     AI_INFERENCE_TIME = None
     SHOPIFY_RETRY_COUNT = None
+    OBSERVABILITY_EVENTS = None
+    OBSERVABILITY_BUFFER_DEPTH = None
+    ENTITLEMENT_CACHE_LOOKUPS = None
+    DB_POOL_CHECKOUT_TIME = None
+    DB_POOL_CHECKED_OUT = None
+    DB_POOL_TIMEOUTS = None
+    AI_BATCH_QUEUE_DEPTH = None
+    AI_BATCH_SIZE = None
+    AI_EXECUTOR_QUEUE_WAIT = None
+    AI_EXECUTOR_REJECTED = None
 
 
 def emit_metric(name: str, payload: Dict[str, Any]) -> None:
@@ -31,5 +65,27 @@ def emit_metric(name: str, payload: Dict[str, Any]) -> None:
         if name == "shopify_retry":
             if SHOPIFY_RETRY_COUNT is not None:
                 SHOPIFY_RETRY_COUNT.inc()
+        if name == "observability_events" and OBSERVABILITY_EVENTS is not None:
+            OBSERVABILITY_EVENTS.labels(outcome=payload.get("outcome", "unknown")).inc(
+                payload.get("value", 1)
+            )
+        if name == "observability_buffer_depth" and OBSERVABILITY_BUFFER_DEPTH is not None:
+            OBSERVABILITY_BUFFER_DEPTH.set(payload.get("value", 0))
+        if name == "entitlement_cache" and ENTITLEMENT_CACHE_LOOKUPS is not None:
+            ENTITLEMENT_CACHE_LOOKUPS.labels(outcome=payload.get("outcome", "unknown")).inc()
+        if name == "db_pool_checkout" and DB_POOL_CHECKOUT_TIME is not None:
+            DB_POOL_CHECKOUT_TIME.observe(payload.get("value", 0.0))
+        if name == "db_pool_checked_out" and DB_POOL_CHECKED_OUT is not None:
+            DB_POOL_CHECKED_OUT.set(payload.get("value", 0))
+        if name == "db_pool_timeout" and DB_POOL_TIMEOUTS is not None:
+            DB_POOL_TIMEOUTS.inc()
+        if name == "ai_batch_queue_depth" and AI_BATCH_QUEUE_DEPTH is not None:
+            AI_BATCH_QUEUE_DEPTH.set(payload.get("value", 0))
+        if name == "ai_batch_size" and AI_BATCH_SIZE is not None:
+            AI_BATCH_SIZE.observe(payload.get("value", 0))
+        if name == "ai_executor_queue_wait" and AI_EXECUTOR_QUEUE_WAIT is not None:
+            AI_EXECUTOR_QUEUE_WAIT.observe(payload.get("value", 0.0))
+        if name == "ai_executor_rejected" and AI_EXECUTOR_REJECTED is not None:
+            AI_EXECUTOR_REJECTED.inc()
     except Exception:
         logger.debug("metric emit failed for %s", name, exc_info=True)
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-from typing import Any, Dict
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as redis_async
+except Exception:  # pragma: no cover - optional dependency
+    redis_async = None
 
 from app.core.config import settings
 
@@ -24,3 +32,125 @@ def log_optional_redis_issue(logger: logging.Logger, message: str) -> None:
         logger.warning(message)
     else:
         logger.debug(message)
+
+
+def default_redis_url() -> str:
+    """REDIS_URL, defaulting to a local Redis."""
+    return os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+class AsyncRedisManager:
+    """
+    Pooled ``redis.asyncio`` clients shared by the async services.
+
+    Clients are cached per (URL, event loop), so every service talking to
+    the same Redis shares one connection pool (REDIS_MAX_CONNECTIONS, with
+    callers waiting up to REDIS_POOL_TIMEOUT for a free connection) and
+    never blocks the event loop. Creating a client does not connect;
+    ``acquire`` pings once and, if Redis is down, reports it unavailable
+    for REDIS_RETRY_SECONDS instead of paying a connect timeout per call.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[Tuple[str, Any], Any] = {}
+        self._verified: set = set()
+        self._unavailable_until: Dict[str, float] = {}
+        self.max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+        self.retry_seconds = float(os.getenv("REDIS_RETRY_SECONDS", "5"))
+        # Seconds to wait for a pooled connection before giving up
+        self.pool_timeout = float(os.getenv("REDIS_POOL_TIMEOUT", "2"))
+
+    @staticmethod
+    def _loop() -> Any:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def available(self, url: Optional[str] = None) -> bool:
+        """False if redis.asyncio is missing or ``url`` recently failed."""
+        url = url or default_redis_url()
+        return (
+            redis_async is not None
+            and time.monotonic() >= self._unavailable_until.get(url, 0.0)
+        )
+
+    def get_client(self, url: Optional[str] = None) -> Optional[Any]:
+        """Pooled client for ``url`` on the running loop, without connecting."""
+        url = url or default_redis_url()
+        if not self.available(url):
+            return None
+        loop = self._loop()
+        key = (url, loop)
+        client = self._clients.get(key)
+        if client is None:
+            # Drop clients of loops that have since been closed (e.g. tests)
+            closed = [k for k in self._clients if k[1] is not None and k[1].is_closed()]
+            for stale in closed:
+                self._clients.pop(stale)
+                self._verified.discard(stale)
+            # A blocking pool queues callers for a free connection instead
+            # of failing with "Too many connections" under bursts
+            pool = redis_async.BlockingConnectionPool.from_url(
+                url,
+                max_connections=self.max_connections,
+                timeout=self.pool_timeout,
+                **redis_connection_kwargs(),
+            )
+            client = redis_async.Redis(connection_pool=pool)
+            self._clients[key] = client
+        return client
+
+    async def acquire(self, url: Optional[str] = None) -> Optional[Any]:
+        """Like ``get_client``, but pings a new client and returns None on failure."""
+        client = self.get_client(url)
+        if client is None:
+            return None
+        key = (url or default_redis_url(), self._loop())
+        if key not in self._verified:
+            try:
+                await client.ping()
+            except Exception as e:
+                self.mark_unavailable(key[0], e)
+                return None
+            self._verified.add(key)
+        return client
+
+    def mark_unavailable(self, url: Optional[str] = None, error: Any = None) -> None:
+        """Skip ``url`` for ``retry_seconds``, e.g. after a connection error."""
+        url = url or default_redis_url()
+        self._unavailable_until[url] = time.monotonic() + self.retry_seconds
+        self._verified = {key for key in self._verified if key[0] != url}
+        log_optional_redis_issue(
+            logging.getLogger(__name__),
+            f"Redis at {url} unavailable ({error}); retrying in {self.retry_seconds:.0f}s",
+        )
+
+    async def close(self) -> None:
+        """Close the clients owned by the running loop."""
+        loop = self._loop()
+        for key in [k for k in self._clients if k[1] is loop]:
+            client = self._clients.pop(key)
+            self._verified.discard(key)
+            await client.aclose()
+
+
+redis_manager = AsyncRedisManager()
+
+
+@asynccontextmanager
+async def pipeline(client: Any, transaction: bool = False) -> AsyncIterator[Any]:
+    """
+    Queue commands and send them in one round trip when the block exits.
+
+    Callers that need the replies can ``await pipe.execute()`` themselves;
+    the exit then has nothing left to send.
+    """
+    async with client.pipeline(transaction=transaction) as pipe:
+        yield pipe
+        await pipe.execute()
+
+
+async def scan_keys(client: Any, pattern: str, count: int = 500) -> List[str]:
+    """Keys matching ``pattern`` via SCAN, which unlike KEYS doesn't block Redis."""
+    return [key async for key in client.scan_iter(match=pattern, count=count)]
@@ -7,6 +7,7 @@ from typing import Optional
 
 from fastapi import Request, HTTPException
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.core.config import settings
 from app.utils.errors import ErrorResponse, ErrorCode
@@ -28,21 +29,21 @@ class TenantContext:
     shop_id: Optional[int] = None
 
 
-async def tenant_middleware(request: Request, call_next):
-    """FastAPI middleware to extract tenant information from each request.
+PUBLIC_PATHS = frozenset(("/", "/openapi.json", "/docs", "/redoc", "/privacy", "/terms", "/favicon.ico"))
+PUBLIC_PREFIXES = ("/health", "/api/webhooks", "/api/auth")
 
-    Supports two authentication flows:
-    1. Shopify API calls: `x-shopify-shop-domain` + `authorization: Bearer <token>`
-    2. Embedded app session cookie: `session_id` cookie referencing Redis session.
 
-    Attaches `TenantContext` to `request.state.tenant`.
-    Rejects requests missing tenant headers/cookie with 401.
-    """
+def _is_public_path(path: str) -> bool:
     # Allow health, public docs and webhook endpoints to bypass tenant enforcement
-    public_paths = ("/", "/openapi.json", "/docs", "/redoc", "/privacy", "/terms", "/favicon.ico")
-    if request.url.path.startswith("/health") or request.url.path in public_paths or request.url.path.startswith("/api/webhooks") or request.url.path.startswith("/api/auth"):
-        return await call_next(request)
+    return path in PUBLIC_PATHS or path.startswith(PUBLIC_PREFIXES)
 
+
+def _resolve_tenant(request: Request) -> Optional[JSONResponse]:
+    """Attach `TenantContext` to `request.state.tenant`.
+
+    Returns the error response to send instead when the request carries no
+    usable tenant, otherwise None.
+    """
     shop = request.headers.get("x-shopify-shop-domain")
     auth = request.headers.get("authorization") or request.headers.get("x-shopify-access-token")
 
@@ -95,8 +96,10 @@ async def tenant_middleware(request: Request, call_next):
     # Attach to request state for dependency injection
     request.state.tenant = tenant
 
-    # Attach a structured LoggerAdapter; request_id middleware may override later
-    request.state.logger = logging.LoggerAdapter(logger, {"shop_domain": shop})
+    # Attach a structured LoggerAdapter carrying both request id and shop
+    request.state.logger = logging.LoggerAdapter(
+        logger, {"request_id": getattr(request.state, "request_id", None), "shop_domain": shop}
+    )
 
     # Validate session-shop header if present (defense-in-depth)
     session_shop = request.headers.get("x-session-shop")
@@ -113,9 +116,42 @@ async def tenant_middleware(request: Request, call_next):
             content=response,
             headers={"X-Request-ID": response.get("request_id")},
         )
+    return None
 
-    response = await call_next(request)
-    return response
+
+async def tenant_middleware(request: Request, call_next):
+    """FastAPI middleware to extract tenant information from each request.
+
+    Supports two authentication flows:
+    1. Shopify API calls: `x-shopify-shop-domain` + `authorization: Bearer <token>`
+    2. Embedded app session cookie: `session_id` cookie referencing Redis session.
+
+    Attaches `TenantContext` to `request.state.tenant`.
+    Rejects requests missing tenant headers/cookie with 401.
+    """
+    if _is_public_path(request.url.path):
+        return await call_next(request)
+    error = _resolve_tenant(request)
+    if error is not None:
+        return error
+    return await call_next(request)
+
+
+class ShopifyTenantMiddleware:
+    """Pure ASGI version of `tenant_middleware` used by the app stack."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _is_public_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        error = _resolve_tenant(Request(scope, receive))
+        if error is not None:
+            await error(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
 
 def get_tenant_from_request(request: Request) -> TenantContext:
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Callable, Iterator, Optional
+
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+from app.db.models import SessionLocal
+
+
+class LazySession:
+    """Request-scoped SQLAlchemy session that is only created when used.
+
+    Health checks, webhooks and Redis-only endpoints never touch it, so they
+    no longer cost a Session (or a pooled connection). The first attribute
+    access opens the real session; commit/rollback/close are no-ops until
+    then.
+    """
+
+    def __init__(self, factory: Optional[Callable[[], Session]] = None):
+        self._factory = factory or SessionLocal
+        self._session: Optional[Session] = None
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    def get(self) -> Session:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def commit(self) -> None:
+        if self._session is not None:
+            self._session.commit()
+
+    def rollback(self) -> None:
+        if self._session is not None:
+            self._session.rollback()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def get_db(request: Request) -> Iterator[Session]:
+    """FastAPI dependency handing out the request's lazy session.
+
+    Routes that declare it but never query (e.g. billing on the in-memory
+    store) open nothing. Reuses the session installed by
+    db_session_middleware, which commits and closes it; outside the
+    middleware a private one is closed after the request.
+    """
+    lazy = getattr(request.state, "db", None)
+    if isinstance(lazy, LazySession):
+        yield lazy
+        return
+    lazy = LazySession()
+    try:
+        yield lazy
+    finally:
+        lazy.close()
@@ -4,20 +4,18 @@ from app.api.router import api_router
 from app.ai.services.ai_service import AIService
 from app.ai.services.ai_with_cb import AIServiceWithCircuitBreaker
 from app.core.config import settings
-from app.core.tenant import tenant_middleware
-from app.core.metrics_middleware import metrics_middleware
+from app.core.tenant import ShopifyTenantMiddleware
+from app.core.redis_runtime import redis_manager
 from jobs.redis_conn import get_redis_connection
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.request_id import request_id_middleware
 from app.core.logging_conf import configure_logging
 from app.utils.errors import general_exception_handler, http_exception_handler, validation_exception_handler
 from fastapi.exceptions import RequestValidationError
-from app.middleware.timeout import request_timeout_middleware
+from app.middleware.timeout import TimeoutMiddleware
 from app.api.oauth import router as oauth_router
 from app.api.webhooks import router as webhooks_router
-from app.middleware.observability import latency_middleware
-from app.middleware.db_session import db_session_middleware
-from app.middleware.billing import billing_enforcement_middleware
+from app.middleware.context import RequestContextMiddleware
+from app.middleware.billing import BillingMiddleware
 from app.middleware.rate_limiter import RateLimitMiddleware
 import os
 import logging
@@ -39,6 +37,9 @@ async def _startup(app: FastAPI) -> None:
     app.state.ai_service = AIServiceWithCircuitBreaker(
         base, failure_threshold=failure_threshold, reset_timeout=reset_timeout, timeout=timeout
     )
+    if os.environ.get("AI_WARMUP", "0") == "1":
+        # Load the model and run one generation before taking traffic
+        await app.state.ai_service.warm_up()
 
     try:
         app.state.redis = get_redis_connection(decode_responses=True)
@@ -101,12 +102,13 @@ async def _startup(app: FastAPI) -> None:
     if not os.environ.get("CONTACT_EMAIL"):
         missing.append("CONTACT_EMAIL")
 
-    from app.db.models import SessionLocal
+    from app.db.models import SessionLocal, init_db
 
     db = None
     try:
         db = SessionLocal()
         db.execute(text("SELECT 1"))
+        init_db()
     except Exception as exc:
         msg = f"Database connectivity failed: {exc!s}"
         logging.getLogger(__name__).error(msg, exc_info=True)
@@ -134,6 +136,48 @@ async def _shutdown(app: FastAPI) -> None:
             r.close()
     except Exception:
         pass
+    try:
+        ai_service = getattr(app.state, "ai_service", None)
+        if ai_service is not None and hasattr(ai_service, "close"):
+            # Stop the inference batching task
+            await ai_service.close()
+    except Exception:
+        pass
+    try:
+        from app.ai.services.model_runtime import inference_executor
+
+        inference_executor.shutdown()
+    except Exception:
+        pass
+    try:
+        from app.services.observability import observability
+
+        # Write out buffered business events before the pool goes away
+        await observability.close()
+    except Exception:
+        pass
+    try:
+        from app.services.reliability_guard import reliability_guard
+
+        await reliability_guard.close()
+    except Exception:
+        pass
+    try:
+        from app.services.shopify_client import shopify_pool
+
+        await shopify_pool.close()
+    except Exception:
+        pass
+    try:
+        from app.db.models import engine
+
+        engine.dispose()
+    except Exception:
+        pass
+    try:
+        await redis_manager.close()
+    except Exception:
+        pass
 
 
 @asynccontextmanager
@@ -188,21 +232,19 @@ if origins:
         allow_headers=["*"],
     )
 
-app.middleware("http")(metrics_middleware)
-app.middleware("http")(request_timeout_middleware)
-app.middleware("http")(latency_middleware)
-app.add_middleware(RateLimitMiddleware)
-
-
+# The request stack is made of pure ASGI middlewares sharing one
+# RequestContext (backing request.state); see scripts/benchmark_middleware_stack.py.
 # Tenant isolation middleware must run for all API requests to guarantee a tenant
 # context is available and to reject requests missing tenant headers.
-# NOTE: FastAPI applies function-based middleware in reverse order of registration.
-# Register billing -> tenant -> db_session -> request_id so execution is:
-# request_id -> db_session -> tenant -> billing.
-app.middleware("http")(billing_enforcement_middleware)
-app.middleware("http")(tenant_middleware)
-app.middleware("http")(db_session_middleware)
-app.middleware("http")(request_id_middleware)
+# NOTE: Starlette applies middleware in reverse order of registration.
+# Register timeout -> rate limit -> billing -> tenant -> context so execution is:
+# context (request id, DB session, metrics, latency) -> tenant -> billing
+# -> rate limit -> timeout.
+app.add_middleware(TimeoutMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(BillingMiddleware)
+app.add_middleware(ShopifyTenantMiddleware)
+app.add_middleware(RequestContextMiddleware)
 
 # Register exception handlers for consistent API errors
 app.add_exception_handler(HTTPException, http_exception_handler)
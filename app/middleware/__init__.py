@@ -3,6 +3,7 @@
 from .rate_limiter import (
     RateLimiter,
     RateLimitConfig,
+    RateLimitDecision,
     RateLimitMiddleware,
     rate_limit,
 )
@@ -20,6 +21,7 @@ from .tenant_isolation import (
 __all__ = [
     "RateLimiter",
     "RateLimitConfig",
+    "RateLimitDecision",
     "RateLimitMiddleware",
     "rate_limit",
     "TenantContext",
@@ -3,35 +3,57 @@ from __future__ import annotations
 from fastapi import Request, HTTPException
 from typing import Callable
 
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.db.models import SessionLocal
 from app.services.billing_service import BillingService
+from app.services.entitlement_cache import entitlement_cache
+from app.utils.errors import http_exception_handler
 
 
-async def billing_enforcement_middleware(request: Request, call_next: Callable):
-    """Middleware to enforce billing for protected routes.
+def _entitlement_loader(tenant, store):
+    """Load a shop's entitlement without borrowing the request's DB session.
 
-    Expects `request.state.tenant` to be set by tenant middleware.
-    Allows billing endpoints and public endpoints.
+    The cache may run the load as a background refresh after the response
+    has been sent and the request session closed.
     """
-    path = request.url.path
-    # Allow public app surfaces and docs to pass through without tenant context.
-    allow_paths = {
-        "/",
-        "/privacy",
-        "/terms",
-        "/docs",
-        "/redoc",
-        "/openapi.json",
-        "/favicon.ico",
-    }
-    allow_prefixes = (
-        "/api/billing",
-        "/api/webhooks",
-        "/health",
-        "/api/auth",
-    )
-    if path in allow_paths or any(path.startswith(p) for p in allow_prefixes):
-        return await call_next(request)
 
+    async def load() -> bool:
+        if store is not None:
+            return await BillingService(tenant.shop_domain, tenant.access_token, store).is_active_or_in_trial()
+        db = SessionLocal()
+        try:
+            return await BillingService(tenant.shop_domain, tenant.access_token, db).is_active_or_in_trial()
+        finally:
+            db.close()
+
+    return load
+
+
+# Public app surfaces and docs pass through without tenant context.
+ALLOW_PATHS = frozenset((
+    "/",
+    "/privacy",
+    "/terms",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/favicon.ico",
+))
+ALLOW_PREFIXES = (
+    "/api/billing",
+    "/api/webhooks",
+    "/health",
+    "/api/auth",
+)
+
+
+def _is_exempt(path: str) -> bool:
+    return path in ALLOW_PATHS or path.startswith(ALLOW_PREFIXES)
+
+
+async def _enforce_billing(request: Request) -> None:
+    """Raise HTTPException unless the request's tenant is entitled."""
     tenant = getattr(request.state, "tenant", None)
     if tenant is None:
         raise HTTPException(status_code=401, detail="Missing tenant")
@@ -42,9 +64,43 @@ async def billing_enforcement_middleware(request: Request, call_next: Callable):
     if backend is None:
         raise HTTPException(status_code=500, detail="Database not available")
 
-    svc = BillingService(tenant.shop_domain, tenant.access_token, backend)
-    allowed = await svc.is_active_or_in_trial()
+    allowed = await entitlement_cache.is_entitled(
+        tenant.shop_domain, _entitlement_loader(tenant, store)
+    )
     if not allowed:
         raise HTTPException(status_code=402, detail="subscription_inactive")
 
+
+async def billing_enforcement_middleware(request: Request, call_next: Callable):
+    """Middleware to enforce billing for protected routes.
+
+    Expects `request.state.tenant` to be set by tenant middleware.
+    Allows billing endpoints and public endpoints.
+    """
+    if not _is_exempt(request.url.path):
+        await _enforce_billing(request)
     return await call_next(request)
+
+
+class BillingMiddleware:
+    """Pure ASGI version of `billing_enforcement_middleware`.
+
+    Rejections are rendered with the app's HTTPException handler, since this
+    layer sits outside FastAPI's exception middleware.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _is_exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope, receive)
+        try:
+            await _enforce_billing(request)
+        except HTTPException as exc:
+            response = await http_exception_handler(request, exc)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import emit_metric
+from app.db.session import LazySession
+
+logger = logging.getLogger("app.observability")
+
+CONTEXT_SCOPE_KEY = "app.context"
+
+
+class RequestContext:
+    """Per-request state shared by the middleware stack and the routes.
+
+    The object's attributes back ``request.state``, so ``request.state.tenant``
+    and ``get_context(scope).tenant`` are the same value and no layer copies
+    state around.
+    """
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.tenant = None
+        self.db = LazySession()
+        self.logger = logging.LoggerAdapter(
+            logging.getLogger("app"), {"request_id": request_id, "shop_domain": None}
+        )
+        # Set on the response by RequestContextMiddleware when it starts
+        self.response_headers: List[Tuple[str, str]] = []
+
+    @property
+    def shop_domain(self) -> Optional[str]:
+        return getattr(self.tenant, "shop_domain", None)
+
+
+def get_context(scope: Scope) -> Optional[RequestContext]:
+    """The request's context, or None outside RequestContextMiddleware."""
+    return scope.get(CONTEXT_SCOPE_KEY)
+
+
+class RequestContextMiddleware:
+    """Outermost layer of the API stack.
+
+    Replaces the separate request-id, DB-session, metrics and latency
+    ``http`` middlewares with one pure ASGI layer:
+
+    - assigns the request id and returns it as ``X-Request-ID``;
+    - hands out a lazy DB session, committed when the response starts,
+      rolled back on errors and always closed;
+    - adds ``X-Request-Latency-ms`` plus any headers inner layers queued on
+      the context, and records request count/latency metrics.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        ctx = RequestContext(str(uuid.uuid4()))
+        # Keep anything already placed in state (e.g. lifespan state)
+        vars(ctx).update(scope.get("state") or {})
+        scope["state"] = vars(ctx)
+        scope[CONTEXT_SCOPE_KEY] = ctx
+        elapsed = 0.0
+
+        async def send_with_context(message: Message) -> None:
+            nonlocal elapsed
+            if message["type"] == "http.response.start":
+                ctx.db.commit()
+                elapsed = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                for name, value in ctx.response_headers:
+                    headers[name] = value
+                headers["X-Request-ID"] = ctx.request_id
+                headers["X-Request-Latency-ms"] = f"{elapsed * 1000.0:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_context)
+        except Exception:
+            ctx.db.rollback()
+            raise
+        finally:
+            ctx.db.close()
+
+        path = scope["path"]
+        emit_metric("request_count", {"endpoint": path})
+        emit_metric("request_latency", {"endpoint": path, "value": elapsed})
+        logger.info(
+            "Request %s %s completed in %.2f ms",
+            scope["method"],
+            path,
+            elapsed * 1000.0,
+            extra={"shop": ctx.shop_domain},
+        )
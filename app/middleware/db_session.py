@@ -1,9 +1,9 @@
 from fastapi import Request
-from app.db.models import SessionLocal
+from app.db.session import LazySession
 
 async def db_session_middleware(request: Request, call_next):
-    """Middleware to provide database session per request."""
-    request.state.db = SessionLocal()
+    """Middleware to provide a lazily opened database session per request."""
+    request.state.db = LazySession()
     try:
         response = await call_next(request)
         request.state.db.commit()
@@ -4,20 +4,29 @@ Production-grade Redis-backed rate limiting middleware.
 Features:
 - Per-shop rate limiting (primary)
 - Per-IP fallback limiting
-- Separate limits for endpoint categories:
+- Separate limits for endpoint categories, keyed per (shop, category):
   * Public API (generous)
   * Webhooks (moderate)
   * AI-heavy endpoints (strict)
+- GCRA (smooth sliding-window equivalent) evaluated atomically by a
+  single Lua script: one Redis round trip per decision
+- Optional in-process token leases so hot shops don't hit Redis on
+  every request
 - Returns HTTP 429 with Retry-After header
-- Thread-safe, async-compatible
+- Async (redis.asyncio), fails open when Redis is unavailable
 """
+import asyncio
 import logging
-from typing import Callable, Optional
-from datetime import datetime
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
 from functools import wraps
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi import HTTPException
 import os
 
@@ -32,7 +41,44 @@ except Exception:  # pragma: no cover - optional dependency
 
 logger = logging.getLogger(__name__)
 
-from app.core.redis_runtime import log_optional_redis_issue, redis_connection_kwargs
+from app.core.redis_runtime import log_optional_redis_issue, redis_async, redis_manager
+from app.middleware.context import get_context
+
+
+# GCRA: the key stores the theoretical arrival time (TAT, ms) of the next
+# request. A request is allowed while TAT - now <= period; each granted
+# token pushes TAT forward by period / limit. Up to ARGV[3] tokens are
+# granted at once, but only while at least twice that many are available,
+# so leases never drain the last tokens of a window.
+#
+# KEYS[1] = bucket key
+# ARGV    = limit, period_ms, requested tokens
+# Returns {granted, remaining, retry_after_ms}
+GCRA_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local interval = period / limit
+
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+
+local available = math.floor((now + period - tat) / interval)
+if available < 1 then
+    return {0, 0, math.ceil(tat - period + interval - now)}
+end
+
+local granted = 1
+if requested > 1 and available >= 2 * requested then
+    granted = requested
+end
+tat = tat + granted * interval
+redis.call('SET', KEYS[1], tat, 'PX', math.ceil(tat - now))
+return {granted, available - granted, 0}
+"""
 
 
 class RateLimitConfig:
@@ -44,34 +90,82 @@ class RateLimitConfig:
     AI_HEAVY_RPM = 30
     IP_FALLBACK_RPM = 100
     
-    def __init__(self, redis_url: str = None):
+    def __init__(
+        self,
+        redis_url: str = None,
+        local_lease_size: Optional[int] = None,
+        local_lease_ttl: Optional[float] = None,
+    ):
+        """
+        Args:
+            redis_url: Redis connection URL (REDIS_URL by default)
+            local_lease_size: Tokens reserved from Redis per round trip and
+                spent in-process (RATE_LIMIT_LOCAL_LEASE, default 1 = off)
+            local_lease_ttl: Seconds an unspent lease stays usable
+                (RATE_LIMIT_LOCAL_LEASE_TTL, default 1.0)
+        """
         self.redis_url = redis_url or os.getenv(
             "REDIS_URL", 
             "redis://localhost:6379/0"
         )
-        self.ttl_seconds = 60  # Reset window per minute
+        self.ttl_seconds = 60  # Length of the sliding window
+        self.local_lease_size = local_lease_size or int(
+            os.getenv("RATE_LIMIT_LOCAL_LEASE", "1")
+        )
+        self.local_lease_ttl = local_lease_ttl or float(
+            os.getenv("RATE_LIMIT_LOCAL_LEASE_TTL", "1.0")
+        )
+        # Back off this long before reconnecting after a Redis failure
+        self.reconnect_seconds = 5.0
+        # Most buckets with a local lease or cached denial kept per process;
+        # IP buckets come from client-supplied headers, so this must be bounded
+        self.local_max_keys = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "10000"))
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a rate limit check."""
+    
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: Optional[int] = None
 
 
 class RateLimiter:
-    """Redis-backed rate limiter for multi-tenant apps."""
+    """
+    Redis-backed GCRA rate limiter for multi-tenant apps.
+    
+    Each (shop or IP, category) bucket is checked and updated by one Lua
+    script call. With ``local_lease_size > 1`` a bucket that has plenty of
+    headroom reserves several tokens per call and spends them locally;
+    denials are also cached until their retry time, so a shop hammering a
+    full bucket costs no Redis traffic either. Near the limit every
+    request goes to Redis, so leases never over-admit across workers.
+    """
     
-    def __init__(self, config: RateLimitConfig = None):
+    def __init__(self, config: RateLimitConfig = None, redis_client=None):
         self.config = config or RateLimitConfig()
-        if redis is None:
+        self.redis_client = redis_client
+        self._script = None
+        self._retry_connect_at = 0.0
+        # bucket key -> (tokens, remaining, expires_at), oldest first
+        self._leases: "OrderedDict[str, Tuple[int, int, float]]" = OrderedDict()
+        # bucket key -> monotonic time a cached denial expires, oldest first
+        self._denied_until: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {"redis_calls": 0, "local_hits": 0, "denied": 0, "errors": 0}
+        if redis_client is None and redis_async is None:
             log_optional_redis_issue(logger, "Redis package not available. Rate limiting disabled.")
-            self.redis_client = None
-            return
-        try:
-            self.redis_client = redis.from_url(
-                self.config.redis_url,
-                **redis_connection_kwargs(),
-            )
-            # Test connection
-            self.redis_client.ping()
-            logger.info("Redis rate limiter initialized successfully")
-        except Exception as e:
-            log_optional_redis_issue(logger, f"Failed to connect to Redis: {e}. Rate limiting disabled.")
-            self.redis_client = None
+    
+    def _client(self):
+        """Async Redis client (shared pool by default); None while backing off."""
+        if time.monotonic() < self._retry_connect_at:
+            return None
+        # get_client doesn't connect; failures surface on the first call
+        client = self.redis_client or redis_manager.get_client(self.config.redis_url)
+        if client is not None and self._script is None:
+            self._script = client.register_script(GCRA_SCRIPT)
+        return client
     
     def _get_rate_limit(self, category: str) -> int:
         """Get RPM limit by category."""
@@ -82,58 +176,119 @@ class RateLimiter:
         }
         return limits.get(category, self.config.PUBLIC_API_RPM)
     
-    def _get_key_prefix(self, shop_id: Optional[str], ip: str) -> str:
-        """Generate Redis key with timestamp for sliding window."""
-        minute = int(datetime.utcnow().timestamp() / 60)
-        
+    def _get_key(self, shop_id: Optional[str], ip: str, category: str) -> str:
+        """Redis key of the (shop or IP, category) bucket."""
         if shop_id:
-            return f"ratelimit:shop:{shop_id}:{minute}"
-        else:
-            return f"ratelimit:ip:{ip}:{minute}"
+            return f"ratelimit:{category}:shop:{shop_id}"
+        return f"ratelimit:{category}:ip:{ip}"
     
-    async def check_limit(
+    def _remember(self, entries: OrderedDict, key: str, value) -> None:
+        """Store a lease or denial, dropping the oldest past local_max_keys."""
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.config.local_max_keys:
+            # Losing one only costs that bucket a Redis round trip
+            entries.popitem(last=False)
+    
+    def _take_local(self, key: str, limit: int) -> Optional[RateLimitDecision]:
+        """Answer from a cached denial or leased token, if there is one."""
+        now = time.monotonic()
+        denied_until = self._denied_until.get(key)
+        if denied_until is not None:
+            if now < denied_until:
+                self.stats["local_hits"] += 1
+                self.stats["denied"] += 1
+                return RateLimitDecision(
+                    False, limit, 0, max(1, math.ceil(denied_until - now))
+                )
+            del self._denied_until[key]
+        
+        lease = self._leases.get(key)
+        if lease is not None:
+            tokens, remaining, expires_at = lease
+            if now < expires_at:
+                if tokens > 1:
+                    self._leases[key] = (tokens - 1, remaining, expires_at)
+                else:
+                    del self._leases[key]
+                self.stats["local_hits"] += 1
+                return RateLimitDecision(True, limit, remaining + tokens - 1)
+            del self._leases[key]
+        return None
+    
+    async def acquire(
         self,
         shop_id: Optional[str],
         ip: str,
         category: str = "public",
-    ) -> tuple[bool, Optional[int]]:
+    ) -> RateLimitDecision:
         """
-        Check if request is within rate limit.
+        Take one token from the request's bucket.
         
         Returns:
-            (within_limit, seconds_until_reset)
+            RateLimitDecision with the remaining tokens and, when denied,
+            the seconds until the next token frees up
         """
-        if not self.redis_client:
+        limit = self._get_rate_limit(category)
+        key = self._get_key(shop_id, ip, category)
+        
+        decision = self._take_local(key, limit)
+        if decision is not None:
+            return decision
+        
+        client = self._client()
+        if client is None:
             # Redis unavailable: fail open (allow request)
             logger.debug("Redis unavailable, allowing request")
-            return True, None
+            return RateLimitDecision(True, limit, limit)
         
+        lease_size = max(1, self.config.local_lease_size)
         try:
-            limit = self._get_rate_limit(category)
-            key = self._get_key_prefix(shop_id, ip)
-            
-            # Increment counter and get value
-            current = self.redis_client.incr(key)
-            
-            # Set TTL on first request in window
-            if current == 1:
-                self.redis_client.expire(key, self.config.ttl_seconds)
-            
-            # Get remaining TTL for Retry-After header
-            ttl = self.redis_client.ttl(key)
-            if ttl == -1:
-                self.redis_client.expire(key, self.config.ttl_seconds)
-                ttl = self.config.ttl_seconds
-            
-            if current <= limit:
-                return True, None
-            else:
-                return False, ttl
-        
-        except RedisError as e:
-            logger.error(f"Redis error in rate limiter: {e}")
+            self.stats["redis_calls"] += 1
+            granted, remaining, retry_ms = await self._script(
+                keys=[key],
+                args=[limit, self.config.ttl_seconds * 1000, lease_size],
+                client=client,
+            )
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self.stats["errors"] += 1
+            log_optional_redis_issue(logger, f"Redis error in rate limiter: {e}")
+            self._retry_connect_at = time.monotonic() + self.config.reconnect_seconds
             # Fail open on Redis errors
-            return True, None
+            return RateLimitDecision(True, limit, limit)
+        
+        granted, remaining = int(granted), int(remaining)
+        if not granted:
+            retry_after = max(1, math.ceil(int(retry_ms) / 1000))
+            if lease_size > 1:
+                self._remember(
+                    self._denied_until, key, time.monotonic() + int(retry_ms) / 1000
+                )
+            self.stats["denied"] += 1
+            return RateLimitDecision(False, limit, 0, retry_after)
+        
+        if granted > 1:
+            self._remember(self._leases, key, (
+                granted - 1,
+                remaining,
+                time.monotonic() + self.config.local_lease_ttl,
+            ))
+        return RateLimitDecision(True, limit, remaining + granted - 1)
+    
+    async def check_limit(
+        self,
+        shop_id: Optional[str],
+        ip: str,
+        category: str = "public",
+    ) -> tuple[bool, Optional[int]]:
+        """
+        Check if request is within rate limit.
+        
+        Returns:
+            (within_limit, seconds_until_retry)
+        """
+        decision = await self.acquire(shop_id, ip, category)
+        return decision.allowed, decision.retry_after
     
     async def get_remaining(
         self,
@@ -141,23 +296,45 @@ class RateLimiter:
         ip: str,
         category: str = "public",
     ) -> int:
-        """Get remaining requests in current window."""
-        if not self.redis_client:
-            return self._get_rate_limit(category)
+        """Get remaining requests in the current window without taking one."""
+        limit = self._get_rate_limit(category)
+        client = self._client()
+        if client is None:
+            return limit
         
         try:
-            key = self._get_key_prefix(shop_id, ip)
-            current = int(self.redis_client.get(key) or 0)
-            limit = self._get_rate_limit(category)
-            return max(0, limit - current)
+            key = self._get_key(shop_id, ip, category)
+            tat = await client.get(key)
+            if tat is None:
+                return limit
+            now_ms = time.time() * 1000
+            interval = self.config.ttl_seconds * 1000 / limit
+            backlog = max(0.0, float(tat) - now_ms)
+            return max(0, min(limit, limit - math.ceil(backlog / interval)))
         except Exception as e:
             logger.error(f"Error getting remaining requests: {e}")
-            return self._get_rate_limit(category)
+            return limit
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Counters of Redis calls, locally answered checks, denials and errors."""
+        return dict(self.stats)
+    
+    async def close(self) -> None:
+        """Close an injected Redis client (the shared pool is closed on shutdown)."""
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+            self.redis_client = None
+            self._script = None
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
-    FastAPI middleware for rate limiting.
+    ASGI middleware for rate limiting.
+    
+    A plain ASGI class rather than BaseHTTPMiddleware, so a request costs
+    no extra task or response stream wrapping. Under RequestContextMiddleware
+    the rate limit headers are queued on the request context; on its own it
+    adds them to the response itself.
     
     Usage:
         app.add_middleware(RateLimitMiddleware, limiter=limiter)
@@ -167,8 +344,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     WEBHOOK_PATHS = {"/webhooks", "/api/webhooks"}
     AI_HEAVY_PATHS = {"/analyze", "/ai/predict", "/api/ai"}
     
-    def __init__(self, app, limiter: RateLimiter = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = None):
+        self.app = app
         self.limiter = limiter or RateLimiter()
     
     def _get_shop_id(self, request: Request) -> Optional[str]:
@@ -220,17 +397,23 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Fallback to connection IP
         return request.client.host if request.client else "unknown"
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Check rate limit before passing request."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope, receive)
+        
         # Extract context
         shop_id = self._get_shop_id(request)
         ip = self._get_client_ip(request)
         category = self._get_category(request)
         
         # Check rate limit
-        within_limit, ttl = await self.limiter.check_limit(shop_id, ip, category)
+        decision = await self.limiter.acquire(shop_id, ip, category)
+        ttl = decision.retry_after
         
-        if not within_limit:
+        if not decision.allowed:
             logger.warning(
                 f"Rate limit exceeded - shop:{shop_id} ip:{ip} category:{category}"
             )
@@ -239,7 +422,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             if ttl:
                 headers["Retry-After"] = str(ttl)
             
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=429,
                 content={
                     "error": "Too many requests",
@@ -248,21 +431,32 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 },
                 headers=headers,
             )
+            await response(scope, receive, send)
+            return
         
         # Add rate limit info to request state
-        remaining = await self.limiter.get_remaining(shop_id, ip, category)
-        request.state.rate_limit_remaining = remaining
+        request.state.rate_limit_remaining = decision.remaining
         request.state.shop_id = shop_id
         
-        response = await call_next(request)
-        
         # Add rate limit headers to response
-        response.headers["X-RateLimit-Limit"] = str(
-            self.limiter._get_rate_limit(category)
+        rate_headers = (
+            ("X-RateLimit-Limit", str(decision.limit)),
+            ("X-RateLimit-Remaining", str(decision.remaining)),
         )
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        ctx = get_context(scope)
+        if ctx is not None:
+            ctx.response_headers.extend(rate_headers)
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in rate_headers:
+                    headers[name] = value
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_with_headers)
 
 
 def rate_limit(category: str = "public"):
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Callable
+from typing import Callable, Optional
 
 from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.config import settings
 
@@ -18,6 +20,49 @@ async def request_timeout_middleware(request: Request, call_next: Callable):
     try:
         return await asyncio.wait_for(call_next(request), timeout=timeout)
     except asyncio.TimeoutError:
-        from fastapi.responses import JSONResponse
-
         return JSONResponse(status_code=504, content={"error": "request_timeout"})
+
+
+class TimeoutMiddleware:
+    """Pure ASGI version of `request_timeout_middleware`.
+
+    Like the original, the deadline covers the time until the response
+    starts; a streaming body is not cut off. Uses a timer on the current
+    task instead of wait_for, so no extra task is created per request.
+    """
+
+    def __init__(self, app: ASGIApp, timeout: Optional[float] = None):
+        self.app = app
+        self.timeout = float(timeout if timeout is not None else settings.request_timeout)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        timed_out = False
+
+        def expire() -> None:
+            nonlocal timed_out
+            timed_out = True
+            task.cancel()
+
+        timer = asyncio.get_running_loop().call_later(self.timeout, expire)
+
+        async def send_until_started(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timer.cancel()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_until_started)
+        except asyncio.CancelledError:
+            if not timed_out:
+                raise
+            if hasattr(task, "uncancel"):
+                task.uncancel()
+            response = JSONResponse(status_code=504, content={"error": "request_timeout"})
+            await response(scope, receive, send)
+        finally:
+            timer.cancel()
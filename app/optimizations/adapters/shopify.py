@@ -2,10 +2,33 @@
 
 Replace with real Shopify API integration in production.
 """
-from typing import List, Dict
+from typing import Dict, Iterable, Optional
 
 
-def list_store_products(store_id: str) -> List[Dict]:
+def shop_access_token(store_id: str) -> Optional[str]:
+    """Stored access token of an installed shop, or None if there is none."""
+    from app.db.models import SessionLocal, Shop
+
+    db = SessionLocal()
+    try:
+        shop = db.query(Shop).filter(Shop.domain == store_id).first()
+        if shop is None or shop.uninstalled_at is not None:
+            return None
+        return shop.access_token or None
+    finally:
+        db.close()
+
+
+def list_store_products(store_id: str, access_token: Optional[str] = None) -> Iterable[Dict]:
+    """Products of a store.
+
+    With an access token, `store_id` is the shop domain and the whole catalog
+    is streamed through a GraphQL bulk operation (a lazy iterator, not a list).
+    """
+    if access_token:
+        from app.services.shopify_client import ShopifyClient
+
+        return ShopifyClient(store_id, access_token).iter_bulk_products()
     # prototype returns synthetic products
     return [{"id": f"p-{i}", "title": f"Product {i}"} for i in range(1, 6)]
 
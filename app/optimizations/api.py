@@ -8,6 +8,7 @@ from typing import Dict, Any
 from .manager import OptimizationManager
 from .storage import JSONStore
 from .rbac import require_role
+from .adapters import shopify as shopify_adapter
 import json
 import os
 
@@ -35,7 +36,12 @@ class CatalogRequest(BaseModel):
 
 @app.post("/api/optimize/catalog")
 def optimize_catalog(req: CatalogRequest):
-    res = manager.one_click_full_catalog_optimize(req.store_id, dry_run=req.dry_run)
+    # Installed shops are scanned through the bulk API with their stored token
+    res = manager.one_click_full_catalog_optimize(
+        req.store_id,
+        dry_run=req.dry_run,
+        access_token=shopify_adapter.shop_access_token(req.store_id),
+    )
     return res
 
 
@@ -42,15 +42,17 @@ class OptimizationManager:
         self.datastore.save_snapshot(snapshot)
         return record
 
-    def one_click_full_catalog_optimize(self, store_id: str, dry_run: bool = True) -> Dict:
+    def one_click_full_catalog_optimize(self, store_id: str, dry_run: bool = True, access_token: Optional[str] = None) -> Dict:
         """Kick off a full-catalog optimization job (prototype: synchronously run small job)."""
-        # In real system: enqueue job; here we scan products via Shopify adapter if available
-        products = shopify_adapter.list_store_products(store_id)
-        job_result = {"store_id": store_id, "dry_run": dry_run, "processed": len(products)}
-        for p in products[:50]:
-            if not dry_run:
+        # In real system: enqueue job; here we scan products via Shopify adapter if available.
+        # The catalog may be streamed, so count while iterating instead of len().
+        products = shopify_adapter.list_store_products(store_id, access_token=access_token)
+        processed = 0
+        for p in products:
+            processed += 1
+            if not dry_run and processed <= 50:
                 self.optimize_product(p.get("id"), {})
-        return job_result
+        return {"store_id": store_id, "dry_run": dry_run, "processed": processed}
 
     def revert_optimization(self, snapshot_id: str) -> bool:
         snap = self.datastore.get_snapshot(snapshot_id)
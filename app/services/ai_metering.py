@@ -10,7 +10,7 @@ Features:
 - Pricing tier enforcement
 - Soft limit warnings (80% threshold)
 - Hard cap blocking
-- Async-compatible with Redis backend
+- Async Redis backend (pooled redis.asyncio, non-blocking)
 - Graceful degradation
 """
 import json
@@ -21,12 +21,12 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 import os
 
-try:
-    import redis
-except Exception:  # pragma: no cover - optional dependency
-    redis = None
-
-from app.core.redis_runtime import log_optional_redis_issue, redis_connection_kwargs
+from app.core.redis_runtime import (
+    log_optional_redis_issue,
+    pipeline,
+    redis_async,
+    redis_manager,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -175,24 +175,17 @@ class AIMeteringService:
             "REDIS_URL",
             "redis://localhost:6379/0"
         )
+        # Async client override (e.g. tests); otherwise the shared pool is used
         self.redis_client = redis_client
 
-        if not self.redis_client:
-            if redis is None:
-                log_optional_redis_issue(logger, "Redis package not available. Metering disabled.")
-                self.redis_client = None
-                return
-            try:
-                self.redis_client = redis.from_url(
-                    self.redis_url,
-                    **redis_connection_kwargs(),
-                )
-                # Test connection
-                self.redis_client.ping()
-                logger.info("AI metering service initialized successfully")
-            except Exception as e:
-                log_optional_redis_issue(logger, f"Failed to connect to Redis: {e}. Metering disabled.")
-                self.redis_client = None
+        if not self.redis_client and redis_async is None:
+            log_optional_redis_issue(logger, "Redis package not available. Metering disabled.")
+
+    async def _redis(self) -> Optional[Any]:
+        """Redis client to use, or None while Redis is unavailable."""
+        if self.redis_client is not None:
+            return self.redis_client
+        return await redis_manager.acquire(self.redis_url)
 
     def _get_usage_key(self, shop_id: str) -> str:
         """Generate Redis key for usage metrics."""
@@ -207,6 +200,11 @@ class AIMeteringService:
         date_str = date.strftime("%Y-%m-%d")
         return f"usage_events:{shop_id}:{date_str}"
 
+    @staticmethod
+    def _dump_metrics(metrics: UsageMetrics) -> str:
+        """Serialize metrics for Redis, with datetimes as ISO strings."""
+        return json.dumps(asdict(metrics), default=lambda value: value.isoformat())
+
     async def get_shop_tier(self, shop_id: str) -> PricingTier:
         """
         Get pricing tier for a shop.
@@ -224,12 +222,13 @@ class AIMeteringService:
 
         Returns None if Redis unavailable or no metrics found.
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             return None
 
         try:
             usage_key = self._get_usage_key(shop_id)
-            data = self.redis_client.get(usage_key)
+            data = await client.get(usage_key)
 
             if data:
                 metrics_dict = json.loads(data)
@@ -242,20 +241,18 @@ class AIMeteringService:
                     metrics_dict['last_updated'] = datetime.fromisoformat(
                         metrics_dict['last_updated']
                     )
+                metrics_dict['tier'] = PricingTier(metrics_dict['tier'])
                 return UsageMetrics(**metrics_dict)
 
             # Create new metrics if none exist
-            return await self._initialize_metrics(shop_id)
+            return await self._initialize_metrics(client, shop_id)
 
         except Exception as e:
             logger.error(f"Failed to get usage metrics for shop {shop_id}: {e}")
             return None
 
-    async def _initialize_metrics(self, shop_id: str) -> Optional[UsageMetrics]:
+    async def _initialize_metrics(self, client: Any, shop_id: str) -> Optional[UsageMetrics]:
         """Initialize usage metrics for a new shop."""
-        if not self.redis_client:
-            return None
-
         try:
             tier = await self.get_shop_tier(shop_id)
             limits = TierLimits.get_limits(tier)
@@ -276,9 +273,9 @@ class AIMeteringService:
 
             # Store in Redis
             usage_key = self._get_usage_key(shop_id)
-            self.redis_client.set(
+            await client.set(
                 usage_key,
-                json.dumps(asdict(metrics)),
+                self._dump_metrics(metrics),
                 ex=90 * 24 * 60 * 60,  # Keep for 90 days
             )
 
@@ -372,7 +369,8 @@ class AIMeteringService:
 
         Returns True if successfully recorded, False otherwise.
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             logger.debug("Redis unavailable, skipping usage recording")
             return False
 
@@ -396,16 +394,16 @@ class AIMeteringService:
 
             metrics.last_updated = datetime.utcnow()
 
-            # Store updated metrics
+            # Store updated metrics and record the event for the audit trail
+            # in one round trip
             usage_key = self._get_usage_key(shop_id)
-            self.redis_client.set(
-                usage_key,
-                json.dumps(asdict(metrics)),
-                ex=90 * 24 * 60 * 60,
-            )
-
-            # Record event for audit trail
-            await self._record_event(shop_id, event_type, amount, request_id)
+            async with pipeline(client) as pipe:
+                pipe.set(
+                    usage_key,
+                    self._dump_metrics(metrics),
+                    ex=90 * 24 * 60 * 60,
+                )
+                self._record_event(pipe, shop_id, event_type, amount, request_id)
 
             logger.debug(f"Recorded usage: {event_type}={amount} for shop {shop_id}")
             return True
@@ -414,17 +412,15 @@ class AIMeteringService:
             logger.error(f"Failed to record usage for shop {shop_id}: {e}")
             return False
 
-    async def _record_event(
+    def _record_event(
         self,
+        pipe: Any,
         shop_id: str,
         event_type: str,
         amount: int,
         request_id: Optional[str],
     ) -> None:
-        """Record usage event for audit trail."""
-        if not self.redis_client:
-            return
-
+        """Queue a usage event for the audit trail on ``pipe``."""
         try:
             event = UsageEvent(
                 shop_id=shop_id,
@@ -439,13 +435,13 @@ class AIMeteringService:
 
             # Add to sorted set
             score = event.timestamp.timestamp()
-            self.redis_client.zadd(
+            pipe.zadd(
                 events_key,
                 {json.dumps(event_data): score}
             )
 
             # Set TTL (keep events for 30 days)
-            self.redis_client.expire(events_key, 30 * 24 * 60 * 60)
+            pipe.expire(events_key, 30 * 24 * 60 * 60)
 
         except Exception as e:
             logger.error(f"Failed to record usage event: {e}")
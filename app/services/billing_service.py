@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from app.db.models import Shop, Subscription, UsageEvent, CreditBalance
 from app.core.config import settings
 from app.core.plans import PLANS
+from app.services.entitlement_cache import entitlement_cache
 from app.services.shopify_client import ShopifyClient
 from app.models.billing import SubscriptionRecord, UsageRecord
 
@@ -92,6 +93,7 @@ class BillingService:
                 activated_at=datetime.utcnow() if should_activate else None,
             )
             await self.store.save_subscription(record)
+            entitlement_cache.invalidate(self.shop_domain)
             return {"confirmation_url": None, "subscription_id": record.charge_id}
 
         if plan_name not in PLANS:
@@ -160,6 +162,7 @@ class BillingService:
         )
         self.db.add(sub)
         self.db.commit()
+        entitlement_cache.invalidate(self.shop_domain)
 
         return {"confirmation_url": confirmation_url, "subscription_id": sub.id}
 
@@ -172,6 +175,7 @@ class BillingService:
             record.charge_id = charge_id
             record.activated_at = datetime.utcnow()
             await self.store.save_subscription(record)
+            entitlement_cache.invalidate(self.shop_domain)
             return record
         shop = await self.ensure_shop()
         sub = self.db.query(Subscription).filter(
@@ -186,6 +190,7 @@ class BillingService:
         sub.charge_id = charge_id
         sub.activated_at = datetime.utcnow()
         self.db.commit()
+        entitlement_cache.invalidate(self.shop_domain)
 
         # Assign credits
         plan = PLANS[sub.plan_name]
@@ -267,6 +272,7 @@ class BillingService:
             record.status = "cancelled"
             record.cancelled_at = datetime.utcnow()
             await self.store.save_subscription(record)
+            entitlement_cache.invalidate(self.shop_domain)
             return
         shop = await self.ensure_shop()
         sub = self.db.query(Subscription).filter(
@@ -278,6 +284,7 @@ class BillingService:
         sub.status = "cancelled"
         sub.cancelled_at = datetime.utcnow()
         self.db.commit()
+        entitlement_cache.invalidate(self.shop_domain)
         logger.info("Cancelled subscription for %s", self.shop_domain)
 
     async def increment_usage(self, ai_calls: int = 0, products: int = 0) -> dict:
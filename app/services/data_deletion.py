@@ -5,6 +5,7 @@ from datetime import datetime
 
 from app.models.audit import DeletionAudit
 from app.db.models import Shop, Subscription, UsageEvent, CreditBalance
+from app.services.entitlement_cache import entitlement_cache
 
 logger = logging.getLogger(__name__)
 
@@ -71,6 +72,8 @@ class DataDeletionService:
             else:
                 audit_details["shop_missing"] = True
 
+        entitlement_cache.invalidate(shop_domain)
+
         # Revoke sessions stored in Redis
         if self.redis is not None:
             try:
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import emit_metric
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[bool]]
+
+
+class EntitlementCache:
+    """Per-process cache of "is this shop allowed in" billing decisions.
+
+    Subscription status changes a few times a month, so the billing
+    middleware should not hit the database on every request:
+
+    - entries younger than ``ttl`` are served as is;
+    - an *allowed* entry up to ``stale_ttl`` past that is still served while
+      one background refresh reloads it (stale-while-revalidate). Denied
+      entries are never served stale, so a shop that just paid is not kept
+      out by another worker's cache;
+    - concurrent misses for the same shop share a single load;
+    - ``invalidate`` drops a shop's entry and discards any load already in
+      flight for it, so the next request sees the new state.
+
+    Invalidation is local to the process; other workers converge within
+    ``ttl`` plus one refresh.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        max_entries: int = 10000,
+    ):
+        self.ttl = ttl if ttl is not None else float(os.getenv("ENTITLEMENT_CACHE_TTL", "30"))
+        self.stale_ttl = (
+            stale_ttl if stale_ttl is not None
+            else float(os.getenv("ENTITLEMENT_CACHE_STALE_TTL", "300"))
+        )
+        self.max_entries = max_entries
+        # shop -> (allowed, fetched_at)
+        self._entries: Dict[str, Tuple[bool, float]] = {}
+        # Bumped by invalidate(); loads started before a bump are discarded
+        self._versions: Dict[str, int] = {}
+        # Tasks are bound to their loop, so in-flight loads are per loop
+        self._inflight: Dict[Tuple[str, asyncio.AbstractEventLoop], asyncio.Task] = {}
+
+    async def is_entitled(self, shop: str, loader: Loader) -> bool:
+        entry = self._entries.get(shop)
+        if entry is not None:
+            allowed, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self._record("fresh")
+                return allowed
+            if allowed and age < self.ttl + self.stale_ttl:
+                self._record("stale")
+                self._load(shop, loader)
+                return allowed
+        self._record("miss")
+        return await asyncio.shield(self._load(shop, loader))
+
+    def invalidate(self, shop: str) -> None:
+        self._entries.pop(shop, None)
+        self._versions[shop] = self._versions.get(shop, 0) + 1
+        # Later requests must not join a load that predates the change
+        for key in [key for key in self._inflight if key[0] == shop]:
+            del self._inflight[key]
+
+    def clear(self) -> None:
+        for shop in set(self._entries) | {shop for shop, _ in self._inflight}:
+            self.invalidate(shop)
+
+    def _load(self, shop: str, loader: Loader) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        key = (shop, loop)
+        task = self._inflight.get(key)
+        if task is None:
+            task = loop.create_task(self._fetch(shop, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    async def _fetch(self, shop: str, loader: Loader) -> bool:
+        version = self._versions.get(shop, 0)
+        allowed = bool(await loader())
+        if self._versions.get(shop, 0) == version:
+            self._entries.pop(shop, None)
+            self._entries[shop] = (allowed, time.monotonic())
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        return allowed
+
+    def _finish(self, key, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Inline loads re-raise to the request; a failed background
+            # refresh leaves the stale entry to be retried next request
+            logger.warning("Entitlement refresh failed for %s: %s", key[0], task.exception())
+
+    @staticmethod
+    def _record(outcome: str) -> None:
+        emit_metric("entitlement_cache", {"outcome": outcome})
+
+
+entitlement_cache = EntitlementCache()
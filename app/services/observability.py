@@ -8,25 +8,31 @@ Features:
 - Structured event logging
 - PII-safe data handling
 - Event correlation with request_id
-- Async-compatible event processing
+- Async, non-blocking event processing (pooled redis.asyncio)
 - Event aggregation and metrics
+- Bounded in-process buffer flushed in pipelined batches, with drop
+  metrics instead of unbounded Redis traffic under spikes
 - Integration with existing logging infrastructure
 """
+import asyncio
 import json
 import logging
 import uuid
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import os
 
-try:
-    import redis
-except Exception:  # pragma: no cover - optional dependency
-    redis = None
-
-from app.core.redis_runtime import log_optional_redis_issue, redis_connection_kwargs
+from app.core.metrics import emit_metric
+from app.core.redis_runtime import (
+    log_optional_redis_issue,
+    pipeline,
+    redis_async,
+    redis_manager,
+    scan_keys,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +100,12 @@ class ObservabilityService:
     Redis-backed observability service for structured event logging.
 
     Provides event tracking, aggregation, and metrics for business intelligence.
+
+    ``log_event`` only appends to a bounded in-process buffer. A background
+    task flushes it every ``flush_interval`` seconds, or as soon as
+    ``flush_batch_size`` events are waiting, writing each batch in one
+    pipeline with counters pre-aggregated per key. When the buffer is full
+    new events are dropped (and counted) rather than queued without bound.
     """
 
     def __init__(
@@ -101,30 +113,60 @@ class ObservabilityService:
         redis_url: str = None,
         redis_client: Any = None,
         enable_structured_logging: bool = True,
+        buffer_size: Optional[int] = None,
+        flush_batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
     ):
+        """
+        Args:
+            redis_url: Redis connection URL (REDIS_URL by default)
+            redis_client: Async Redis client override
+            enable_structured_logging: Also log every event to the logger
+            buffer_size: Events held before new ones are dropped
+                (OBSERVABILITY_BUFFER_SIZE, default 10000)
+            flush_batch_size: Events written per pipeline, and the backlog
+                that triggers an early flush (OBSERVABILITY_FLUSH_BATCH, 500)
+            flush_interval: Seconds between periodic flushes
+                (OBSERVABILITY_FLUSH_INTERVAL, 1.0)
+        """
         self.redis_url = redis_url or os.getenv(
             "REDIS_URL",
             "redis://localhost:6379/0"
         )
+        # Async client override (e.g. tests); otherwise the shared pool is used
         self.redis_client = redis_client
         self.enable_structured_logging = enable_structured_logging
+        self.buffer_size = buffer_size or int(
+            os.getenv("OBSERVABILITY_BUFFER_SIZE", "10000")
+        )
+        self.flush_batch_size = flush_batch_size or int(
+            os.getenv("OBSERVABILITY_FLUSH_BATCH", "500")
+        )
+        self.flush_interval = flush_interval or float(
+            os.getenv("OBSERVABILITY_FLUSH_INTERVAL", "1.0")
+        )
+        self._buffer: deque = deque()
+        self.stats = {
+            "accepted": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+        }
+        # Flusher task and its wake-up event / lock, bound to one event loop
+        self._flush_loop = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
 
-        if not self.redis_client:
-            if redis is None:
-                log_optional_redis_issue(logger, "Redis package not available. Observability disabled.")
-                self.redis_client = None
-                return
-            try:
-                self.redis_client = redis.from_url(
-                    self.redis_url,
-                    **redis_connection_kwargs(),
-                )
-                # Test connection
-                self.redis_client.ping()
-                logger.info("Observability service initialized successfully")
-            except Exception as e:
-                log_optional_redis_issue(logger, f"Failed to connect to Redis: {e}. Observability disabled.")
-                self.redis_client = None
+        if not self.redis_client and redis_async is None:
+            log_optional_redis_issue(logger, "Redis package not available. Observability disabled.")
+
+    async def _redis(self) -> Optional[Any]:
+        """Redis client to use, or None while Redis is unavailable."""
+        if self.redis_client is not None:
+            return self.redis_client
+        return await redis_manager.acquire(self.redis_url)
 
     def _get_event_key(self, shop_id: str, event_type: str, date: datetime) -> str:
         """Generate Redis key for events."""
@@ -132,52 +174,180 @@ class ObservabilityService:
         return f"events:{shop_id}:{event_type}:{date_str}"
 
     def _get_metrics_key(self, shop_id: str, metric_name: str) -> str:
-        """Generate Redis key for aggregated metrics."""
-        return f"metrics:{shop_id}:{metric_name}"
+        """Generate Redis key for an aggregated metrics hash."""
+        return f"event_metrics:{shop_id}:{metric_name}"
 
     async def log_event(self, event: BusinessEvent) -> bool:
         """
         Log a business event.
 
-        Returns True if successfully logged, False otherwise.
+        The event is buffered and written to Redis by the next flush.
+
+        Returns True if the event was accepted, False if it was dropped
+        because the buffer is full or its data can't be serialized.
         """
         # Always log to structured logger first
         if self.enable_structured_logging:
             self._log_structured_event(event)
 
-        if not self.redis_client:
+        if self.redis_client is None and not redis_manager.available(self.redis_url):
             return True  # Still consider successful if structured logging worked
 
-        try:
-            # Store event in daily bucket
-            event_key = self._get_event_key(
-                event.shop_id,
-                event.event_type.value,
-                event.timestamp
-            )
+        if len(self._buffer) >= self.buffer_size:
+            self.stats["dropped"] += 1
+            emit_metric("observability_events", {"outcome": "dropped"})
+            return False
 
-            event_data = asdict(event)
-            event_data['timestamp'] = event.timestamp.isoformat()
-            event_data['event_type'] = event.event_type.value  # Convert enum to string
+        # Serialize now so one bad event can't fail a whole batch at flush time
+        try:
+            member = self._serialize_event(event)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Dropping unserializable {event.event_type.value} event: {e}")
+            self.stats["dropped"] += 1
+            emit_metric("observability_events", {"outcome": "unserializable"})
+            return False
 
-            # Add to sorted set with timestamp as score
-            score = event.timestamp.timestamp()
-            self.redis_client.zadd(
-                event_key,
-                {json.dumps(event_data): score}
-            )
+        self._buffer.append((event, member))
+        self.stats["accepted"] += 1
+        self._ensure_flusher()
+        if len(self._buffer) >= self.flush_batch_size:
+            self._flush_wakeup.set()
+        return True
+
+    def _ensure_flusher(self) -> None:
+        """Start the background flusher on the running loop if needed."""
+        loop = asyncio.get_running_loop()
+        task = self._flush_task
+        if self._flush_loop is loop and task is not None and not task.done():
+            return
+        self._flush_loop = loop
+        self._flush_wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = loop.create_task(self._run_flusher())
+
+    async def _run_flusher(self) -> None:
+        """Flush periodically, or early when a full batch is waiting."""
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_wakeup.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            await self.flush()
 
-            # Set TTL for event bucket (keep for 90 days)
-            self.redis_client.expire(event_key, 90 * 24 * 60 * 60)
+    async def flush(self) -> int:
+        """
+        Write all buffered events to Redis.
 
-            # Update real-time metrics
-            await self._update_realtime_metrics(event)
+        Returns:
+            Number of events written
+        """
+        if self._flush_lock is None or self._flush_loop is not asyncio.get_running_loop():
+            # No flusher on this loop yet (e.g. an explicit flush at shutdown)
+            self._flush_lock = asyncio.Lock()
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                count = min(len(self._buffer), self.flush_batch_size)
+                batch = [self._buffer.popleft() for _ in range(count)]
+                written += await self._write_batch(batch)
+        emit_metric("observability_buffer_depth", {"value": len(self._buffer)})
+        return written
+
+    async def close(self) -> None:
+        """Stop the flusher and write whatever is still buffered."""
+        task, self._flush_task = self._flush_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Buffer depth plus accepted/flushed/dropped event counters."""
+        return {"buffered": len(self._buffer), **self.stats}
+
+    @staticmethod
+    def _serialize_event(event: BusinessEvent) -> str:
+        """JSON member stored in the event's daily bucket."""
+        event_data = asdict(event)
+        event_data['timestamp'] = event.timestamp.isoformat()
+        event_data['event_type'] = event.event_type.value
+        return json.dumps(event_data)
+
+    async def _write_batch(self, batch: List[Tuple[BusinessEvent, str]]) -> int:
+        """Write a batch of events and their aggregates in one pipeline."""
+        client = await self._redis()
+        if client is None:
+            self._count_dropped(batch, "redis_unavailable")
+            return 0
+
+        event_keys = set()
+        event_counts: Counter = Counter()
+        outfit_counts: Counter = Counter()
+        outfit_times: Dict[str, tuple] = {}
+        try:
+            async with pipeline(client) as pipe:
+                for event, member in batch:
+                    # Store event in daily bucket with timestamp as score
+                    event_key = self._get_event_key(
+                        event.shop_id,
+                        event.event_type.value,
+                        event.timestamp
+                    )
+                    pipe.zadd(event_key, {member: event.timestamp.timestamp()})
+                    event_keys.add(event_key)
 
-            return True
+                    # Aggregate counters in process; one HINCRBY per key/field
+                    event_type = event.event_type.value
+                    count_key = self._get_metrics_key(event.shop_id, "event_counts")
+                    event_counts[(count_key, event_type)] += 1
+
+                    outfit_id = event.event_data.get("outfit_id")
+                    if outfit_id:
+                        outfit_key = self._get_metrics_key(
+                            event.shop_id, f"outfit_{outfit_id}"
+                        )
+                        outfit_counts[(outfit_key, f"event:{event_type}")] += 1
+                        first, last = outfit_times.get(
+                            outfit_key, (event.timestamp, event.timestamp)
+                        )
+                        outfit_times[outfit_key] = (
+                            min(first, event.timestamp), max(last, event.timestamp)
+                        )
+
+                # Keep event buckets for 90 days
+                for event_key in event_keys:
+                    pipe.expire(event_key, 90 * 24 * 60 * 60)
+                for (count_key, field), count in event_counts.items():
+                    pipe.hincrby(count_key, field, count)
+                for count_key in {key for key, _ in event_counts}:
+                    pipe.expire(count_key, 7 * 24 * 60 * 60)  # Keep for 7 days
+                for (outfit_key, field), count in outfit_counts.items():
+                    pipe.hincrby(outfit_key, field, count)
+                for outfit_key, (first, last) in outfit_times.items():
+                    pipe.hsetnx(outfit_key, "created_at", first.isoformat())
+                    pipe.hset(outfit_key, "last_updated", last.isoformat())
+                    pipe.expire(outfit_key, 90 * 24 * 60 * 60)  # Keep for 90 days
 
         except Exception as e:
-            logger.error(f"Failed to log event: {e}")
-            return False
+            logger.error(f"Failed to flush {len(batch)} events: {e}")
+            self.stats["flush_errors"] += 1
+            self._count_dropped(batch, "flush_error")
+            return 0
+
+        self.stats["flushed"] += len(batch)
+        self.stats["flushes"] += 1
+        emit_metric("observability_events", {"outcome": "flushed", "value": len(batch)})
+        return len(batch)
+
+    def _count_dropped(self, batch: List[Tuple[BusinessEvent, str]], outcome: str) -> None:
+        self.stats["dropped"] += len(batch)
+        emit_metric("observability_events", {"outcome": outcome, "value": len(batch)})
 
     def _log_structured_event(self, event: BusinessEvent) -> None:
         """Log event to structured logger."""
@@ -213,59 +383,6 @@ class ObservabilityService:
         except Exception as e:
             logger.error(f"Failed to log structured event: {e}")
 
-    async def _update_realtime_metrics(self, event: BusinessEvent) -> None:
-        """Update real-time aggregated metrics."""
-        if not self.redis_client:
-            return
-
-        try:
-            # Update event count metrics
-            count_key = self._get_metrics_key(event.shop_id, "event_counts")
-            current_counts = self.redis_client.get(count_key)
-
-            if current_counts:
-                counts = json.loads(current_counts)
-            else:
-                counts = {}
-
-            event_type = event.event_type.value
-            counts[event_type] = counts.get(event_type, 0) + 1
-
-            self.redis_client.set(
-                count_key,
-                json.dumps(counts),
-                ex=7 * 24 * 60 * 60,  # Keep for 7 days
-            )
-
-            # Update outfit-specific metrics if applicable
-            if "outfit" in event.event_data:
-                outfit_id = event.event_data.get("outfit_id")
-                if outfit_id:
-                    outfit_key = self._get_metrics_key(event.shop_id, f"outfit_{outfit_id}")
-                    current_outfit = self.redis_client.get(outfit_key)
-
-                    if current_outfit:
-                        outfit_data = json.loads(current_outfit)
-                    else:
-                        outfit_data = {
-                            "outfit_id": outfit_id,
-                            "created_at": event.timestamp.isoformat(),
-                            "events": {},
-                        }
-
-                    event_type = event.event_type.value
-                    outfit_data["events"][event_type] = outfit_data["events"].get(event_type, 0) + 1
-                    outfit_data["last_updated"] = event.timestamp.isoformat()
-
-                    self.redis_client.set(
-                        outfit_key,
-                        json.dumps(outfit_data),
-                        ex=90 * 24 * 60 * 60,  # Keep for 90 days
-                    )
-
-        except Exception as e:
-            logger.error(f"Failed to update realtime metrics: {e}")
-
     async def get_event_counts(
         self,
         shop_id: str,
@@ -283,35 +400,40 @@ class ObservabilityService:
         Returns:
             Dict of event_type -> count
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             return {}
 
         try:
-            counts = {}
-
-            # Check each day
+            # (event_type, key) for each day's bucket
+            buckets = []
             for i in range(days):
                 date = datetime.utcnow() - timedelta(days=i)
 
                 if event_types:
                     # Count specific event types
                     for event_type in event_types:
-                        key = self._get_event_key(shop_id, event_type, date)
-                        count = self.redis_client.zcount(key, '-inf', '+inf')
-                        counts[event_type] = counts.get(event_type, 0) + count
+                        buckets.append(
+                            (event_type, self._get_event_key(shop_id, event_type, date))
+                        )
                 else:
                     # Count all event types for this shop/date
                     pattern = f"events:{shop_id}:*:{date.strftime('%Y-%m-%d')}"
-                    keys = self.redis_client.keys(pattern)
-
-                    for key in keys:
+                    for key in await scan_keys(client, pattern):
                         # Extract event type from key
                         parts = key.split(":")
                         if len(parts) >= 3:
-                            event_type = parts[2]
-                            count = self.redis_client.zcount(key, '-inf', '+inf')
-                            counts[event_type] = counts.get(event_type, 0) + count
+                            buckets.append((parts[2], key))
 
+            # Count every bucket in one round trip
+            async with pipeline(client) as pipe:
+                for _, key in buckets:
+                    pipe.zcard(key)
+                sizes = await pipe.execute()
+
+            counts = {}
+            for (event_type, _), count in zip(buckets, sizes):
+                counts[event_type] = counts.get(event_type, 0) + count
             return counts
 
         except Exception as e:
@@ -335,29 +457,29 @@ class ObservabilityService:
         Returns:
             List of outfit performance data
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             return []
 
         try:
+            prefix = self._get_metrics_key(shop_id, "outfit_")
             if outfit_id:
                 # Get specific outfit
-                outfit_key = self._get_metrics_key(shop_id, f"outfit_{outfit_id}")
-                data = self.redis_client.get(outfit_key)
-
-                if data:
-                    return [json.loads(data)]
-                return []
+                outfit_keys = [f"{prefix}{outfit_id}"]
+            else:
+                # Get all outfit keys for this shop
+                outfit_keys = await scan_keys(client, f"{prefix}*")
 
-            # Get all outfit keys for this shop
-            pattern = f"metrics:{shop_id}:outfit_*"
-            outfit_keys = self.redis_client.keys(pattern)
+            # Fetch every outfit's counters in one round trip
+            async with pipeline(client) as pipe:
+                for key in outfit_keys:
+                    pipe.hgetall(key)
+                values = await pipe.execute()
 
             outfits = []
-            for key in outfit_keys:
-                data = self.redis_client.get(key)
+            for key, data in zip(outfit_keys, values):
                 if data:
-                    outfit_data = json.loads(data)
-                    outfits.append(outfit_data)
+                    outfits.append(self._outfit_from_hash(key[len(prefix):], data))
 
             # Sort by total events (descending)
             outfits.sort(
@@ -371,6 +493,19 @@ class ObservabilityService:
             logger.error(f"Failed to get outfit performance for shop {shop_id}: {e}")
             return []
 
+    @staticmethod
+    def _outfit_from_hash(outfit_id: str, data: Dict[str, str]) -> Dict[str, Any]:
+        """Outfit performance dict from its counter hash."""
+        return {
+            "outfit_id": outfit_id,
+            "created_at": data.get("created_at"),
+            "last_updated": data.get("last_updated"),
+            "events": {
+                field[len("event:"):]: int(value)
+                for field, value in data.items() if field.startswith("event:")
+            },
+        }
+
     async def get_user_journey(
         self,
         shop_id: str,
@@ -390,7 +525,8 @@ class ObservabilityService:
         Returns:
             List of user events in chronological order
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             return []
 
         try:
@@ -400,14 +536,15 @@ class ObservabilityService:
 
             # Get all event types for this shop
             pattern = f"events:{shop_id}:*"
-            event_keys = self.redis_client.keys(pattern)
+            event_keys = await scan_keys(client, pattern)
 
-            for key in event_keys:
-                # Get events after start time
-                event_list = self.redis_client.zrangebyscore(
-                    key, start_score, '+inf', withscores=True
-                )
+            # Get events after start time from every bucket in one round trip
+            async with pipeline(client) as pipe:
+                for key in event_keys:
+                    pipe.zrangebyscore(key, start_score, '+inf', withscores=True)
+                event_lists = await pipe.execute()
 
+            for event_list in event_lists:
                 for event_json, score in event_list:
                     event_data = json.loads(event_json)
 
@@ -7,12 +7,13 @@ when AI services are unavailable or slow.
 Features:
 - Exponential backoff retry
 - Fallback recommendation modes
-- Circuit breaker pattern
+- Circuit breaker pattern, shared across workers via Redis
 - Degraded mode logging
 - Async-compatible timeouts
 - Service health monitoring
 """
 import asyncio
+import json
 import logging
 import time
 from datetime import datetime, timedelta
@@ -22,17 +23,21 @@ from dataclasses import dataclass
 from enum import Enum
 import random
 import os
-try:
-    import redis
-except Exception:  # pragma: no cover - optional dependency
-    redis = None
 
-from app.core.redis_runtime import log_optional_redis_issue, redis_connection_kwargs
+from app.core.redis_runtime import (
+    log_optional_redis_issue,
+    pipeline,
+    redis_async,
+    redis_manager,
+)
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+# Pub/sub channel carrying circuit open/close transitions between workers
+CIRCUIT_CHANNEL = "circuit:transitions"
+
 
 class ServiceState(str, Enum):
     """Circuit breaker states."""
@@ -158,147 +163,314 @@ class ReliabilityGuard:
         self,
         redis_url: str = None,
         redis_client: Any = None,
+        shared_state: Optional[bool] = None,
+        local_ttl: Optional[float] = None,
     ):
         self.redis_url = redis_url or os.getenv(
             "REDIS_URL",
             "redis://localhost:6379/0"
         )
+        # Async client override (e.g. tests); otherwise the shared pool is used
         self.redis_client = redis_client
+        # Shared mode keeps circuit state in Redis so the whole fleet trips
+        # together; otherwise every process tracks its own circuits.
+        if shared_state is None:
+            shared_state = os.getenv("RELIABILITY_SHARED_STATE", "true").lower() in ("1", "true", "yes")
+        self.shared_state = shared_state
+        # How long a locally cached state is trusted before re-reading Redis.
+        # Transitions arrive sooner over pub/sub; the TTL covers lost messages.
+        self.local_ttl = (
+            local_ttl if local_ttl is not None
+            else float(os.getenv("RELIABILITY_LOCAL_TTL", "1.0"))
+        )
         self.circuit_breakers: Dict[str, CircuitBreakerState] = {}
         self.service_health: Dict[str, ServiceHealth] = {}
+        self._circuit_fetched_at: Dict[str, float] = {}
+        self._health_fetched_at: Dict[str, float] = {}
+        self._health_saved_at: Dict[str, float] = {}
+        self._subscriber_task: Optional[asyncio.Task] = None
+        self._subscriber_loop: Optional[asyncio.AbstractEventLoop] = None
 
-        if not self.redis_client:
-            if redis is None:
-                log_optional_redis_issue(logger, "Redis package not available. Reliability features limited.")
-                self.redis_client = None
-                return
-            try:
-                self.redis_client = redis.from_url(
-                    self.redis_url,
-                    **redis_connection_kwargs(),
-                )
-                # Test connection
-                self.redis_client.ping()
-                logger.info("Reliability guard initialized successfully")
-            except Exception as e:
-                log_optional_redis_issue(logger, f"Failed to connect to Redis: {e}. Reliability features limited.")
-                self.redis_client = None
+        if not self.redis_client and redis_async is None:
+            log_optional_redis_issue(logger, "Redis package not available. Reliability features limited.")
+
+    async def _redis(self) -> Optional[Any]:
+        """Redis client to use, or None while Redis is unavailable."""
+        if self.redis_client is not None:
+            return self.redis_client
+        return await redis_manager.acquire(self.redis_url)
 
     def _get_circuit_key(self, service_name: str) -> str:
-        """Generate Redis key for circuit breaker state."""
-        return f"circuit:{service_name}"
+        """Generate Redis key for the shared circuit state hash."""
+        return f"circuit:{service_name}:state"
+
+    def _get_failures_key(self, service_name: str) -> str:
+        """Generate Redis key for the shared consecutive-failure counter."""
+        return f"circuit:{service_name}:failures"
 
     def _get_health_key(self, service_name: str) -> str:
         """Generate Redis key for service health."""
         return f"health:{service_name}"
 
-    async def get_circuit_state(self, service_name: str) -> CircuitBreakerState:
-        """Get circuit breaker state for a service."""
-        if service_name in self.circuit_breakers:
-            return self.circuit_breakers[service_name]
+    def _is_fresh(self, fetched_at: Dict[str, float], service_name: str) -> bool:
+        fetched = fetched_at.get(service_name)
+        return fetched is not None and time.monotonic() - fetched < self.local_ttl
 
-        if not self.redis_client:
-            # Create default state
+    async def get_circuit_state(self, service_name: str) -> CircuitBreakerState:
+        """Get circuit breaker state for a service (locally cached)."""
+        state = self.circuit_breakers.get(service_name)
+        if state is None:
             state = CircuitBreakerState(service_name=service_name)
             self.circuit_breakers[service_name] = state
+
+        if not self.shared_state or self._is_fresh(self._circuit_fetched_at, service_name):
             return state
 
+        client = await self._redis()
+        if client is None:
+            return state
+
+        self._ensure_subscriber(client)
         try:
-            key = self._get_circuit_key(service_name)
-            data = self.redis_client.get(key)
+            async with pipeline(client) as pipe:
+                pipe.hgetall(self._get_circuit_key(service_name))
+                pipe.get(self._get_failures_key(service_name))
+                shared, failures = await pipe.execute()
+            self._apply_shared_state(state, shared, failures)
+        except Exception as e:
+            logger.error(f"Failed to get circuit state for {service_name}: {e}")
 
-            if data:
-                import json
-                state_dict = json.loads(data)
-                # Convert ISO timestamps
-                for field in ['last_failure_time', 'last_success_time', 'next_attempt_time']:
-                    if state_dict.get(field):
-                        state_dict[field] = datetime.fromisoformat(state_dict[field])
-                state = CircuitBreakerState(**state_dict)
-            else:
-                state = CircuitBreakerState(service_name=service_name)
+        self._circuit_fetched_at[service_name] = time.monotonic()
+        return state
 
-            self.circuit_breakers[service_name] = state
-            return state
+    def _apply_shared_state(
+        self,
+        state: CircuitBreakerState,
+        shared: Dict[str, str],
+        failures: Optional[str],
+    ) -> None:
+        """Overwrite the local copy with the fleet-wide state from Redis."""
+        state.failure_count = int(failures or 0)
+        if shared.get("state") == ServiceState.OPEN.value:
+            state.state = ServiceState.OPEN
+            next_attempt = shared.get("next_attempt_time")
+            state.next_attempt_time = (
+                datetime.fromisoformat(next_attempt) if next_attempt else None
+            )
+        else:
+            state.state = (
+                ServiceState.HALF_OPEN if state.failure_count else ServiceState.CLOSED
+            )
+            state.next_attempt_time = None
+
+    async def _publish_transition(self, client: Any, state: CircuitBreakerState) -> None:
+        """Store an open/close transition and broadcast it to the fleet.
+
+        Half-open states (failures below the threshold) are only broadcast,
+        so every worker knows the shared counter needs resetting on its next
+        success.
+        """
+        next_attempt = (
+            state.next_attempt_time.isoformat() if state.next_attempt_time else ""
+        )
+        message = json.dumps({
+            "service_name": state.service_name,
+            "state": state.state.value,
+            "failure_count": state.failure_count,
+            "next_attempt_time": next_attempt,
+        })
+        key = self._get_circuit_key(state.service_name)
+        async with pipeline(client) as pipe:
+            if state.state == ServiceState.OPEN:
+                pipe.hset(key, mapping={
+                    "state": state.state.value,
+                    "next_attempt_time": next_attempt,
+                })
+                pipe.expire(key, 24 * 60 * 60)  # Keep for 24 hours
+            elif state.state == ServiceState.CLOSED:
+                pipe.delete(key, self._get_failures_key(state.service_name))
+            pipe.publish(CIRCUIT_CHANNEL, message)
+
+    async def _record_success(self, state: CircuitBreakerState) -> None:
+        """Close the circuit; only touches Redis if it was not already clean.
+
+        Failures on other workers are broadcast as they happen, so a clean
+        local view means the shared counter is zero too (or was until a
+        few milliseconds ago).
+        """
+        was_clean = state.state == ServiceState.CLOSED and state.failure_count == 0
+        state.record_success()
+        if was_clean or not self.shared_state:
+            return
 
+        client = await self._redis()
+        if client is None:
+            return
+        try:
+            await self._publish_transition(client, state)
         except Exception as e:
-            logger.error(f"Failed to get circuit state for {service_name}: {e}")
-            state = CircuitBreakerState(service_name=service_name)
-            self.circuit_breakers[service_name] = state
-            return state
+            logger.error(f"Failed to save circuit state: {e}")
 
-    async def _save_circuit_state(self, state: CircuitBreakerState) -> None:
-        """Save circuit breaker state to Redis."""
-        if not self.redis_client:
+    async def _record_failure(self, state: CircuitBreakerState) -> None:
+        """Count a failure fleet-wide and open the circuit at the threshold."""
+        client = await self._redis() if self.shared_state else None
+        if client is None:
+            state.record_failure()
             return
 
         try:
-            key = self._get_circuit_key(state.service_name)
-            import json
-            state_dict = {
-                k: v.isoformat() if isinstance(v, datetime) else v
-                for k, v in state.__dict__.items()
-            }
-            self.redis_client.set(
-                key,
-                json.dumps(state_dict),
-                ex=24 * 60 * 60,  # Keep for 24 hours
-            )
+            key = self._get_failures_key(state.service_name)
+            async with pipeline(client) as pipe:
+                pipe.incr(key)
+                pipe.expire(key, 24 * 60 * 60)
+                failures, _ = await pipe.execute()
+            # record_failure adds this failure on top of everyone else's
+            state.failure_count = failures - 1
+            state.record_failure()
+            # Below the threshold this tells the other workers to reset the
+            # counter on their next success. Past it, it is re-published on
+            # every failure, so a failed recovery probe pushes back
+            # next_attempt_time for all
+            await self._publish_transition(client, state)
         except Exception as e:
             logger.error(f"Failed to save circuit state: {e}")
+            state.record_failure()
 
-    async def get_service_health(self, service_name: str) -> ServiceHealth:
-        """Get health status for a service."""
-        if service_name in self.service_health:
-            return self.service_health[service_name]
+    def _ensure_subscriber(self, client: Any) -> None:
+        """Listen for circuit transitions on the running loop if needed."""
+        loop = asyncio.get_running_loop()
+        task = self._subscriber_task
+        if self._subscriber_loop is loop and task is not None and not task.done():
+            return
+        self._subscriber_loop = loop
+        self._subscriber_task = loop.create_task(self._run_subscriber(client))
+
+    async def _run_subscriber(self, client: Any) -> None:
+        """Apply transitions published by other workers to the local cache."""
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(CIRCUIT_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_transition(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Restarted on the next cache refresh; the TTL covers the gap
+            logger.warning(f"Circuit transition subscriber stopped: {e}")
+
+    def _apply_transition(self, data: Any) -> None:
+        try:
+            if isinstance(data, bytes):
+                data = data.decode()
+            message = json.loads(data)
+            service_name = message["service_name"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed circuit transition: {e}")
+            return
+
+        state = self.circuit_breakers.get(service_name)
+        if state is None:
+            state = CircuitBreakerState(service_name=service_name)
+            self.circuit_breakers[service_name] = state
+        new_state = ServiceState(message.get("state", ServiceState.CLOSED.value))
+        if state.state == ServiceState.OPEN and new_state == ServiceState.HALF_OPEN:
+            # A below-threshold failure published before the circuit opened
+            return
+        state.state = new_state
+        state.failure_count = int(message.get("failure_count") or 0)
+        next_attempt = message.get("next_attempt_time")
+        state.next_attempt_time = (
+            datetime.fromisoformat(next_attempt) if next_attempt else None
+        )
+        self._circuit_fetched_at[service_name] = time.monotonic()
+
+    async def close(self) -> None:
+        """Stop listening for circuit transitions."""
+        task, self._subscriber_task = self._subscriber_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
-        if not self.redis_client:
+    async def get_service_health(self, service_name: str) -> ServiceHealth:
+        """Get health status for a service (locally cached)."""
+        health = self.service_health.get(service_name)
+        if health is not None and (
+            not self.shared_state or self._is_fresh(self._health_fetched_at, service_name)
+        ):
+            return health
+        if health is None:
             health = ServiceHealth(service_name=service_name)
             self.service_health[service_name] = health
+        if not self.shared_state:
+            return health
+
+        client = await self._redis()
+        if client is None:
             return health
 
         try:
             key = self._get_health_key(service_name)
-            data = self.redis_client.get(key)
+            data = await client.get(key)
 
             if data:
-                import json
                 health_dict = json.loads(data)
                 if health_dict.get('last_check'):
                     health_dict['last_check'] = datetime.fromisoformat(health_dict['last_check'])
                 health = ServiceHealth(**health_dict)
-            else:
-                health = ServiceHealth(service_name=service_name)
-
-            self.service_health[service_name] = health
-            return health
+                self.service_health[service_name] = health
 
         except Exception as e:
             logger.error(f"Failed to get service health for {service_name}: {e}")
-            health = ServiceHealth(service_name=service_name)
-            self.service_health[service_name] = health
-            return health
 
-    async def _save_service_health(self, health: ServiceHealth) -> None:
-        """Save service health to Redis."""
-        if not self.redis_client:
+        self._health_fetched_at[service_name] = time.monotonic()
+        return health
+
+    async def _save_service_health(
+        self, health: ServiceHealth, previous_level: DegradationLevel
+    ) -> None:
+        """Save service health to Redis, at most once per local TTL."""
+        if not self.shared_state:
+            return
+        saved_at = self._health_saved_at.get(health.service_name)
+        level_changed = health.degradation_level != previous_level
+        if (
+            not level_changed
+            and saved_at is not None
+            and time.monotonic() - saved_at < self.local_ttl
+        ):
+            return
+
+        client = await self._redis()
+        if client is None:
             return
 
         try:
             key = self._get_health_key(health.service_name)
-            import json
             health_dict = {
                 k: v.isoformat() if isinstance(v, datetime) else v
                 for k, v in health.__dict__.items()
             }
-            self.redis_client.set(
+            await client.set(
                 key,
                 json.dumps(health_dict),
                 ex=24 * 60 * 60,  # Keep for 24 hours
             )
+            self._health_saved_at[health.service_name] = time.monotonic()
         except Exception as e:
             logger.error(f"Failed to save service health: {e}")
 
+    async def _update_health(
+        self, service_name: str, success: bool, response_time: float
+    ) -> None:
+        health = await self.get_service_health(service_name)
+        previous_level = health.degradation_level
+        health.update_health(success=success, response_time=response_time)
+        await self._save_service_health(health, previous_level)
+
     async def execute_with_circuit_breaker(
         self,
         service_name: str,
@@ -329,13 +501,8 @@ class ReliabilityGuard:
             response_time = time.time() - start_time
 
             # Record success
-            state.record_success()
-            await self._save_circuit_state(state)
-
-            # Update health
-            health = await self.get_service_health(service_name)
-            health.update_health(success=True, response_time=response_time)
-            await self._save_service_health(health)
+            await self._record_success(state)
+            await self._update_health(service_name, True, response_time)
 
             return result
 
@@ -343,13 +510,8 @@ class ReliabilityGuard:
             response_time = time.time() - start_time
 
             # Record failure
-            state.record_failure()
-            await self._save_circuit_state(state)
-
-            # Update health
-            health = await self.get_service_health(service_name)
-            health.update_health(success=False, response_time=response_time)
-            await self._save_service_health(health)
+            await self._record_failure(state)
+            await self._update_health(service_name, False, response_time)
 
             # Try fallback if circuit allows
             if fallback_func and state.state != ServiceState.OPEN:
@@ -8,7 +8,9 @@ Features:
 - Tenant-scoped metrics storage
 - Event tracking with attribution
 - Revenue calculation with lookback windows
-- Async-compatible with Redis backend
+- Aggregates kept as Redis hash counters (HINCRBY), updated without
+  read-modify-write, with ratios derived on read
+- Async Redis backend (pooled redis.asyncio, non-blocking)
 - Graceful degradation on Redis failure
 """
 import json
@@ -19,12 +21,13 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 import os
 
-try:
-    import redis
-except Exception:  # pragma: no cover - optional dependency
-    redis = None
-
-from app.core.redis_runtime import log_optional_redis_issue, redis_connection_kwargs
+from app.core.redis_runtime import (
+    log_optional_redis_issue,
+    pipeline,
+    redis_async,
+    redis_manager,
+    scan_keys,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -82,6 +85,24 @@ class RevenueMetrics:
         return self.total_revenue_influenced / max(self.total_clicks, 1)
 
 
+# Outfit counter incremented per event type
+_EVENT_COUNTERS = {
+    AttributionEventType.OUTFIT_IMPRESSION: "impressions",
+    AttributionEventType.OUTFIT_CLICK: "clicks",
+    AttributionEventType.ADD_TO_CART: "add_to_cart",
+    AttributionEventType.ORDER_COMPLETED: "orders",
+}
+
+# Outfit counter -> shop-level RevenueMetrics field
+_SHOP_FIELDS = {
+    "impressions": "total_impressions",
+    "clicks": "total_clicks",
+    "add_to_cart": "total_add_to_cart",
+    "orders": "total_orders",
+    "revenue": "total_revenue_influenced",
+}
+
+
 class RevenueAttributionEngine:
     """
     Redis-backed revenue attribution engine.
@@ -101,24 +122,17 @@ class RevenueAttributionEngine:
             "redis://localhost:6379/0"
         )
         self.attribution_window_days = attribution_window_days
+        # Async client override (e.g. tests); otherwise the shared pool is used
         self.redis_client = redis_client
 
-        if not self.redis_client:
-            if redis is None:
-                log_optional_redis_issue(logger, "Redis package not available. Attribution disabled.")
-                self.redis_client = None
-                return
-            try:
-                self.redis_client = redis.from_url(
-                    self.redis_url,
-                    **redis_connection_kwargs(),
-                )
-                # Test connection
-                self.redis_client.ping()
-                logger.info("Revenue attribution engine initialized successfully")
-            except Exception as e:
-                log_optional_redis_issue(logger, f"Failed to connect to Redis: {e}. Attribution disabled.")
-                self.redis_client = None
+        if not self.redis_client and redis_async is None:
+            log_optional_redis_issue(logger, "Redis package not available. Attribution disabled.")
+
+    async def _redis(self) -> Optional[Any]:
+        """Redis client to use, or None while Redis is unavailable."""
+        if self.redis_client is not None:
+            return self.redis_client
+        return await redis_manager.acquire(self.redis_url)
 
     def _get_event_key(self, shop_id: str, event_type: str, date: datetime) -> str:
         """Generate Redis key for events."""
@@ -126,20 +140,26 @@ class RevenueAttributionEngine:
         return f"attribution:{shop_id}:{event_type}:{date_str}"
 
     def _get_metrics_key(self, shop_id: str) -> str:
-        """Generate Redis key for aggregated metrics."""
-        return f"metrics:{shop_id}"
+        """Generate Redis key for the shop's aggregated metrics hash."""
+        return f"revenue_metrics:{shop_id}"
 
     def _get_outfit_key(self, shop_id: str, outfit_id: str) -> str:
-        """Generate Redis key for outfit-specific metrics."""
-        return f"outfit:{shop_id}:{outfit_id}"
+        """Generate Redis key for an outfit's metrics hash."""
+        return f"revenue_outfit:{shop_id}:{outfit_id}"
 
     async def track_event(self, event: AttributionEvent) -> bool:
         """
         Track an attribution event.
 
+        The event and every aggregate it touches are written in one
+        pipelined round trip. Aggregates are Redis hash counters updated
+        with HINCRBY/HINCRBYFLOAT, so concurrent workers never overwrite
+        each other's updates.
+
         Returns True if successfully tracked, False otherwise.
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             logger.debug("Redis unavailable, skipping event tracking")
             return False
 
@@ -154,22 +174,17 @@ class RevenueAttributionEngine:
             event_data = asdict(event)
             event_data['timestamp'] = event.timestamp.isoformat()
 
-            # Add to sorted set with timestamp as score
             score = event.timestamp.timestamp()
-            self.redis_client.zadd(
-                event_key,
-                {json.dumps(event_data): score}
-            )
-
-            # Set TTL for event bucket (keep for attribution window + buffer)
             ttl_days = self.attribution_window_days + 7
-            self.redis_client.expire(event_key, ttl_days * 24 * 60 * 60)
-
-            # Update aggregated metrics
-            await self._update_metrics(event)
+            async with pipeline(client) as pipe:
+                # Add to sorted set with timestamp as score, and set TTL for
+                # the event bucket (attribution window + buffer)
+                pipe.zadd(event_key, {json.dumps(event_data): score})
+                pipe.expire(event_key, ttl_days * 24 * 60 * 60)
 
-            # Update outfit-specific metrics
-            await self._update_outfit_metrics(event)
+                # Update aggregated and outfit-specific metrics
+                self._queue_metrics(pipe, event)
+                self._queue_outfit_metrics(pipe, event)
 
             logger.debug(f"Tracked event: {event.event_type} for shop {event.shop_id}")
             return True
@@ -178,103 +193,78 @@ class RevenueAttributionEngine:
             logger.error(f"Failed to track event: {e}")
             return False
 
-    async def _update_metrics(self, event: AttributionEvent) -> None:
-        """Update aggregated metrics for the shop."""
-        if not self.redis_client:
-            return
-
-        try:
-            metrics_key = self._get_metrics_key(event.shop_id)
-
-            # Get current metrics
-            current_data = self.redis_client.get(metrics_key)
-            if current_data:
-                metrics = RevenueMetrics(**json.loads(current_data))
+    @staticmethod
+    def _counter_updates(event: AttributionEvent) -> List[tuple]:
+        """(field, amount) increments for an event, using outfit field names."""
+        field = _EVENT_COUNTERS.get(event.event_type)
+        if field is None:
+            return []
+        updates = [(field, 1)]
+        if event.event_type == AttributionEventType.ORDER_COMPLETED and event.revenue:
+            updates.append(("revenue", float(event.revenue)))
+        return updates
+
+    def _queue_metrics(self, pipe: Any, event: AttributionEvent) -> None:
+        """Queue the shop's aggregate counter increments on ``pipe``."""
+        metrics_key = self._get_metrics_key(event.shop_id)
+        for field, amount in self._counter_updates(event):
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(metrics_key, _SHOP_FIELDS[field], amount)
             else:
-                metrics = RevenueMetrics(shop_id=event.shop_id)
-
-            # Update counters
-            if event.event_type == AttributionEventType.OUTFIT_IMPRESSION:
-                metrics.total_impressions += 1
-            elif event.event_type == AttributionEventType.OUTFIT_CLICK:
-                metrics.total_clicks += 1
-            elif event.event_type == AttributionEventType.ADD_TO_CART:
-                metrics.total_add_to_cart += 1
-            elif event.event_type == AttributionEventType.ORDER_COMPLETED:
-                metrics.total_orders += 1
-                if event.revenue:
-                    metrics.total_revenue_influenced += event.revenue
-
-            # Recalculate derived metrics
-            metrics.average_order_value = (
-                metrics.total_revenue_influenced / max(metrics.total_orders, 1)
-            )
-            metrics.conversion_rate = (
-                metrics.total_orders / max(metrics.total_impressions, 1)
-            )
-            metrics.click_through_rate = (
-                metrics.total_clicks / max(metrics.total_impressions, 1)
-            )
-            metrics.last_updated = datetime.utcnow()
-
-            # Store updated metrics
-            self.redis_client.set(
-                metrics_key,
-                json.dumps(asdict(metrics)),
-                ex=365 * 24 * 60 * 60  # Keep for 1 year
-            )
-
-        except Exception as e:
-            logger.error(f"Failed to update metrics: {e}")
-
-    async def _update_outfit_metrics(self, event: AttributionEvent) -> None:
-        """Update outfit-specific metrics."""
-        if not self.redis_client:
-            return
-
-        try:
-            outfit_key = self._get_outfit_key(event.shop_id, event.outfit_id)
-
-            # Get current outfit metrics
-            current_data = self.redis_client.get(outfit_key)
-            if current_data:
-                outfit_metrics = json.loads(current_data)
+                pipe.hincrby(metrics_key, _SHOP_FIELDS[field], amount)
+        pipe.hset(metrics_key, "last_updated", datetime.utcnow().isoformat())
+        pipe.expire(metrics_key, 365 * 24 * 60 * 60)  # Keep for 1 year
+
+    def _queue_outfit_metrics(self, pipe: Any, event: AttributionEvent) -> None:
+        """Queue the outfit's counter increments on ``pipe``."""
+        outfit_key = self._get_outfit_key(event.shop_id, event.outfit_id)
+        pipe.hsetnx(outfit_key, "created_at", event.timestamp.isoformat())
+        for field, amount in self._counter_updates(event):
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(outfit_key, field, amount)
             else:
-                outfit_metrics = {
-                    "shop_id": event.shop_id,
-                    "outfit_id": event.outfit_id,
-                    "impressions": 0,
-                    "clicks": 0,
-                    "add_to_cart": 0,
-                    "orders": 0,
-                    "revenue": 0.0,
-                    "created_at": event.timestamp.isoformat(),
-                    "last_updated": event.timestamp.isoformat(),
-                }
-
-            # Update counters
-            if event.event_type == AttributionEventType.OUTFIT_IMPRESSION:
-                outfit_metrics["impressions"] += 1
-            elif event.event_type == AttributionEventType.OUTFIT_CLICK:
-                outfit_metrics["clicks"] += 1
-            elif event.event_type == AttributionEventType.ADD_TO_CART:
-                outfit_metrics["add_to_cart"] += 1
-            elif event.event_type == AttributionEventType.ORDER_COMPLETED:
-                outfit_metrics["orders"] += 1
-                if event.revenue:
-                    outfit_metrics["revenue"] += event.revenue
-
-            outfit_metrics["last_updated"] = datetime.utcnow().isoformat()
-
-            # Store updated outfit metrics
-            self.redis_client.set(
-                outfit_key,
-                json.dumps(outfit_metrics),
-                ex=90 * 24 * 60 * 60  # Keep for 90 days
-            )
+                pipe.hincrby(outfit_key, field, amount)
+        pipe.hset(outfit_key, "last_updated", datetime.utcnow().isoformat())
+        pipe.expire(outfit_key, 90 * 24 * 60 * 60)  # Keep for 90 days
+
+    @staticmethod
+    def _metrics_from_hash(shop_id: str, data: Dict[str, str]) -> RevenueMetrics:
+        """Build RevenueMetrics from counters, deriving the ratios."""
+        metrics = RevenueMetrics(
+            shop_id=shop_id,
+            total_impressions=int(data.get("total_impressions", 0)),
+            total_clicks=int(data.get("total_clicks", 0)),
+            total_add_to_cart=int(data.get("total_add_to_cart", 0)),
+            total_orders=int(data.get("total_orders", 0)),
+            total_revenue_influenced=float(data.get("total_revenue_influenced", 0.0)),
+        )
+        metrics.average_order_value = (
+            metrics.total_revenue_influenced / max(metrics.total_orders, 1)
+        )
+        metrics.conversion_rate = (
+            metrics.total_orders / max(metrics.total_impressions, 1)
+        )
+        metrics.click_through_rate = (
+            metrics.total_clicks / max(metrics.total_impressions, 1)
+        )
+        if data.get("last_updated"):
+            metrics.last_updated = datetime.fromisoformat(data["last_updated"])
+        return metrics
 
-        except Exception as e:
-            logger.error(f"Failed to update outfit metrics: {e}")
+    @staticmethod
+    def _outfit_from_hash(shop_id: str, outfit_id: str, data: Dict[str, str]) -> Dict[str, Any]:
+        """Outfit metrics dict from its counters."""
+        return {
+            "shop_id": shop_id,
+            "outfit_id": outfit_id,
+            "impressions": int(data.get("impressions", 0)),
+            "clicks": int(data.get("clicks", 0)),
+            "add_to_cart": int(data.get("add_to_cart", 0)),
+            "orders": int(data.get("orders", 0)),
+            "revenue": float(data.get("revenue", 0.0)),
+            "created_at": data.get("created_at"),
+            "last_updated": data.get("last_updated"),
+        }
 
     async def get_metrics(self, shop_id: str) -> Optional[RevenueMetrics]:
         """
@@ -282,21 +272,16 @@ class RevenueAttributionEngine:
 
         Returns None if no metrics found or Redis unavailable.
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             return None
 
         try:
             metrics_key = self._get_metrics_key(shop_id)
-            data = self.redis_client.get(metrics_key)
+            data = await client.hgetall(metrics_key)
 
             if data:
-                metrics_dict = json.loads(data)
-                # Convert ISO timestamp back to datetime
-                if metrics_dict.get('last_updated'):
-                    metrics_dict['last_updated'] = datetime.fromisoformat(
-                        metrics_dict['last_updated']
-                    )
-                return RevenueMetrics(**metrics_dict)
+                return self._metrics_from_hash(shop_id, data)
 
         except Exception as e:
             logger.error(f"Failed to get metrics for shop {shop_id}: {e}")
@@ -314,20 +299,28 @@ class RevenueAttributionEngine:
 
         Returns list of outfit metrics sorted by revenue.
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             return []
 
         try:
-            # Get all outfit keys for this shop
-            pattern = f"outfit:{shop_id}:*"
-            outfit_keys = self.redis_client.keys(pattern)
+            # Get all outfit keys for this shop, then their counters in one
+            # pipelined round trip
+            prefix = self._get_outfit_key(shop_id, "")
+            outfit_keys = await scan_keys(client, f"{prefix}*")
+
+            async with pipeline(client) as pipe:
+                for key in outfit_keys:
+                    pipe.hgetall(key)
+                values = await pipe.execute()
 
             outfits = []
-            for key in outfit_keys:
-                data = self.redis_client.get(key)
+            for key, data in zip(outfit_keys, values):
                 if data:
-                    outfit_data = json.loads(data)
-                    if outfit_data.get("impressions", 0) >= min_impressions:
+                    outfit_data = self._outfit_from_hash(
+                        shop_id, key[len(prefix):], data
+                    )
+                    if outfit_data["impressions"] >= min_impressions:
                         outfits.append(outfit_data)
 
             # Sort by revenue descending
@@ -348,7 +341,8 @@ class RevenueAttributionEngine:
 
         Uses attribution window to determine which orders were influenced.
         """
-        if not self.redis_client:
+        client = await self._redis()
+        if client is None:
             return {
                 "shop_id": shop_id,
                 "total_revenue_influenced": 0.0,
@@ -365,22 +359,33 @@ class RevenueAttributionEngine:
 
             # Scan for order events
             pattern = f"attribution:{shop_id}:{AttributionEventType.ORDER_COMPLETED.value}:*"
-            order_keys = self.redis_client.keys(pattern)
+            order_keys = await scan_keys(client, pattern)
 
+            # Keys whose date is within the lookback window
+            in_window = []
             for key in order_keys:
-                # Check if key date is within lookback window
                 try:
                     date_str = key.split(":")[-1]
-                    event_date = datetime.strptime(date_str, "%Y-%m-%d")
+                    event_date = datetime.strptime(date_str, "%Y-%m-%d").date()
                     if event_date >= start_date.date():
-                        # Get all events for this date
-                        events = self.redis_client.zrange(key, 0, -1)
-                        for event_json in events:
-                            event_data = json.loads(event_json)
-                            revenue = event_data.get("revenue", 0.0)
-                            total_revenue += revenue
-                            if revenue > 0:
-                                total_orders += 1
+                        in_window.append(key)
+                except (ValueError, IndexError):
+                    continue
+
+            # Fetch every day's events in one round trip
+            async with pipeline(client) as pipe:
+                for key in in_window:
+                    pipe.zrange(key, 0, -1)
+                daily_events = await pipe.execute()
+
+            for events in daily_events:
+                try:
+                    for event_json in events:
+                        event_data = json.loads(event_json)
+                        revenue = event_data.get("revenue", 0.0)
+                        total_revenue += revenue
+                        if revenue > 0:
+                            total_orders += 1
                 except (ValueError, IndexError):
                     continue
 
@@ -7,19 +7,33 @@ Features:
   provide an `idempotency_key` to allow safe retries.
 - Parses and logs `X-Shopify-Shop-Api-Call-Limit` to compute usage percentage.
 - Structured logging and optional metrics hook.
+- `AsyncShopifyClient` for async code: pooled `httpx.AsyncClient` per shop,
+  bounded per-shop concurrency, and a leaky-bucket scheduler driven by
+  `X-Shopify-Shop-Api-Call-Limit` and GraphQL `throttleStatus`, so requests
+  queue for capacity instead of blocking the event loop in `time.sleep`.
+- Full-catalog reads through GraphQL bulk operations, with the JSONL result
+  streamed and re-nested one product at a time (`iter_bulk_products`).
 
 Usage:
     client = ShopifyClient(shop_domain, access_token)
     resp = client.request("GET", "/admin/api/2023-10/products.json")
 
+    client = AsyncShopifyClient(shop_domain, access_token)
+    resp = await client.request("GET", "/admin/api/2023-10/products.json")
+
 """
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+import os
 import random
 import time
-from typing import Any, Dict, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
+import httpx
 import requests
 
 logger = logging.getLogger(__name__)
@@ -34,30 +48,91 @@ def parse_shop_api_call_limit(header_value: str) -> Optional[Tuple[int, int]]:
         return None
 
 
-class ShopifyClient:
-    def __init__(
-        self,
-        shop_domain: str,
-        access_token: str,
-        session: Optional[requests.Session] = None,
-        max_retries: int = 5,
-        backoff_base: float = 0.5,
-        rate_warn_threshold: float = 0.8,
-        metrics_hook: Optional[callable] = None,
-    ) -> None:
-        self.shop_domain = shop_domain
-        self.access_token = access_token
-        self.session = session or requests.Session()
-        self.max_retries = int(max_retries)
-        self.backoff_base = float(backoff_base)
-        self.rate_warn_threshold = float(rate_warn_threshold)
-        self.metrics_hook = metrics_hook
+class ShopifyBulkOperationError(Exception):
+    """A bulk operation was rejected, failed or did not finish in time."""
 
-        # session defaults
-        self.session.headers.update({
-            "Content-Type": "application/json",
-            "X-Shopify-Access-Token": self.access_token,
-        })
+
+BULK_RUN_MUTATION = """
+mutation bulkRun($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+BULK_STATUS_QUERY = """
+query bulkStatus($id: ID!) {
+  node(id: $id) {
+    ... on BulkOperation { id status errorCode objectCount url }
+  }
+}
+"""
+
+BULK_PRODUCTS_QUERY = """
+{
+  products {
+    edges {
+      node {
+        id title handle descriptionHtml productType vendor status tags
+        variants { edges { node { id title sku price } } }
+        images { edges { node { id url altText } } }
+      }
+    }
+  }
+}
+"""
+
+
+def _raise_graphql_errors(body: Dict[str, Any]) -> None:
+    if body.get("errors"):
+        raise ShopifyBulkOperationError(f"GraphQL errors: {body['errors']}")
+
+
+def _bulk_child_key(gid: str) -> str:
+    """List name for a child object: ProductVariant -> variants, Metafield -> metafields."""
+    if gid.count("/") < 4:
+        return "children"
+    type_name = gid.split("/")[3]
+    if type_name.startswith("Product") and len(type_name) > len("Product"):
+        type_name = type_name[len("Product"):]
+    return type_name[0].lower() + type_name[1:] + ("" if type_name.endswith("s") else "s")
+
+
+def _assemble_bulk_objects(lines: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """Fold bulk JSONL lines into nested objects, yielding each parent once complete."""
+    current: Optional[Dict[str, Any]] = None
+    # ids of the current object and its descendants, to attach grandchildren
+    members: Dict[str, Dict[str, Any]] = {}
+    for line in lines:
+        if not line:
+            continue
+        obj = json.loads(line)
+        parent_id = obj.pop("__parentId", None)
+        if parent_id is None:
+            if current is not None:
+                yield current
+            current = obj
+            members = {obj["id"]: obj} if "id" in obj else {}
+            continue
+        parent = members.get(parent_id)
+        if parent is None:
+            logger.warning("Bulk result line for unknown parent %s skipped", parent_id)
+            continue
+        parent.setdefault(_bulk_child_key(obj.get("id", "")), []).append(obj)
+        if "id" in obj:
+            members[obj["id"]] = obj
+    if current is not None:
+        yield current
+
+
+class _ShopifyClientBase:
+    """Retry policy, rate-limit logging and metrics shared by both clients."""
+
+    max_retries: int
+    backoff_base: float
+    rate_warn_threshold: float
+    metrics_hook: Optional[callable]
 
     def _emit_metric(self, name: str, payload: Dict[str, Any]) -> None:
         try:
@@ -66,7 +141,7 @@ class ShopifyClient:
         except Exception:
             logger.debug("metrics hook failed", exc_info=True)
 
-    def _should_retry(self, method: str, response: requests.Response, attempt: int, idempotency: Optional[str]) -> bool:
+    def _should_retry(self, method: str, response: Any, attempt: int, idempotency: Optional[str]) -> bool:
         # Retry on 429 or 5xx
         status = response.status_code
         if status == 429:
@@ -78,7 +153,7 @@ class ShopifyClient:
             return True
         return False
 
-    def _respect_rate_limit_header(self, response: requests.Response) -> None:
+    def _respect_rate_limit_header(self, response: Any) -> None:
         hdr = response.headers.get("X-Shopify-Shop-Api-Call-Limit")
         if not hdr:
             return
@@ -96,6 +171,32 @@ class ShopifyClient:
         jitter = random.uniform(0, base)
         return base + jitter
 
+
+class ShopifyClient(_ShopifyClientBase):
+    def __init__(
+        self,
+        shop_domain: str,
+        access_token: str,
+        session: Optional[requests.Session] = None,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        rate_warn_threshold: float = 0.8,
+        metrics_hook: Optional[callable] = None,
+    ) -> None:
+        self.shop_domain = shop_domain
+        self.access_token = access_token
+        self.session = session or requests.Session()
+        self.max_retries = int(max_retries)
+        self.backoff_base = float(backoff_base)
+        self.rate_warn_threshold = float(rate_warn_threshold)
+        self.metrics_hook = metrics_hook
+
+        # session defaults
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "X-Shopify-Access-Token": self.access_token,
+        })
+
     def request(
         self,
         method: str,
@@ -181,3 +282,381 @@ class ShopifyClient:
             payload["variables"] = variables
         resp = self.request("POST", url, json=payload, timeout=timeout)
         return resp.json()
+
+    def run_bulk_query(
+        self,
+        query: str,
+        poll_interval: float = 2.0,
+        max_wait: float = 3600.0,
+    ) -> Optional[str]:
+        """Run `query` as a bulk operation and return its JSONL result URL.
+
+        Submits `bulkOperationRunQuery` and polls the operation until it
+        finishes. Returns None when the query matched no objects; raises
+        `ShopifyBulkOperationError` if Shopify rejects or fails it.
+        """
+        body = self.graphql_request(BULK_RUN_MUTATION, {"query": query})
+        _raise_graphql_errors(body)
+        result = body["data"]["bulkOperationRunQuery"]
+        if result.get("userErrors"):
+            raise ShopifyBulkOperationError(f"Bulk query rejected: {result['userErrors']}")
+        operation_id = result["bulkOperation"]["id"]
+        logger.info("Started Shopify bulk operation %s", operation_id)
+
+        deadline = time.monotonic() + max_wait
+        while True:
+            body = self.graphql_request(BULK_STATUS_QUERY, {"id": operation_id})
+            _raise_graphql_errors(body)
+            operation = body["data"]["node"]
+            status = operation["status"]
+            if status == "COMPLETED":
+                self._emit_metric("shopify_bulk_completed", {"objects": int(operation.get("objectCount") or 0)})
+                return operation.get("url")
+            if status in ("FAILED", "CANCELED", "CANCELING", "EXPIRED"):
+                raise ShopifyBulkOperationError(
+                    f"Bulk operation {operation_id} {status.lower()}: {operation.get('errorCode')}"
+                )
+            if time.monotonic() >= deadline:
+                raise ShopifyBulkOperationError(f"Bulk operation {operation_id} still {status} after {max_wait:.0f}s")
+            time.sleep(poll_interval)
+
+    def iter_bulk_results(self, url: str, timeout: Optional[float] = 60.0) -> Iterator[Dict[str, Any]]:
+        """Stream a bulk result file, yielding one top-level object at a time.
+
+        Child objects (variants, images, ...) arrive as separate JSONL lines
+        after their parent; they are folded into lists on the parent, e.g.
+        `product["variants"]`. Only the current object is held in memory.
+        """
+        # The result is a signed storage URL: never send it the shop's token
+        resp = self.session.get(url, stream=True, timeout=timeout, headers={"X-Shopify-Access-Token": None})
+        try:
+            resp.raise_for_status()
+            yield from _assemble_bulk_objects(resp.iter_lines(chunk_size=64 * 1024))
+        finally:
+            resp.close()
+
+    def iter_bulk_products(self, query: Optional[str] = None, poll_interval: float = 2.0) -> Iterator[Dict[str, Any]]:
+        """Fetch the whole catalog with one bulk operation, streaming products."""
+        url = self.run_bulk_query(query or BULK_PRODUCTS_QUERY, poll_interval=poll_interval)
+        if url:
+            yield from self.iter_bulk_results(url)
+
+
+GRAPHQL_PATH = "/admin/api/2024-01/graphql.json"
+
+# Standard-plan bucket sizes until Shopify reports the shop's own
+REST_BUCKET_SIZE = 40
+REST_LEAK_SECONDS = 20  # a full REST bucket drains in 20s (2 calls/s for 40)
+GRAPHQL_BUCKET_SIZE = 1000
+GRAPHQL_RESTORE_RATE = 50
+DEFAULT_GRAPHQL_COST = 50
+
+
+def parse_retry_after(header_value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header in seconds; None for HTTP-dates or garbage."""
+    try:
+        wait = float(header_value)
+    except (TypeError, ValueError):
+        return None
+    return wait if wait > 0 else None
+
+
+class LeakyBucket:
+    """Client-side mirror of one of a shop's Shopify API buckets.
+
+    Callers queue (FIFO) until there is room for their cost rather than
+    sleeping; the level is corrected from what Shopify reports, which also
+    accounts for other processes using the same shop's bucket.
+    """
+
+    def __init__(self, capacity: float, leak_rate: float) -> None:
+        self.capacity = float(capacity)
+        self.leak_rate = float(leak_rate)
+        self._level = 0.0
+        # Reserved by requests still in flight, which Shopify has not counted yet
+        self._pending = 0.0
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def level(self) -> float:
+        self._leak()
+        return self._level
+
+    def _leak(self) -> None:
+        now = time.monotonic()
+        self._level = max(0.0, self._level - (now - self._updated) * self.leak_rate)
+        self._updated = now
+
+    def _wait_time(self, cost: float) -> float:
+        now = time.monotonic()
+        if now < self._resume_at:
+            return self._resume_at - now
+        self._leak()
+        # A cost above capacity could never fit; it goes once the bucket is empty
+        overflow = self._level + min(cost, self.capacity) - self.capacity
+        return overflow / self.leak_rate if overflow > 0 else 0.0
+
+    async def acquire(self, cost: float = 1.0) -> float:
+        """Wait until ``cost`` fits, then take it. Returns seconds spent queued."""
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                wait = self._wait_time(cost)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._level += cost
+            self._pending += cost
+        return time.monotonic() - start
+
+    def done(self, cost: float) -> None:
+        """Mark a reservation as sent; Shopify's next report includes it."""
+        self._pending = max(0.0, self._pending - cost)
+
+    def release(self, cost: float) -> None:
+        """Give back capacity that was reserved but not used."""
+        self._leak()
+        self._level = max(0.0, self._level - cost)
+
+    def observe(self, used: float, capacity: float, leak_rate: Optional[float] = None) -> None:
+        """Sync with the level Shopify reported on a response."""
+        self._leak()
+        self.capacity = float(capacity)
+        if leak_rate:
+            self.leak_rate = float(leak_rate)
+        self._level = float(used) + self._pending
+
+    def pause(self, seconds: float) -> None:
+        """Hold every queued caller for ``seconds`` (e.g. after Retry-After)."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+@dataclass
+class ShopConnection:
+    """Pooled HTTP client and rate-limit state of one shop."""
+    http: httpx.AsyncClient
+    semaphore: asyncio.Semaphore
+    rest_bucket: LeakyBucket
+    graphql_bucket: LeakyBucket
+
+
+class ShopifyConnectionPool:
+    """Per-shop connections and rate-limit state for `AsyncShopifyClient`.
+
+    Cached per (shop, event loop), so every client for a shop shares one
+    keep-alive pool, one concurrency limit (SHOPIFY_MAX_CONCURRENCY requests
+    in flight per shop) and one view of the shop's API buckets.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        self.max_concurrency = int(max_concurrency or os.getenv("SHOPIFY_MAX_CONCURRENCY", "4"))
+        # Custom transport, e.g. httpx.MockTransport in tests
+        self.transport = transport
+        self._shops: Dict[Tuple[str, Any], ShopConnection] = {}
+
+    def get(self, shop_domain: str) -> ShopConnection:
+        loop = asyncio.get_running_loop()
+        key = (shop_domain, loop)
+        conn = self._shops.get(key)
+        if conn is None:
+            # Forget connections of loops that have since been closed
+            for stale in [k for k in self._shops if k[1].is_closed()]:
+                self._shops.pop(stale)
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            )
+            conn = ShopConnection(
+                http=httpx.AsyncClient(
+                    base_url=f"https://{shop_domain}",
+                    headers={"Content-Type": "application/json"},
+                    limits=limits,
+                    transport=self.transport,
+                ),
+                semaphore=asyncio.Semaphore(self.max_concurrency),
+                rest_bucket=LeakyBucket(REST_BUCKET_SIZE, REST_BUCKET_SIZE / REST_LEAK_SECONDS),
+                graphql_bucket=LeakyBucket(GRAPHQL_BUCKET_SIZE, GRAPHQL_RESTORE_RATE),
+            )
+            self._shops[key] = conn
+        return conn
+
+    async def close(self) -> None:
+        """Close the connections owned by the running loop."""
+        loop = asyncio.get_running_loop()
+        for key in [k for k in self._shops if k[1] is loop]:
+            await self._shops.pop(key).http.aclose()
+
+
+shopify_pool = ShopifyConnectionPool()
+
+
+class AsyncShopifyClient(_ShopifyClientBase):
+    """Async counterpart of `ShopifyClient` for use inside the event loop.
+
+    Same retry policy, but requests wait in the shop's leaky bucket for
+    capacity (and for Retry-After) instead of sleeping, and at most
+    `max_concurrency` requests per shop are in flight at once.
+    """
+
+    def __init__(
+        self,
+        shop_domain: str,
+        access_token: str,
+        pool: Optional[ShopifyConnectionPool] = None,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        rate_warn_threshold: float = 0.8,
+        metrics_hook: Optional[callable] = None,
+    ) -> None:
+        self.shop_domain = shop_domain
+        self.access_token = access_token
+        self.pool = pool or shopify_pool
+        self.max_retries = int(max_retries)
+        self.backoff_base = float(backoff_base)
+        self.rate_warn_threshold = float(rate_warn_threshold)
+        self.metrics_hook = metrics_hook
+
+    def _observe_call_limit(self, response: httpx.Response, bucket: LeakyBucket) -> None:
+        self._respect_rate_limit_header(response)
+        parsed = parse_shop_api_call_limit(response.headers.get("X-Shopify-Shop-Api-Call-Limit", ""))
+        if parsed:
+            used, size = parsed
+            bucket.observe(used, size, size / REST_LEAK_SECONDS)
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        bucket: LeakyBucket,
+        cost: float,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Any] = None,
+        idempotency_key: Optional[str] = None,
+        timeout: Optional[float] = 10.0,
+    ) -> httpx.Response:
+        conn = self.pool.get(self.shop_domain)
+        headers = {"X-Shopify-Access-Token": self.access_token}
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+
+        attempt = 1
+        last_exception: Optional[Exception] = None
+
+        while attempt <= self.max_retries:
+            waited = await bucket.acquire(cost)
+            if waited > 0:
+                self._emit_metric("shopify_throttle_wait", {"wait": waited, "cost": cost})
+            try:
+                logger.debug("AsyncShopifyClient request attempt=%d method=%s path=%s", attempt, method, path)
+                async with conn.semaphore:
+                    resp = await conn.http.request(
+                        method, path, params=params, json=json, headers=headers, timeout=timeout
+                    )
+            except httpx.HTTPError as exc:
+                bucket.done(cost)
+                last_exception = exc
+                logger.warning("Network error during Shopify request: %s; attempt=%d", exc, attempt)
+                self._emit_metric("shopify_network_error", {"attempt": attempt})
+                await asyncio.sleep(self._compute_backoff(attempt))
+                attempt += 1
+                continue
+
+            bucket.done(cost)
+            self._observe_call_limit(resp, conn.rest_bucket)
+            if resp.is_success:
+                self._emit_metric("shopify_request_success", {"status": resp.status_code, "attempt": attempt})
+                return resp
+
+            if self._should_retry(method, resp, attempt, idempotency_key):
+                wait = parse_retry_after(resp.headers.get("Retry-After"))
+                if wait:
+                    # Everyone queued for this shop waits, not just this call
+                    logger.warning("Shopify returned Retry-After=%s; pausing shop queue", wait)
+                    self._emit_metric("shopify_retry_after", {"wait": wait})
+                    bucket.pause(wait)
+                else:
+                    backoff = self._compute_backoff(attempt)
+                    logger.warning("Retrying Shopify request: attempt=%d status=%d backoff=%.2f", attempt, resp.status_code, backoff)
+                    self._emit_metric("shopify_retry", {"attempt": attempt, "status": resp.status_code, "backoff": backoff})
+                    await asyncio.sleep(backoff)
+                attempt += 1
+                continue
+
+            self._emit_metric("shopify_request_failed", {"status": resp.status_code})
+            resp.raise_for_status()
+
+        logger.error("Shopify request failed after %d attempts", self.max_retries)
+        if last_exception:
+            raise last_exception
+        raise httpx.HTTPError(f"Shopify request failed after {self.max_retries} attempts")
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Any] = None,
+        idempotency_key: Optional[str] = None,
+        timeout: Optional[float] = 10.0,
+    ) -> httpx.Response:
+        """Perform a REST Admin API request; same contract as `ShopifyClient.request`."""
+        conn = self.pool.get(self.shop_domain)
+        return await self._send(
+            method, path, conn.rest_bucket, 1,
+            params=params, json=json, idempotency_key=idempotency_key, timeout=timeout,
+        )
+
+    async def graphql_request(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = 10.0,
+        estimated_cost: float = DEFAULT_GRAPHQL_COST,
+    ) -> Dict[str, Any]:
+        """Perform a GraphQL request, queueing on the shop's cost bucket.
+
+        `estimated_cost` is reserved up front and corrected from the
+        response's `extensions.cost`; throttled queries are queued again
+        until the bucket has restored their requested cost.
+        """
+        bucket = self.pool.get(self.shop_domain).graphql_bucket
+        payload = {"query": query}
+        if variables:
+            payload["variables"] = variables
+
+        body: Dict[str, Any] = {}
+        for attempt in range(1, self.max_retries + 1):
+            resp = await self._send("POST", GRAPHQL_PATH, bucket, estimated_cost, json=payload, timeout=timeout)
+            body = resp.json()
+            cost = (body.get("extensions") or {}).get("cost") or {}
+            self._observe_query_cost(bucket, estimated_cost, cost)
+            if not _is_throttled(body):
+                return body
+            estimated_cost = float(cost.get("requestedQueryCost") or estimated_cost)
+            logger.warning("Shopify GraphQL throttled; requeueing cost=%.0f attempt=%d", estimated_cost, attempt)
+            self._emit_metric("shopify_graphql_throttled", {"attempt": attempt, "cost": estimated_cost})
+        return body
+
+    def _observe_query_cost(self, bucket: LeakyBucket, reserved: float, cost: Dict[str, Any]) -> None:
+        status = cost.get("throttleStatus")
+        if status:
+            maximum = float(status["maximumAvailable"])
+            bucket.observe(
+                maximum - float(status["currentlyAvailable"]),
+                maximum,
+                status.get("restoreRate"),
+            )
+            return
+        actual = cost.get("actualQueryCost")
+        # Throttled queries report no actual cost and consumed nothing
+        bucket.release(reserved - float(actual) if actual is not None else reserved)
+
+
+def _is_throttled(body: Dict[str, Any]) -> bool:
+    return any(
+        (error.get("extensions") or {}).get("code") == "THROTTLED"
+        for error in body.get("errors") or []
+        if isinstance(error, dict)
+    )
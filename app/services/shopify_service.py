@@ -2,7 +2,7 @@
 
 This is a lightweight wrapper used by higher-level app code.
 """
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
 
 from app.services.shopify_client import ShopifyClient
 from app.core.tenant import TenantContext
@@ -31,3 +31,12 @@ class ShopifyService:
         resp = client.request("POST", "/admin/api/2023-10/products.json", json=payload, idempotency_key=idempotency_key)
         return resp.json()
 
+    def iter_all_products(self, tenant: TenantContext) -> Iterator[Dict[str, Any]]:
+        """Stream the shop's whole catalog via a GraphQL bulk operation.
+
+        Products carry their `variants` and `images` as lists. Memory use is
+        independent of catalog size, so this is the path for full-catalog
+        optimization and indexing rather than paging `get_products`.
+        """
+        client = self._client_for_tenant(tenant)
+        return client.iter_bulk_products()
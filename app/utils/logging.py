@@ -15,98 +15,84 @@ from typing import Any, Dict
 from datetime import datetime
 
 
+REDACTED = "***REDACTED***"
+
+# Every redaction rule as one alternation, so a message is scanned once.
+# At a given position the first alternative wins; "authorization:" swallows
+# its scheme so "Authorization: Bearer x" cannot leak x.
+_REDACTION_PATTERN = re.compile(
+    r"""
+    (?P<authorization>authorization:\s*(?:(?:bearer|basic|token)\s+)?\S+)
+    |(?P<bearer>bearer\s+\S+)
+    |(?P<x_api_key>x-api-key:\s*\S+)
+    |(?P<secret>(?P<key>access[_-]?token|api[_-]?key|password|secret|token)
+        ["']?\s*[:=]\s*["']?\S+?["']?(?=[\s,]|$))
+    |(?P<email>(?<![\w.%+-])(?P<email_first>\w)[\w.%+-]*@
+        (?P<email_domain>[a-z0-9.-]+\.\w+))
+    |(?P<shop>(?P<shop_name>[a-z0-9][a-z0-9-]*)\.myshopify\.com)
+    |(?P<card>\b(?:\d{4}[\s-]?){3}\d{4}\b)
+    |(?P<ssn>\b\d{3}-\d{2}-(?P<ssn_last4>\d{4})\b)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Every rule needs one of these (cards and SSNs need a run of digits, not
+# just any digit); messages without any skip the scan above
+_TRIGGER_PATTERN = re.compile(
+    r"[@:=]|bearer|myshopify|\d{4}[\s-]?\d|\d{3}-\d", re.IGNORECASE
+)
+
+_KEY_LABELS = {"accesstoken": "access_token", "apikey": "api_key"}
+
+
+def _mask_shop_name(shop_name: str) -> str:
+    """Show the first 3 chars of a shop name (only the first if it is short)."""
+    visible = 1 if len(shop_name) <= 3 else 3
+    return shop_name[:visible] + "*" * (len(shop_name) - visible)
+
+
+def _redact_match(match: "re.Match[str]") -> str:
+    kind = match.lastgroup
+    if kind == "authorization":
+        return f"Authorization: {REDACTED}"
+    if kind == "bearer":
+        return f"Bearer {REDACTED}"
+    if kind == "x_api_key":
+        return f"X-API-Key: {REDACTED}"
+    if kind == "secret":
+        key = match.group("key").lower().replace("-", "_")
+        return f"{_KEY_LABELS.get(key, key)}: {REDACTED}"
+    if kind == "email":
+        domain = match.group("email_domain")
+        if domain.lower().endswith(".myshopify.com"):
+            shop_name = domain[:-len(".myshopify.com")]
+            domain = f"{_mask_shop_name(shop_name)}.myshopify.com"
+        return f"{match.group('email_first')}***@{domain}"
+    if kind == "shop":
+        return f"{_mask_shop_name(match.group('shop_name'))}.myshopify.com"
+    if kind == "card":
+        return "****-****-****-****"
+    return f"***-**-{match.group('ssn_last4')}"
+
+
 class PIISafeFormatter(logging.Formatter):
     """Logging formatter that redacts PII from log records."""
-    
-    # Token patterns
-    TOKEN_PATTERNS = [
-        (r'bearer\s+(\S+)', 'Bearer ***REDACTED***'),
-        (r'authorization:\s*(\S+)', 'Authorization: ***REDACTED***'),
-        (r'x-api-key:\s*(\S+)', 'X-API-Key: ***REDACTED***'),
-        (r'api[_-]?key["\']?\s*[:=]\s*["\']?(\S+?)["\']?(?:\s|,|$)', 'api_key: ***REDACTED***'),
-        (r'password["\']?\s*[:=]\s*["\']?(\S+?)["\']?(?:\s|,|$)', 'password: ***REDACTED***'),
-        (r'secret["\']?\s*[:=]\s*["\']?(\S+?)["\']?(?:\s|,|$)', 'secret: ***REDACTED***'),
-        (r'token["\']?\s*[:=]\s*["\']?(\S+?)["\']?(?:\s|,|$)', 'token: ***REDACTED***'),
-        (r'access[_-]?token["\']?\s*[:=]\s*["\']?(\S+?)["\']?(?:\s|,|$)', 'access_token: ***REDACTED***'),
-    ]
-    
-    # Shop domain masking
-    SHOP_DOMAIN_PATTERN = r'([a-z0-9]+)\.myshopify\.com'
-    
-    # Email masking
-    EMAIL_PATTERN = r'(\w)[a-z0-9._%+-]*@[a-z0-9.-]+\.\w+'
-    
-    @staticmethod
-    def _mask_token(msg: str) -> str:
-        """Remove bearer tokens and API keys from message."""
-        for pattern, replacement in PIISafeFormatter.TOKEN_PATTERNS:
-            msg = re.sub(pattern, replacement, msg, flags=re.IGNORECASE)
-        return msg
-    
-    @staticmethod
-    def _mask_shop_domain(msg: str) -> str:
-        """Partially mask shop domain (show first 3 chars only)."""
-        def replace_domain(match):
-            shop_name = match.group(1)
-            if len(shop_name) <= 3:
-                masked = shop_name[0] + '*' * (len(shop_name) - 1)
-            else:
-                masked = shop_name[:3] + '*' * (len(shop_name) - 3)
-            return f"{masked}.myshopify.com"
-        
-        return re.sub(
-            PIISafeFormatter.SHOP_DOMAIN_PATTERN,
-            replace_domain,
-            msg,
-            flags=re.IGNORECASE
-        )
-    
-    @staticmethod
-    def _mask_email(msg: str) -> str:
-        """Mask email addresses (show only first char and domain)."""
-        def replace_email(match):
-            first_char = match.group(1)
-            # Extract domain from full match
-            email_match = re.search(r'@([a-z0-9.-]+\.\w+)', match.group(0))
-            if email_match:
-                domain = email_match.group(1)
-                return f"{first_char}***@{domain}"
-            return "***@***"
-        
-        return re.sub(
-            PIISafeFormatter.EMAIL_PATTERN,
-            replace_email,
-            msg,
-            flags=re.IGNORECASE
-        )
-    
-    @staticmethod
-    def _mask_credit_card(msg: str) -> str:
-        """Mask credit card numbers (show only last 4 digits)."""
-        # Visa, Mastercard, Amex patterns
-        pattern = r'\b(?:\d{4}[\s-]?){3}\d{4}\b'
-        return re.sub(pattern, '****-****-****-****', msg)
-    
-    @staticmethod
-    def _mask_ssn(msg: str) -> str:
-        """Mask social security numbers."""
-        pattern = r'\b\d{3}-\d{2}-(\d{4})\b'
-        return re.sub(pattern, r'***-**-\1', msg)
-    
+
     @staticmethod
     def sanitize(msg: Any) -> str:
-        """Apply all sanitization rules."""
+        """
+        Apply all sanitization rules in a single pass.
+
+        Redacts bearer tokens, API keys, passwords and secrets, masks shop
+        domains (first 3 chars), emails (first char and domain), card
+        numbers and SSNs (last 4 digits).
+        """
         if not isinstance(msg, str):
             msg = str(msg)
-        
-        msg = PIISafeFormatter._mask_token(msg)
-        msg = PIISafeFormatter._mask_shop_domain(msg)
-        msg = PIISafeFormatter._mask_email(msg)
-        msg = PIISafeFormatter._mask_credit_card(msg)
-        msg = PIISafeFormatter._mask_ssn(msg)
-        
-        return msg
-    
+        if not _TRIGGER_PATTERN.search(msg):
+            return msg
+        return _REDACTION_PATTERN.sub(_redact_match, msg)
+
     def format(self, record: logging.LogRecord) -> str:
         """Format log record with PII redaction."""
         # Sanitize message
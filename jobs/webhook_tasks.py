@@ -9,13 +9,16 @@ from typing import Dict, Any
 from jobs.redis_conn import get_redis_connection
 from app.services.data_deletion import DataDeletionService
 from app.services.gdpr_requests import record_customer_redaction, record_data_request
-from app.db.models import SessionLocal
+from app.db.models import SessionLocal, init_db
 
 logger = logging.getLogger(__name__)
 
 WEBHOOK_STATUS_TTL_SECONDS = 60 * 60 * 24 * 2  # 2 days
 WEBHOOK_DLQ_KEY = "webhook:dead_letter"
 
+# Workers never run the API's startup, so they create the schema themselves
+_db_initialized = False
+
 
 def _status_key(delivery_key: str) -> str:
     return f"webhook:delivery:{delivery_key}"
@@ -60,12 +63,20 @@ def _record_dead_letter(redis_conn, payload: Dict[str, Any]) -> None:
         logger.debug("Failed to push webhook DLQ record", exc_info=True)
 
 
+def _open_session():
+    global _db_initialized
+    if not _db_initialized:
+        init_db()
+        _db_initialized = True
+    return SessionLocal()
+
+
 def _run_uninstall_cleanup(shop_domain: str, redis_conn) -> Dict[str, Any]:
     """Execute hard-delete cleanup for a shop."""
     if not shop_domain:
         raise ValueError("missing_shop_domain")
 
-    db = SessionLocal()
+    db = _open_session()
     try:
         deletion = DataDeletionService(db=db, redis=redis_conn)
         audit = asyncio.run(deletion.delete_shop_data(shop_domain))
@@ -0,0 +1,125 @@
+"""
+Per-request overhead of billing_enforcement_middleware.
+
+Drives the middleware directly with a stub request and a no-op call_next
+for a handful of shops, and compares:
+
+- uncached: a BillingService and an is_active_or_in_trial() lookup for
+  every request, as before the entitlement cache
+- cached:   the middleware as shipped, with the per-shop entitlement cache
+
+Lookups go to the database at DATABASE_URL (default: a temporary SQLite
+file) seeded with one active subscription per shop, or to the in-memory
+store with --store.
+
+Usage:
+    python scripts/benchmark_billing_middleware.py
+    python scripts/benchmark_billing_middleware.py --requests 20000 --shops 50 --store
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+if "DATABASE_URL" not in os.environ:
+    _db_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/billing_bench.db"
+
+from app.db.models import SessionLocal, Shop, Subscription, init_db  # noqa: E402
+from app.middleware import billing  # noqa: E402
+from app.models.billing import SubscriptionRecord  # noqa: E402
+from app.services.billing_service import BillingService, InMemoryStore  # noqa: E402
+from app.services.entitlement_cache import entitlement_cache  # noqa: E402
+
+
+def shop_name(i):
+    return f"bench-{i}.myshopify.com"
+
+
+def seed(shops, use_store):
+    if use_store:
+        store = InMemoryStore()
+        for i in range(shops):
+            store.subs[shop_name(i)] = SubscriptionRecord(
+                shop_domain=shop_name(i), plan_name="starter", status="active"
+            )
+        return store
+    init_db()
+    db = SessionLocal()
+    try:
+        for i in range(shops):
+            if db.query(Shop).filter(Shop.domain == shop_name(i)).first():
+                continue
+            shop = Shop(domain=shop_name(i), access_token="token")
+            db.add(shop)
+            db.flush()
+            db.add(Subscription(shop_id=shop.id, plan_name="starter", status="active"))
+        db.commit()
+    finally:
+        db.close()
+    return None
+
+
+def make_request(shop, store, db):
+    return SimpleNamespace(
+        url=SimpleNamespace(path="/api/ai/infer"),
+        state=SimpleNamespace(
+            tenant=SimpleNamespace(shop_domain=shop, access_token="token"),
+            db=db,
+        ),
+        app=SimpleNamespace(state=SimpleNamespace(store=store)),
+    )
+
+
+async def uncached_middleware(request, call_next):
+    """The previous middleware body: one lookup per request."""
+    backend = request.app.state.store or request.state.db
+    svc = BillingService(request.state.tenant.shop_domain, request.state.tenant.access_token, backend)
+    if not await svc.is_active_or_in_trial():
+        raise RuntimeError("benchmark shop should be entitled")
+    return await call_next(request)
+
+
+async def call_next(request):
+    return None
+
+
+async def run(middleware, requests, shops, store):
+    db = None if store is not None else SessionLocal()
+    try:
+        start = time.perf_counter()
+        for i in range(requests):
+            await middleware(make_request(shop_name(i % shops), store, db), call_next)
+        return (time.perf_counter() - start) / requests * 1e6
+    finally:
+        if db is not None:
+            db.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--shops", type=int, default=20)
+    parser.add_argument("--store", action="store_true", help="use the in-memory store instead of SQLite")
+    args = parser.parse_args()
+
+    store = seed(args.shops, args.store)
+    backend = "in-memory store" if args.store else os.environ["DATABASE_URL"]
+    print(f"{args.requests} requests over {args.shops} shops ({backend})")
+    print(f"{'middleware':<12}{'us/request':>12}")
+    uncached = await run(uncached_middleware, args.requests, args.shops, store)
+    entitlement_cache.clear()
+    cached = await run(billing.billing_enforcement_middleware, args.requests, args.shops, store)
+    print(f"{'uncached':<12}{uncached:>12.1f}")
+    print(f"{'cached':<12}{cached:>12.1f}")
+    print(f"speedup: {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
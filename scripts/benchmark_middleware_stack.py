@@ -0,0 +1,193 @@
+"""
+Per-request overhead of the API middleware stack.
+
+Calls a cheap endpoint through the ASGI interface directly (no server, no
+network) and reports microseconds per request for:
+
+- none:   the bare FastAPI app
+- legacy: the previous chain of @app.middleware("http") functions plus the
+          BaseHTTPMiddleware rate limiter
+- asgi:   the pure ASGI stack from app.main
+
+Each stack is also built up one layer at a time, outermost first, so the
+marginal cost of every layer is visible. The rate limiter always allows and
+billing answers from a warm entitlement cache, so only middleware overhead
+is measured.
+
+Usage:
+    python scripts/benchmark_middleware_stack.py
+    python scripts/benchmark_middleware_stack.py --requests 20000 --repeat 7
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/middleware_bench.db"
+
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.core.metrics_middleware import metrics_middleware  # noqa: E402
+from app.core.request_id import request_id_middleware  # noqa: E402
+from app.core.tenant import ShopifyTenantMiddleware, tenant_middleware  # noqa: E402
+from app.middleware.billing import BillingMiddleware, billing_enforcement_middleware  # noqa: E402
+from app.middleware.context import RequestContextMiddleware  # noqa: E402
+from app.middleware.db_session import db_session_middleware  # noqa: E402
+from app.middleware.observability import latency_middleware  # noqa: E402
+from app.middleware.rate_limiter import RateLimitDecision, RateLimitMiddleware  # noqa: E402
+from app.middleware.timeout import TimeoutMiddleware, request_timeout_middleware  # noqa: E402
+from app.models.billing import SubscriptionRecord  # noqa: E402
+from app.services.billing_service import InMemoryStore  # noqa: E402
+
+SHOP = "bench.myshopify.com"
+HEADERS = [
+    (b"host", b"testserver"),
+    (b"x-shopify-shop-domain", SHOP.encode()),
+    (b"authorization", b"Bearer token"),
+]
+
+
+class AllowAllLimiter:
+    async def acquire(self, shop_id, ip, category="public"):
+        return RateLimitDecision(True, 300, 299)
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """The previous BaseHTTPMiddleware version of RateLimitMiddleware."""
+
+    def __init__(self, app, limiter):
+        super().__init__(app)
+        self.helpers = RateLimitMiddleware(app, limiter=limiter)
+        self.limiter = limiter
+
+    async def dispatch(self, request, call_next):
+        decision = await self.limiter.acquire(
+            self.helpers._get_shop_id(request),
+            self.helpers._get_client_ip(request),
+            self.helpers._get_category(request),
+        )
+        request.state.rate_limit_remaining = decision.remaining
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(decision.limit)
+        response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
+        return response
+
+
+# Layers innermost first, as registered in app.main
+LEGACY_LAYERS = [
+    ("metrics", lambda app: app.middleware("http")(metrics_middleware)),
+    ("timeout", lambda app: app.middleware("http")(request_timeout_middleware)),
+    ("latency", lambda app: app.middleware("http")(latency_middleware)),
+    ("rate_limit", lambda app: app.add_middleware(LegacyRateLimitMiddleware, limiter=AllowAllLimiter())),
+    ("billing", lambda app: app.middleware("http")(billing_enforcement_middleware)),
+    ("tenant", lambda app: app.middleware("http")(tenant_middleware)),
+    ("db_session", lambda app: app.middleware("http")(db_session_middleware)),
+    ("request_id", lambda app: app.middleware("http")(request_id_middleware)),
+]
+ASGI_LAYERS = [
+    ("timeout", lambda app: app.add_middleware(TimeoutMiddleware)),
+    ("rate_limit", lambda app: app.add_middleware(RateLimitMiddleware, limiter=AllowAllLimiter())),
+    ("billing", lambda app: app.add_middleware(BillingMiddleware)),
+    ("tenant", lambda app: app.add_middleware(ShopifyTenantMiddleware)),
+    ("context", lambda app: app.add_middleware(RequestContextMiddleware)),
+]
+
+
+def build_app(layers):
+    app = FastAPI()
+    store = InMemoryStore()
+    store.subs[SHOP] = SubscriptionRecord(shop_domain=SHOP, plan_name="starter", status="active")
+    app.state.store = store
+
+    @app.get("/api/widget/config")
+    async def widget_config():
+        return {"enabled": True, "theme": "light"}
+
+    for _, register in layers:
+        register(app)
+    return app
+
+
+async def call(app, scope):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(dict(scope, state={}), receive, send)
+    if status != [200]:
+        raise RuntimeError(f"benchmark request failed with {status}")
+
+
+async def time_per_request(app, requests, repeat):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/widget/config",
+        "raw_path": b"/api/widget/config",
+        "query_string": b"",
+        "root_path": "",
+        "headers": HEADERS,
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    for _ in range(50):  # warm up caches and the middleware stack
+        await call(app, scope)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await call(app, scope)
+        best = min(best, time.perf_counter() - start)
+    return best / requests * 1e6
+
+
+async def report(name, layers, args, baseline):
+    total = await time_per_request(build_app(layers), args.requests, args.repeat)
+    print(f"{name:<28}{total:>10.1f}{total - baseline:>12.1f}")
+    if args.layers:
+        # Outermost first: inner layers rely on state set by outer ones
+        previous = baseline
+        for i in range(len(layers) - 1, -1, -1):
+            cost = await time_per_request(build_app(layers[i:]), args.requests, args.repeat)
+            print(f"  + {layers[i][0]:<24}{cost:>10.1f}{cost - previous:>12.1f}")
+            previous = cost
+    return total
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-layers", dest="layers", action="store_false",
+                        help="only time the full stacks")
+    args = parser.parse_args()
+    # The latency middleware logs every request; keep the output to timings
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"{args.requests} requests, best of {args.repeat}")
+    print(f"{'stack':<28}{'us/req':>10}{'overhead':>12}")
+    baseline = await time_per_request(build_app([]), args.requests, args.repeat)
+    print(f"{'none':<28}{baseline:>10.1f}{0:>12.1f}")
+    legacy = await report("legacy (http middlewares)", LEGACY_LAYERS, args, baseline)
+    current = await report("asgi", ASGI_LAYERS, args, baseline)
+    print(f"middleware overhead: {legacy - baseline:.1f}us -> {current - baseline:.1f}us per request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
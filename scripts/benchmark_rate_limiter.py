@@ -0,0 +1,153 @@
+"""
+Load benchmark for the rate limiter.
+
+Compares the previous fixed-window limiter (blocking INCR/EXPIRE/TTL calls
+inside the event loop) with the Lua GCRA limiter, with and without local
+token leases, under concurrent requests from a handful of shops.
+
+Usage:
+    REDIS_URL=redis://localhost:6379/15 python scripts/benchmark_rate_limiter.py
+    python scripts/benchmark_rate_limiter.py --fake   # in-process fakeredis
+
+Use a scratch database: the benchmark deletes its ratelimit:* keys.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.middleware.rate_limiter import RateLimitConfig, RateLimiter  # noqa: E402
+
+
+class LegacyFixedWindowLimiter:
+    """The previous check_limit: up to four blocking round trips per request."""
+
+    def __init__(self, client, limit):
+        self.client = client
+        self.limit = limit
+
+    async def check_limit(self, shop_id, ip, category="public"):
+        key = f"ratelimit:shop:{shop_id}:{int(time.time() / 60)}"
+        current = self.client.incr(key)
+        if current == 1:
+            self.client.expire(key, 60)
+        ttl = self.client.ttl(key)
+        if ttl == -1:
+            self.client.expire(key, 60)
+            ttl = 60
+        return current <= self.limit, None if current <= self.limit else ttl
+
+
+def make_clients(fake):
+    if fake:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+        return (
+            fakeredis.FakeRedis(server=server, decode_responses=True),
+            fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        )
+    import redis
+    import redis.asyncio as redis_async
+
+    url = os.getenv("REDIS_URL", "redis://localhost:6379/15")
+    return (
+        redis.from_url(url, decode_responses=True),
+        redis_async.from_url(url, decode_responses=True, max_connections=64),
+    )
+
+
+async def ticker(stop, lags, interval=0.005):
+    """Record how late the event loop wakes a 5ms sleeper."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_load(limiter, requests, concurrency, shops):
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(f"shop-{i % shops}")
+    allowed = 0
+
+    async def worker():
+        nonlocal allowed
+        while not queue.empty():
+            shop_id = queue.get_nowait()
+            within_limit, _ = await limiter.check_limit(shop_id, "10.0.0.1")
+            allowed += within_limit
+
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    lags.sort()
+    p99_lag = lags[int(len(lags) * 0.99)] * 1000 if lags else 0.0
+    return elapsed, allowed, p99_lag
+
+
+def clear(sync_client):
+    keys = list(sync_client.scan_iter("ratelimit:*"))
+    if keys:
+        sync_client.delete(*keys)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--shops", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=1000, help="requests/minute")
+    parser.add_argument("--lease", type=int, default=16)
+    parser.add_argument("--fake", action="store_true")
+    args = parser.parse_args()
+
+    sync_client, async_client = make_clients(args.fake)
+
+    def gcra(lease):
+        config = RateLimitConfig(redis_url="redis://unused", local_lease_size=lease)
+        config.PUBLIC_API_RPM = args.limit
+        return RateLimiter(config, redis_client=async_client)
+
+    legacy = LegacyFixedWindowLimiter(sync_client, args.limit)
+    limiters = [
+        ("fixed window (sync, 4 ops)", legacy),
+        ("gcra lua", gcra(1)),
+        (f"gcra lua + lease {args.lease}", gcra(args.lease)),
+    ]
+
+    print(
+        f"{args.requests} requests, {args.concurrency} concurrent, "
+        f"{args.shops} shops, {args.limit}/min each "
+        f"({'fakeredis' if args.fake else 'redis'})"
+    )
+    print(
+        f"{'limiter':<30}{'req/s':>10}{'allowed':>10}"
+        f"{'redis calls':>13}{'p99 lag ms':>12}"
+    )
+    for name, limiter in limiters:
+        clear(sync_client)
+        elapsed, allowed, p99_lag = await run_load(
+            limiter, args.requests, args.concurrency, args.shops
+        )
+        stats = limiter.get_stats() if isinstance(limiter, RateLimiter) else {}
+        calls = stats.get("redis_calls", "-")
+        print(
+            f"{name:<30}{args.requests / elapsed:>10.0f}{allowed:>10}"
+            f"{calls:>13}{p99_lag:>12.2f}"
+        )
+    clear(sync_client)
+    await async_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,227 @@
+"""
+Event-loop lag benchmark for the Redis-backed services.
+
+Runs N concurrent "requests", each tracking an attribution event, recording
+metered usage, logging a business event and going through the circuit
+breaker, and measures how late the event loop wakes a 5ms ticker:
+
+- blocking: the services driven through the synchronous redis client, as
+  they were before moving to redis.asyncio (every call blocks the loop)
+- async:    the pooled redis.asyncio client from app.core.redis_runtime
+
+Usage:
+    REDIS_URL=redis://localhost:6379/15 python scripts/benchmark_redis_services.py
+    python scripts/benchmark_redis_services.py --fake --rtt-ms 0.5
+
+With --fake, both variants use in-process fakeredis plus a simulated
+network round trip of --rtt-ms per command or pipeline.
+Use a scratch database: the benchmark flushes it.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.redis_runtime import AsyncRedisManager  # noqa: E402
+from app.services.ai_metering import AIMeteringService  # noqa: E402
+from app.services.observability import (  # noqa: E402
+    BusinessEvent,
+    EventType,
+    ObservabilityService,
+)
+from app.services.reliability_guard import ReliabilityGuard  # noqa: E402
+from app.services.revenue_attribution import (  # noqa: E402
+    AttributionEvent,
+    AttributionEventType,
+    RevenueAttributionEngine,
+)
+
+
+class BlockingClient:
+    """Async facade over a sync client: each call blocks the event loop."""
+
+    def __init__(self, client, rtt):
+        self._client = client
+        self._rtt = rtt
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            time.sleep(self._rtt)
+            return method(*args, **kwargs)
+        return call
+
+    def pipeline(self, transaction=False):
+        return BlockingPipeline(self._client.pipeline(transaction=transaction), self._rtt)
+
+    def pubsub(self):
+        # The sync client has no async pub/sub; circuit transitions are then
+        # only picked up when the local cache expires
+        raise NotImplementedError("pub/sub needs the async client")
+
+    async def scan_iter(self, *args, **kwargs):
+        time.sleep(self._rtt)
+        for key in self._client.scan_iter(*args, **kwargs):
+            yield key
+
+
+class BlockingPipeline:
+    def __init__(self, pipe, rtt):
+        self._pipe = pipe
+        self._rtt = rtt
+
+    def __getattr__(self, name):
+        return getattr(self._pipe, name)
+
+    async def execute(self):
+        time.sleep(self._rtt)
+        return self._pipe.execute()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._pipe.reset()
+
+
+class LatentClient:
+    """Async client with a simulated (non-blocking) network round trip."""
+
+    def __init__(self, client, rtt):
+        self._client = client
+        self._rtt = rtt
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self._rtt)
+            return await method(*args, **kwargs)
+        return call
+
+    def pipeline(self, transaction=False):
+        return LatentPipeline(self._client.pipeline(transaction=transaction), self._rtt)
+
+    def pubsub(self):
+        return self._client.pubsub()
+
+    def scan_iter(self, *args, **kwargs):
+        return self._client.scan_iter(*args, **kwargs)
+
+
+class LatentPipeline(BlockingPipeline):
+    async def execute(self):
+        await asyncio.sleep(self._rtt)
+        return await self._pipe.execute()
+
+    async def __aexit__(self, *exc):
+        await self._pipe.reset()
+
+
+def make_clients(args):
+    rtt = args.rtt_ms / 1000
+    if args.fake:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+        sync_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+        async_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        return (
+            sync_client,
+            BlockingClient(sync_client, rtt),
+            LatentClient(async_client, rtt),
+        )
+
+    import redis
+
+    url = os.getenv("REDIS_URL", "redis://localhost:6379/15")
+    sync_client = redis.from_url(url, decode_responses=True)
+    manager = AsyncRedisManager()
+    return sync_client, BlockingClient(sync_client, 0), manager.get_client(url)
+
+
+async def ticker(stop, lags, interval=0.005):
+    """Record how late the event loop wakes a 5ms sleeper."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_load(client, requests):
+    attribution = RevenueAttributionEngine(redis_client=client)
+    metering = AIMeteringService(redis_client=client)
+    observability = ObservabilityService(
+        redis_client=client, enable_structured_logging=False
+    )
+    guard = ReliabilityGuard(redis_client=client)
+
+    async def noop():
+        return None
+
+    async def request(i):
+        shop_id = f"shop-{i % 20}"
+        await attribution.track_event(AttributionEvent(
+            event_type=AttributionEventType.OUTFIT_IMPRESSION,
+            shop_id=shop_id,
+            outfit_id=f"outfit-{i % 50}",
+        ))
+        await metering.record_usage(shop_id, "ai_request")
+        await observability.log_event(BusinessEvent(
+            event_type=EventType.OUTFIT_VIEWED,
+            shop_id=shop_id,
+            event_data={"outfit_id": f"outfit-{i % 50}"},
+        ))
+        await guard.execute_with_circuit_breaker("ai_service", noop)
+
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    return elapsed, percentile(lags, 0.5), percentile(lags, 0.99), percentile(lags, 1.0)
+
+
+def percentile(samples, q):
+    """q-quantile of ``samples`` in milliseconds."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    parser.add_argument("--fake", action="store_true")
+    args = parser.parse_args()
+    # Only the timings are of interest here
+    logging.basicConfig(level=logging.CRITICAL)
+
+    sync_client, blocking, non_blocking = make_clients(args)
+    rtt = f", {args.rtt_ms}ms simulated RTT" if args.fake else ""
+    backend = "fakeredis" if args.fake else "redis"
+    print(f"{args.requests} concurrent requests ({backend}{rtt})")
+    print(
+        f"{'client':<12}{'total s':>10}{'lag p50 ms':>12}"
+        f"{'lag p99 ms':>12}{'lag max ms':>12}"
+    )
+    for name, client in (("blocking", blocking), ("async", non_blocking)):
+        sync_client.flushdb()
+        elapsed, p50, p99, worst = await run_load(client, args.requests)
+        print(f"{name:<12}{elapsed:>10.2f}{p50:>12.2f}{p99:>12.2f}{worst:>12.2f}")
+    sync_client.flushdb()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,7 @@
 """Image validation service"""
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, Optional
 import io
 import requests
@@ -9,6 +10,10 @@ from PIL import Image
 logger = logging.getLogger(__name__)
 
 
+class ImageRejected(Exception):
+    """Image failed validation before or while downloading"""
+
+
 class ImageValidator:
     """Validates images before processing"""
     
@@ -29,6 +34,78 @@ class ImageValidator:
     # Allowed extensions
     ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
     
+    # Download chunk size; the first chunks usually hold the image header
+    CHUNK_SIZE = 64 * 1024
+    
+    # Stop probing for the header after this many bytes (large EXIF/ICC
+    # blocks); the full check after the download still applies
+    HEADER_PROBE_BYTES = 256 * 1024
+    
+    # Concurrent downloads in validate_batch
+    BATCH_WORKERS = 8
+    
+    @staticmethod
+    def _too_large_message() -> str:
+        return f"Image too large (max {ImageValidator.MAX_FILE_SIZE / 1024 / 1024:.0f}MB)"
+    
+    @staticmethod
+    def _check_header(buffer: bytearray) -> bool:
+        """
+        Check dimensions as soon as the image header has arrived.
+        
+        Image.open only parses the header, so this works on a partial
+        download. Returns True once checked, False if more bytes are needed.
+        
+        Raises:
+            ImageRejected: Format or dimensions are not acceptable
+        """
+        try:
+            image = Image.open(io.BytesIO(bytes(buffer)))
+        except Exception:
+            return False
+        is_valid, error = ImageValidator._check_image(image)
+        if not is_valid:
+            raise ImageRejected(error)
+        return True
+    
+    @staticmethod
+    def download_image(image_url: str, timeout: float = 10) -> bytes:
+        """
+        Download an image, rejecting it as early as possible
+        
+        Streams the body with a MAX_FILE_SIZE cap and checks the MIME type
+        and (from the header) dimensions before the rest is downloaded.
+        
+        Raises:
+            ImageRejected: Image is too large or not an acceptable image
+            requests.RequestException: Download failed
+        """
+        with requests.get(image_url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            
+            # Check MIME type
+            content_type = response.headers.get('content-type', '')
+            if not any(mime in content_type for mime in ImageValidator.ALLOWED_MIMES):
+                raise ImageRejected("Invalid image format. Allowed: JPEG, PNG, WebP")
+            
+            # Check declared file size before reading anything
+            declared = response.headers.get('content-length')
+            if declared and declared.isdigit() and int(declared) > ImageValidator.MAX_FILE_SIZE:
+                raise ImageRejected(ImageValidator._too_large_message())
+            
+            buffer = bytearray()
+            probing = True
+            for chunk in response.iter_content(ImageValidator.CHUNK_SIZE):
+                buffer.extend(chunk)
+                if len(buffer) > ImageValidator.MAX_FILE_SIZE:
+                    raise ImageRejected(ImageValidator._too_large_message())
+                if probing:
+                    probing = (
+                        not ImageValidator._check_header(buffer)
+                        and len(buffer) < ImageValidator.HEADER_PROBE_BYTES
+                    )
+            return bytes(buffer)
+    
     @staticmethod
     def validate_image_url(image_url: str) -> Tuple[bool, Optional[str]]:
         """
@@ -41,28 +118,36 @@ class ImageValidator:
             Tuple of (is_valid: bool, error_message: Optional[str])
         """
         try:
-            # Download image
-            response = requests.get(image_url, timeout=10)
-            response.raise_for_status()
-            
-            # Check file size
-            if len(response.content) > ImageValidator.MAX_FILE_SIZE:
-                return False, f"Image too large (max {ImageValidator.MAX_FILE_SIZE / 1024 / 1024:.0f}MB)"
-            
-            # Check MIME type
-            content_type = response.headers.get('content-type', '')
-            if not any(mime in content_type for mime in ImageValidator.ALLOWED_MIMES):
-                return False, f"Invalid image format. Allowed: JPEG, PNG, WebP"
+            data = ImageValidator.download_image(image_url)
             
             # Validate image
-            image_data = io.BytesIO(response.content)
-            return ImageValidator.validate_image_file(image_data)
+            return ImageValidator.validate_image_file(io.BytesIO(data))
             
+        except ImageRejected as e:
+            return False, str(e)
         except requests.RequestException as e:
             return False, f"Failed to download image: {str(e)}"
         except Exception as e:
             return False, f"Image validation failed: {str(e)}"
     
+    @staticmethod
+    def _check_image(image: Image.Image) -> Tuple[bool, Optional[str]]:
+        """Check format and dimensions of an opened (not decoded) image"""
+        # Check format
+        if image.format and image.format.lower() not in ['jpeg', 'png', 'webp']:
+            return False, f"Invalid image format: {image.format}"
+        
+        # Check dimensions
+        width, height = image.size
+        
+        if width < ImageValidator.MIN_WIDTH or height < ImageValidator.MIN_HEIGHT:
+            return False, f"Image too small (min {ImageValidator.MIN_WIDTH}x{ImageValidator.MIN_HEIGHT}px, got {width}x{height}px)"
+        
+        if width > ImageValidator.MAX_WIDTH or height > ImageValidator.MAX_HEIGHT:
+            return False, f"Image too large (max {ImageValidator.MAX_WIDTH}x{ImageValidator.MAX_HEIGHT}px, got {width}x{height}px)"
+        
+        return True, None
+    
     @staticmethod
     def validate_image_file(file_data: io.BytesIO) -> Tuple[bool, Optional[str]]:
         """
@@ -75,22 +160,14 @@ class ImageValidator:
             Tuple of (is_valid: bool, error_message: Optional[str])
         """
         try:
-            # Open image
+            # Open image (parses the header only, pixels are not decoded)
             image = Image.open(file_data)
             
-            # Check format
-            if image.format and image.format.lower() not in ['jpeg', 'png', 'webp']:
-                return False, f"Invalid image format: {image.format}"
+            is_valid, error = ImageValidator._check_image(image)
+            if not is_valid:
+                return False, error
             
-            # Check dimensions
             width, height = image.size
-            
-            if width < ImageValidator.MIN_WIDTH or height < ImageValidator.MIN_HEIGHT:
-                return False, f"Image too small (min {ImageValidator.MIN_WIDTH}x{ImageValidator.MIN_HEIGHT}px, got {width}x{height}px)"
-            
-            if width > ImageValidator.MAX_WIDTH or height > ImageValidator.MAX_HEIGHT:
-                return False, f"Image too large (max {ImageValidator.MAX_WIDTH}x{ImageValidator.MAX_HEIGHT}px, got {width}x{height}px)"
-            
             logger.info(f"Image validation successful: {width}x{height} {image.format}")
             return True, None
             
@@ -102,6 +179,8 @@ class ImageValidator:
         """
         Validate multiple images
         
+        Downloads run concurrently (up to BATCH_WORKERS at a time).
+        
         Args:
             image_urls: List of image URLs
             
@@ -114,10 +193,14 @@ class ImageValidator:
             "invalid": 0,
             "errors": {}
         }
+        if not image_urls:
+            return results
         
-        for url in image_urls:
-            is_valid, error = ImageValidator.validate_image_url(url)
-            
+        workers = min(ImageValidator.BATCH_WORKERS, len(image_urls))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(ImageValidator.validate_image_url, image_urls))
+        
+        for url, (is_valid, error) in zip(image_urls, outcomes):
             if is_valid:
                 results["valid"] += 1
             else:
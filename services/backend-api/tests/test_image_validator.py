@@ -0,0 +1,131 @@
+"""
+Tests for image validation
+
+Downloads are served by a fake ``requests.get`` so no network is needed.
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from app.validation import image_validator
+from app.validation.image_validator import ImageRejected, ImageValidator
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 100, 50)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    """Streams ``body`` in chunks and records how much was read."""
+
+    def __init__(self, body, content_type="image/png", content_length=True):
+        self.body = body
+        self.headers = {"content-type": content_type}
+        if content_length:
+            self.headers["content-length"] = str(len(body))
+        self.bytes_read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            chunk = self.body[start:start + chunk_size]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Map URLs to FakeResponses served by requests.get."""
+    responses = {}
+
+    def fake_get(url, timeout=None, stream=False):
+        return responses[url]
+
+    monkeypatch.setattr(image_validator.requests, "get", fake_get)
+    return responses
+
+
+class TestDownloadImage:
+
+    def test_oversized_content_length_is_rejected_before_reading(self, serve):
+        response = FakeResponse(b"x" * 1024)
+        response.headers["content-length"] = str(ImageValidator.MAX_FILE_SIZE + 1)
+        serve["https://cdn/huge.png"] = response
+
+        with pytest.raises(ImageRejected, match="too large"):
+            ImageValidator.download_image("https://cdn/huge.png")
+        assert response.bytes_read == 0
+
+    def test_stream_over_the_cap_without_content_length(self, serve, monkeypatch):
+        monkeypatch.setattr(ImageValidator, "MAX_FILE_SIZE", 256 * 1024)
+        response = FakeResponse(b"\0" * (1024 * 1024), content_length=False)
+        serve["https://cdn/endless.png"] = response
+
+        with pytest.raises(ImageRejected, match="too large"):
+            ImageValidator.download_image("https://cdn/endless.png")
+        assert response.bytes_read <= ImageValidator.MAX_FILE_SIZE + ImageValidator.CHUNK_SIZE
+
+    def test_undersized_image_is_rejected_from_the_header(self, serve, monkeypatch):
+        # Pad past the first chunk so stopping early is observable
+        body = _png(100, 100) + b"\0" * (4 * ImageValidator.CHUNK_SIZE)
+        response = FakeResponse(body)
+        serve["https://cdn/tiny.png"] = response
+
+        with pytest.raises(ImageRejected, match="too small"):
+            ImageValidator.download_image("https://cdn/tiny.png")
+        assert response.bytes_read == ImageValidator.CHUNK_SIZE
+
+    def test_header_probing_stops_after_a_prefix(self, serve, monkeypatch):
+        probes = []
+        check_header = ImageValidator._check_header
+
+        def counting_check(buffer):
+            probes.append(len(buffer))
+            return check_header(buffer)
+
+        monkeypatch.setattr(ImageValidator, "_check_header", staticmethod(counting_check))
+        body = b"\0" * (2 * 1024 * 1024)
+        serve["https://cdn/not-an-image.png"] = FakeResponse(body)
+
+        assert ImageValidator.download_image("https://cdn/not-an-image.png") == body
+        assert max(probes) <= ImageValidator.HEADER_PROBE_BYTES
+        assert len(probes) == ImageValidator.HEADER_PROBE_BYTES // ImageValidator.CHUNK_SIZE
+
+    def test_wrong_content_type_is_rejected(self, serve):
+        serve["https://cdn/page.html"] = FakeResponse(b"<html>", content_type="text/html")
+
+        with pytest.raises(ImageRejected, match="Invalid image format"):
+            ImageValidator.download_image("https://cdn/page.html")
+
+
+class TestValidateBatch:
+
+    def test_result_shape_and_ordering(self, serve):
+        urls = [f"https://cdn/{i}.png" for i in range(6)]
+        for i, url in enumerate(urls):
+            serve[url] = FakeResponse(_png(600, 600) if i % 2 == 0 else _png(64, 64))
+
+        results = ImageValidator.validate_batch(urls)
+
+        assert results["total"] == 6
+        assert results["valid"] == 3
+        assert results["invalid"] == 3
+        assert list(results["errors"]) == [urls[1], urls[3], urls[5]]
+        assert all("too small" in error for error in results["errors"].values())
+
+    def test_empty_batch(self):
+        assert ImageValidator.validate_batch([]) == {
+            "total": 0, "valid": 0, "invalid": 0, "errors": {}
+        }
@@ -4,8 +4,9 @@ Inference Service Try-On Endpoint
 FastAPI endpoint that handles try-on generation requests from the Shopify app.
 """
 
+import json
 import logging
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel
 from datetime import datetime
 import httpx
@@ -40,6 +41,15 @@ app = FastAPI(
 )
 
 
+@app.on_event("shutdown")
+async def _close_replicate_client() -> None:
+    """Close the pooled Replicate HTTP client, if one was created."""
+    from . import replicate_client
+
+    if replicate_client._client_instance is not None:
+        await replicate_client._client_instance.aclose()
+
+
 @app.get("/health")
 async def health_check() -> dict:
     """Health check endpoint."""
@@ -126,6 +136,33 @@ async def get_prediction_status(prediction_id: str) -> dict:
         raise HTTPException(status_code=500, detail="Failed to get status")
 
 
+@app.post(
+    "/api/v1/webhooks/replicate",
+    summary="Replicate prediction completion callback",
+)
+async def replicate_webhook(request: Request) -> dict:
+    """
+    Resolve the coroutine waiting for a prediction (webhook mode).
+
+    Replicate calls this when a prediction created with
+    REPLICATE_WEBHOOK_URL completes, replacing status polling.
+    """
+    from .replicate_client import get_replicate_client
+
+    client = get_replicate_client()
+    body = await request.body()
+    if not client.verify_webhook(dict(request.headers), body):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    resolved = client.resolve_prediction(data)
+    return {"received": True, "resolved": resolved}
+
+
 # ============ Background Processing ============
 
 
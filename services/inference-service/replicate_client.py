@@ -3,22 +3,51 @@ Replicate API client for virtual try-on image generation.
 
 Integrates with Replicate to send images and receive generated try-on results.
 Handles API authentication, polling, and error handling.
+
+All requests share one long-lived pooled HTTP client. Completion is awaited
+either by polling with an adaptive backoff, or - when REPLICATE_WEBHOOK_URL
+and REPLICATE_WEBHOOK_SECRET are set - by a Replicate webhook that resolves
+the waiting coroutine, with a slow safety poll in case the callback is lost
+or lands on another worker.
 """
 
 import os
+import base64
+import hashlib
+import hmac
 import logging
 import asyncio
+import time
 import httpx
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 import json
 
+try:
+    from prometheus_client import Histogram
+except ImportError:  # metrics are optional in this service
+    Histogram = None
+
 logger = logging.getLogger(__name__)
 
+if Histogram is not None:
+    POLL_REQUESTS_PER_PREDICTION = Histogram(
+        "replicate_poll_requests_per_prediction",
+        "Status requests sent to Replicate per completed prediction",
+        ["mode"],
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+    )
+else:
+    POLL_REQUESTS_PER_PREDICTION = None
+
 # Replicate API endpoints
 REPLICATE_API_BASE = "https://api.replicate.com/v1"
 TRYON_MODEL = "viton-hd"  # Virtual try-on model
 
+# Webhooks signed further than this from now (seconds) are rejected as replays
+WEBHOOK_TOLERANCE = 300
+
 
 class ReplicateError(Exception):
     """Base Replicate API error."""
@@ -44,6 +73,13 @@ class ReplicateAPIClient:
         model: str = TRYON_MODEL,
         timeout: int = 300,  # 5 minutes
         poll_interval: float = 1.0,
+        max_poll_interval: float = 8.0,
+        poll_backoff: float = 1.5,
+        webhook_url: Optional[str] = None,
+        webhook_secret: Optional[str] = None,
+        webhook_fallback_interval: float = 30.0,
+        webhook_tolerance: float = WEBHOOK_TOLERANCE,
+        http_client: Optional[httpx.AsyncClient] = None,
     ):
         """
         Initialize Replicate API client.
@@ -52,7 +88,19 @@ class ReplicateAPIClient:
             api_token: Replicate API token (from REPLICATE_API_TOKEN env var)
             model: Model identifier (default: viton-hd)
             timeout: Timeout in seconds for generation
-            poll_interval: Polling interval in seconds
+            poll_interval: First polling interval in seconds
+            max_poll_interval: Cap for the growing polling interval
+            poll_backoff: Factor the polling interval grows by per poll
+            webhook_url: Public URL of the completion callback route
+                (REPLICATE_WEBHOOK_URL); enables webhook mode together
+                with webhook_secret
+            webhook_secret: Signing secret for verifying callbacks
+                (REPLICATE_WEBHOOK_SECRET); without it the client polls
+            webhook_fallback_interval: Seconds between safety polls while
+                waiting for a webhook
+            webhook_tolerance: Max age (and clock skew) in seconds of an
+                accepted webhook timestamp
+            http_client: Shared client to use instead of creating one
         """
         self.api_token = api_token or os.getenv("REPLICATE_API_TOKEN")
         if not self.api_token:
@@ -61,7 +109,42 @@ class ReplicateAPIClient:
         self.model = model
         self.timeout = timeout
         self.poll_interval = poll_interval
+        self.max_poll_interval = max(max_poll_interval, poll_interval)
+        self.poll_backoff = poll_backoff
+        self.webhook_url = webhook_url or os.getenv("REPLICATE_WEBHOOK_URL")
+        self.webhook_secret = webhook_secret or os.getenv("REPLICATE_WEBHOOK_SECRET")
+        if self.webhook_url and not self.webhook_secret:
+            # Unsigned callbacks could resolve any prediction with any output
+            logger.warning(
+                "REPLICATE_WEBHOOK_URL is set without REPLICATE_WEBHOOK_SECRET; "
+                "webhook mode disabled, polling instead"
+            )
+            self.webhook_url = None
+        self.webhook_fallback_interval = webhook_fallback_interval
+        self.webhook_tolerance = webhook_tolerance
         self.base_url = REPLICATE_API_BASE
+        self._http = http_client
+        # Coroutines waiting for a webhook, by prediction ID
+        self._waiters: Dict[str, asyncio.Future] = {}
+        # Webhooks that arrived before anyone waited for them
+        self._early_results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {"predictions": 0, "poll_requests": 0, "webhooks": 0}
+
+    def _client(self) -> httpx.AsyncClient:
+        """Long-lived pooled client, so polls reuse warm TLS connections."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={"Authorization": f"Token {self.api_token}"},
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     async def generate_tryon_image(
         self,
@@ -99,8 +182,8 @@ class ReplicateAPIClient:
             )
             logger.info(f"Created prediction: {prediction_id}")
 
-            # Poll for result
-            result_url = await self._poll_prediction(prediction_id)
+            # Wait for the result (webhook or polling)
+            result_url = await self._wait_for_prediction(prediction_id)
 
             processing_time = (datetime.now() - start_time).total_seconds()
 
@@ -141,11 +224,6 @@ class ReplicateAPIClient:
         Raises:
             ReplicateError: API errors
         """
-        headers = {
-            "Authorization": f"Token {self.api_token}",
-            "Content-Type": "application/json",
-        }
-
         # Build input for viton-hd model
         input_data = {
             "human_img": user_image_url,
@@ -166,31 +244,83 @@ class ReplicateAPIClient:
             "version": model_version,
             "input": input_data,
         }
+        if self.webhook_url:
+            payload["webhook"] = self.webhook_url
+            payload["webhook_events_filter"] = ["completed"]
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.post(
-                    f"{self.base_url}/predictions",
-                    json=payload,
-                    headers=headers,
-                )
+            response = await self._client().post(
+                f"{self.base_url}/predictions",
+                json=payload,
+            )
 
-                if response.status_code == 429:
-                    raise ReplicateRateLimitError("Rate limit exceeded")
-                elif response.status_code >= 400:
-                    error_data = response.json() if response.text else {}
-                    raise ReplicateError(
-                        f"Failed to create prediction: {response.status_code} - {error_data}"
-                    )
+            if response.status_code == 429:
+                raise ReplicateRateLimitError("Rate limit exceeded")
+            elif response.status_code >= 400:
+                error_data = response.json() if response.text else {}
+                raise ReplicateError(
+                    f"Failed to create prediction: {response.status_code} - {error_data}"
+                )
 
-                result = response.json()
-                return result["id"]
+            result = response.json()
+            return result["id"]
 
         except httpx.TimeoutException as e:
             raise ReplicateError(f"Request timeout: {str(e)}")
         except httpx.HTTPError as e:
             raise ReplicateError(f"HTTP error: {str(e)}")
 
+    async def _wait_for_prediction(self, prediction_id: str) -> str:
+        """Wait for a prediction via webhook if configured, else by polling."""
+        if self.webhook_url:
+            return await self._await_webhook(prediction_id)
+        return await self._poll_prediction(prediction_id)
+
+    def _prediction_result(self, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Output URL of a finished prediction, or None while it is running.
+
+        Raises:
+            ReplicateError: Failed, canceled or unknown status
+        """
+        status = data.get("status")
+
+        if status == "succeeded":
+            output = data.get("output")
+            # Output can be a list or string URL
+            if isinstance(output, list) and output:
+                return output[0]
+            return output
+
+        elif status in ["failed", "canceled"]:
+            error_msg = data.get("error", "Unknown error")
+            raise ReplicateError(f"Prediction {status}: {error_msg}")
+
+        elif status in ["processing", "starting"]:
+            return None
+
+        else:
+            raise ReplicateError(f"Unknown status: {status}")
+
+    async def _fetch_prediction(self, prediction_id: str) -> Dict[str, Any]:
+        response = await self._client().get(
+            f"{self.base_url}/predictions/{prediction_id}",
+            timeout=10,
+        )
+
+        if response.status_code >= 400:
+            raise ReplicateError(
+                f"Failed to get prediction: {response.status_code}"
+            )
+
+        return response.json()
+
+    def _record_polls(self, mode: str, polls: int) -> None:
+        self.stats["predictions"] += 1
+        self.stats["poll_requests"] += polls
+        if POLL_REQUESTS_PER_PREDICTION is not None:
+            POLL_REQUESTS_PER_PREDICTION.labels(mode=mode).observe(polls)
+
     async def _poll_prediction(
         self,
         prediction_id: str,
@@ -198,6 +328,10 @@ class ReplicateAPIClient:
         """
         Poll Replicate API until prediction completes.
 
+        The interval starts at ``poll_interval`` and grows by
+        ``poll_backoff`` per poll up to ``max_poll_interval``: short jobs
+        finish quickly, long ones do not cost a request per second.
+
         Args:
             prediction_id: Prediction ID from create_prediction
 
@@ -208,61 +342,134 @@ class ReplicateAPIClient:
             ReplicateTimeoutError: Prediction timeout
             ReplicateError: API errors or failed prediction
         """
-        headers = {
-            "Authorization": f"Token {self.api_token}",
-        }
+        end_time = datetime.now() + timedelta(seconds=self.timeout)
+        interval = self.poll_interval
+        polls = 0
 
-        start_time = datetime.now()
-        end_time = start_time + timedelta(seconds=self.timeout)
-
-        while datetime.now() < end_time:
-            try:
-                async with httpx.AsyncClient(timeout=10) as client:
-                    response = await client.get(
-                        f"{self.base_url}/predictions/{prediction_id}",
-                        headers=headers,
-                    )
-
-                    if response.status_code >= 400:
-                        raise ReplicateError(
-                            f"Failed to get prediction: {response.status_code}"
-                        )
+        try:
+            while datetime.now() < end_time:
+                try:
+                    polls += 1
+                    data = await self._fetch_prediction(prediction_id)
+                    result = self._prediction_result(data)
+                    if result is not None or data.get("status") == "succeeded":
+                        return result
+                    logger.debug(f"Prediction {prediction_id} status: {data.get('status')}")
+
+                except httpx.TimeoutException:
+                    logger.warning(f"Timeout polling prediction {prediction_id}")
+                except httpx.HTTPError as e:
+                    logger.error(f"HTTP error polling: {str(e)}")
+
+                remaining = (end_time - datetime.now()).total_seconds()
+                await asyncio.sleep(max(0.0, min(interval, remaining)))
+                interval = min(interval * self.poll_backoff, self.max_poll_interval)
+        finally:
+            self._record_polls("poll", polls)
 
-                    data = response.json()
-                    status = data.get("status")
+        raise ReplicateTimeoutError(
+            f"Prediction {prediction_id} did not complete within {self.timeout}s"
+        )
 
-                    if status == "succeeded":
-                        output = data.get("output")
-                        # Output can be a list or string URL
-                        if isinstance(output, list) and output:
-                            return output[0]
-                        return output
+    async def _await_webhook(self, prediction_id: str) -> str:
+        """
+        Wait for the completion webhook of a prediction.
 
-                    elif status == "failed":
-                        error_msg = data.get("error", "Unknown error")
-                        raise ReplicateError(f"Prediction failed: {error_msg}")
+        Every ``webhook_fallback_interval`` seconds without a callback the
+        prediction is polled once, so a lost callback (or one delivered to
+        another worker) only delays the result.
+        """
+        end_time = datetime.now() + timedelta(seconds=self.timeout)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        early = self._early_results.pop(prediction_id, None)
+        if early is not None:
+            future.set_result(early)
+        self._waiters[prediction_id] = future
+        polls = 0
 
-                    elif status in ["processing", "starting"]:
-                        logger.debug(f"Prediction {prediction_id} status: {status}")
-                        await asyncio.sleep(self.poll_interval)
+        try:
+            while True:
+                remaining = (end_time - datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                try:
+                    data = await asyncio.wait_for(
+                        asyncio.shield(future),
+                        timeout=min(self.webhook_fallback_interval, remaining),
+                    )
+                except asyncio.TimeoutError:
+                    try:
+                        polls += 1
+                        data = await self._fetch_prediction(prediction_id)
+                    except httpx.HTTPError as e:
+                        logger.warning(f"Safety poll for {prediction_id} failed: {e}")
                         continue
-
-                    else:
-                        raise ReplicateError(f"Unknown status: {status}")
-
-            except httpx.TimeoutException:
-                logger.warning(f"Timeout polling prediction {prediction_id}")
-                await asyncio.sleep(self.poll_interval)
-                continue
-            except httpx.HTTPError as e:
-                logger.error(f"HTTP error polling: {str(e)}")
-                await asyncio.sleep(self.poll_interval)
-                continue
+                result = self._prediction_result(data)
+                if result is not None or data.get("status") == "succeeded":
+                    return result
+        finally:
+            self._waiters.pop(prediction_id, None)
+            self._record_polls("webhook", polls)
 
         raise ReplicateTimeoutError(
             f"Prediction {prediction_id} did not complete within {self.timeout}s"
         )
 
+    def verify_webhook(self, headers: Dict[str, str], body: bytes) -> bool:
+        """
+        Check a webhook's signature (``webhook-id``, ``webhook-timestamp``
+        and ``webhook-signature`` headers, signed with the ``whsec_`` secret).
+
+        Always False when no REPLICATE_WEBHOOK_SECRET is configured, and for
+        timestamps more than ``webhook_tolerance`` seconds from now, so a
+        captured callback cannot be replayed later.
+        """
+        if not self.webhook_secret:
+            return False
+        headers = {k.lower(): v for k, v in headers.items()}
+        webhook_id = headers.get("webhook-id")
+        timestamp = headers.get("webhook-timestamp")
+        signatures = headers.get("webhook-signature", "")
+        if not webhook_id or not timestamp:
+            return False
+        try:
+            sent_at = int(timestamp)
+        except ValueError:
+            return False
+        if abs(time.time() - sent_at) > self.webhook_tolerance:
+            return False
+        secret = base64.b64decode(self.webhook_secret.split("_", 1)[-1])
+        signed = f"{webhook_id}.{timestamp}.".encode() + body
+        expected = base64.b64encode(
+            hmac.new(secret, signed, hashlib.sha256).digest()
+        ).decode()
+        return any(
+            hmac.compare_digest(expected, sig.split(",", 1)[-1])
+            for sig in signatures.split()
+        )
+
+    def resolve_prediction(self, data: Dict[str, Any]) -> bool:
+        """
+        Hand a webhook payload to the coroutine waiting for it.
+
+        Returns True if a waiter in this process was resolved. Completed
+        predictions nobody waits for yet are kept briefly, since the
+        webhook can beat ``_create_prediction`` returning.
+        """
+        prediction_id = data.get("id")
+        if not prediction_id or data.get("status") not in ("succeeded", "failed", "canceled"):
+            return False
+        self.stats["webhooks"] += 1
+        future = self._waiters.get(prediction_id)
+        if future is not None and not future.done():
+            future.set_result(data)
+            return True
+        self._early_results[prediction_id] = data
+        while len(self._early_results) > 1000:
+            self._early_results.popitem(last=False)
+        return False
+
     async def cancel_prediction(self, prediction_id: str) -> bool:
         """
         Cancel an ongoing prediction.
@@ -273,17 +480,12 @@ class ReplicateAPIClient:
         Returns:
             True if cancelled, False otherwise
         """
-        headers = {
-            "Authorization": f"Token {self.api_token}",
-        }
-
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.post(
-                    f"{self.base_url}/predictions/{prediction_id}/cancel",
-                    headers=headers,
-                )
-                return response.status_code == 200
+            response = await self._client().post(
+                f"{self.base_url}/predictions/{prediction_id}/cancel",
+                timeout=10,
+            )
+            return response.status_code == 200
 
         except Exception as e:
             logger.error(f"Failed to cancel prediction: {str(e)}")
@@ -299,23 +501,18 @@ class ReplicateAPIClient:
         Returns:
             Prediction status object
         """
-        headers = {
-            "Authorization": f"Token {self.api_token}",
-        }
-
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(
-                    f"{self.base_url}/predictions/{prediction_id}",
-                    headers=headers,
-                )
+            response = await self._client().get(
+                f"{self.base_url}/predictions/{prediction_id}",
+                timeout=10,
+            )
 
-                if response.status_code >= 400:
-                    raise ReplicateError(
-                        f"Failed to get status: {response.status_code}"
-                    )
+            if response.status_code >= 400:
+                raise ReplicateError(
+                    f"Failed to get status: {response.status_code}"
+                )
 
-                return response.json()
+            return response.json()
 
         except Exception as e:
             logger.error(f"Failed to get prediction status: {str(e)}")
@@ -5,8 +5,14 @@ Comprehensive test suite for Replicate API integration including
 polling, error handling, and timeout scenarios.
 """
 
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
 import pytest
 import logging
+import time
 from unittest.mock import patch, AsyncMock, MagicMock
 from datetime import datetime, timedelta
 import httpx
@@ -437,6 +443,159 @@ class TestReplicateIntegration:
                 assert result.prediction_id == "pred_workflow123"
 
 
+# ============ Pooled Client, Adaptive Polling and Webhooks ============
+
+
+def _mock_http(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+WEBHOOK_KEY = b"k" * 24
+WEBHOOK_SECRET = "whsec_" + base64.b64encode(WEBHOOK_KEY).decode()
+
+
+def _signed_headers(body, timestamp=None, key=WEBHOOK_KEY):
+    """Headers of a webhook signed with ``key`` at ``timestamp`` (default now)."""
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    signature = base64.b64encode(
+        hmac.new(key, f"msg_1.{timestamp}.".encode() + body, hashlib.sha256).digest()
+    ).decode()
+    return {
+        "webhook-id": "msg_1",
+        "webhook-timestamp": timestamp,
+        "webhook-signature": f"v1,{signature}",
+    }
+
+
+class TestAdaptivePollingAndWebhooks:
+    """Tests for the shared HTTP client, poll backoff and webhook mode."""
+
+    @pytest.mark.asyncio
+    async def test_polling_backs_off_and_counts_requests(self, mock_api_token):
+        """Poll intervals grow and the shared client is reused."""
+        polls = []
+
+        def handler(request):
+            if request.method == "POST":
+                return httpx.Response(201, json={"id": "pred_1"})
+            polls.append(datetime.now())
+            status = "succeeded" if len(polls) == 4 else "processing"
+            return httpx.Response(200, json={"status": status, "output": ["https://out/1.png"]})
+
+        http = _mock_http(handler)
+        client = ReplicateAPIClient(
+            api_token=mock_api_token,
+            poll_interval=0.01,
+            poll_backoff=2,
+            max_poll_interval=0.05,
+            http_client=http,
+        )
+
+        result = await client.generate_tryon_image(
+            user_image_url="https://example.com/user.jpg",
+            garment_image_url="https://example.com/garment.jpg",
+        )
+
+        assert result["image_url"] == "https://out/1.png"
+        assert client.stats["poll_requests"] == 4
+        gaps = [(b - a).total_seconds() for a, b in zip(polls, polls[1:])]
+        assert gaps[-1] > gaps[0]
+        assert client._client() is http
+
+    @pytest.mark.asyncio
+    async def test_webhook_resolves_waiting_prediction(self, mock_api_token):
+        """A completion webhook replaces polling."""
+        created = {}
+
+        def handler(request):
+            if request.method == "POST":
+                created.update(json.loads(request.content))
+                return httpx.Response(201, json={"id": "pred_2"})
+            return httpx.Response(200, json={"status": "processing"})
+
+        client = ReplicateAPIClient(
+            api_token=mock_api_token,
+            webhook_url="https://inference.example.com/api/v1/webhooks/replicate",
+            webhook_secret=WEBHOOK_SECRET,
+            http_client=_mock_http(handler),
+        )
+
+        task = asyncio.create_task(client.generate_tryon_image(
+            user_image_url="https://example.com/user.jpg",
+            garment_image_url="https://example.com/garment.jpg",
+        ))
+        await asyncio.sleep(0.05)
+        assert client.resolve_prediction(
+            {"id": "pred_2", "status": "succeeded", "output": "https://out/2.png"}
+        )
+        result = await task
+
+        assert result["image_url"] == "https://out/2.png"
+        assert created["webhook_events_filter"] == ["completed"]
+        assert client.stats["poll_requests"] == 0
+
+    @pytest.mark.asyncio
+    async def test_lost_webhook_falls_back_to_safety_poll(self, mock_api_token):
+        """Without a callback the prediction is still picked up by polling."""
+
+        def handler(request):
+            if request.method == "POST":
+                return httpx.Response(201, json={"id": "pred_3"})
+            return httpx.Response(200, json={"status": "succeeded", "output": "https://out/3.png"})
+
+        client = ReplicateAPIClient(
+            api_token=mock_api_token,
+            webhook_url="https://inference.example.com/api/v1/webhooks/replicate",
+            webhook_secret=WEBHOOK_SECRET,
+            webhook_fallback_interval=0.01,
+            http_client=_mock_http(handler),
+        )
+
+        result = await client.generate_tryon_image(
+            user_image_url="https://example.com/user.jpg",
+            garment_image_url="https://example.com/garment.jpg",
+        )
+
+        assert result["image_url"] == "https://out/3.png"
+        assert client.stats["poll_requests"] == 1
+
+    def test_webhook_signature_verification(self, mock_api_token):
+        """Only callbacks signed with the webhook secret are accepted."""
+        client = ReplicateAPIClient(api_token=mock_api_token, webhook_secret=WEBHOOK_SECRET)
+        body = b'{"id": "pred_4", "status": "succeeded"}'
+        headers = _signed_headers(body)
+
+        assert client.verify_webhook(headers, body)
+        assert not client.verify_webhook(headers, body + b" ")
+        assert not client.verify_webhook(_signed_headers(body, key=b"x" * 24), body)
+        assert not client.verify_webhook({}, body)
+
+    def test_unsigned_webhooks_are_rejected(self, mock_api_token):
+        """Without a secret there is no webhook mode and no callback is trusted."""
+        client = ReplicateAPIClient(
+            api_token=mock_api_token,
+            webhook_url="https://inference.example.com/api/v1/webhooks/replicate",
+        )
+        body = b'{"id": "pred_5", "status": "succeeded", "output": "https://evil/5.png"}'
+
+        assert client.webhook_url is None
+        assert not client.verify_webhook({}, body)
+        assert not client.verify_webhook(_signed_headers(body), body)
+
+    def test_stale_webhook_timestamps_are_rejected(self, mock_api_token):
+        """A correctly signed callback replayed later is refused."""
+        client = ReplicateAPIClient(
+            api_token=mock_api_token, webhook_secret=WEBHOOK_SECRET, webhook_tolerance=300
+        )
+        body = b'{"id": "pred_6", "status": "succeeded"}'
+        now = int(time.time())
+
+        assert client.verify_webhook(_signed_headers(body, now - 60), body)
+        assert not client.verify_webhook(_signed_headers(body, now - 301), body)
+        assert not client.verify_webhook(_signed_headers(body, now + 301), body)
+        assert not client.verify_webhook(_signed_headers(body, "not-a-time"), body)
+
+
 # ============ Error Type Tests ============
 
 
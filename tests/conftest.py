@@ -11,6 +11,11 @@ sys.path.insert(0, str(ROOT))
 os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
 
 from app.main import app
+from app.db.models import init_db
+
+# Schema creation is a startup step; tests using TestClient without the
+# lifespan still need the tables
+init_db()
 
 
 class DummyRedis:
@@ -124,6 +129,10 @@ def inject_redis():
             )
     except Exception:
         app.state.store = None
+    # Each test gets a fresh store, so forget entitlements from the last one
+    from app.services.entitlement_cache import entitlement_cache
+
+    entitlement_cache.clear()
     yield
 
 
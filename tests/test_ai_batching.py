@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+from app.ai.services.ai_service import AIService
+
+
+class FakePipeline:
+    """Echoes prompts like a text-generation pipeline and records each call."""
+
+    def __init__(self, delay=0.02, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, inputs, max_length=None, batch_size=None):
+        with self._lock:
+            self.calls.append((inputs, max_length))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        if isinstance(inputs, list):
+            return [[{"generated_text": f"{p}!{max_length}"}] for p in inputs]
+        return [{"generated_text": f"{inputs}!{max_length}"}]
+
+
+def make_service(pipeline, **kwargs):
+    service = AIService(model_name="fake", **kwargs)
+    service._pipeline = pipeline
+    return service
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_requests_share_forward_passes():
+    pipeline = FakePipeline()
+    service = make_service(pipeline, max_batch_size=8, max_batch_wait_ms=20)
+
+    async def scenario():
+        results = await asyncio.gather(*(service.infer(f"p{i}", max_tokens=16) for i in range(20)))
+        await service.close()
+        return results
+
+    results = run(scenario())
+
+    # Each caller gets its own result back
+    assert [r["text"] for r in results] == [f"p{i}!16" for i in range(20)]
+    assert len(pipeline.calls) == 3
+    assert [len(inputs) for inputs, _ in pipeline.calls] == [8, 8, 4]
+    assert service._batcher.stats["batches"] == 3
+
+
+def test_different_lengths_are_not_mixed():
+    pipeline = FakePipeline()
+    service = make_service(pipeline, max_batch_size=8, max_batch_wait_ms=20)
+
+    async def scenario():
+        results = await asyncio.gather(*(
+            service.infer(f"p{i}", max_tokens=16 if i % 2 else 32) for i in range(6)
+        ))
+        await service.close()
+        return results
+
+    results = run(scenario())
+
+    assert [r["text"] for r in results] == [f"p{i}!{16 if i % 2 else 32}" for i in range(6)]
+    for inputs, max_length in pipeline.calls:
+        prompts = inputs if isinstance(inputs, list) else [inputs]
+        assert all(int(p[1:]) % 2 == (max_length == 16) for p in prompts)
+
+
+def test_batch_failures_and_timeouts_degrade_per_request():
+    service = make_service(FakePipeline(fail=True), max_batch_size=4)
+    slow = make_service(FakePipeline(delay=0.2), max_batch_size=4)
+
+    async def scenario():
+        failed = await asyncio.gather(*(service.infer(f"p{i}") for i in range(3)))
+        timed_out = await slow.infer("late", timeout=0.05)
+        await service.close()
+        await slow.close()
+        return failed, timed_out
+
+    failed, timed_out = run(scenario())
+
+    assert [r["text"] for r in failed] == ["[inference_error]"] * 3
+    assert timed_out["text"] == "[timeout]"
+
+
+def test_batching_can_be_disabled():
+    pipeline = FakePipeline()
+    service = make_service(pipeline, max_batch_size=1)
+
+    async def scenario():
+        return await asyncio.gather(*(service.infer(f"p{i}", max_tokens=8) for i in range(3)))
+
+    assert [r["text"] for r in run(scenario())] == ["p0!8", "p1!8", "p2!8"]
+    assert all(isinstance(inputs, str) for inputs, _ in pipeline.calls)
@@ -0,0 +1,379 @@
+import asyncio
+
+import fakeredis
+import pytest
+import redis.asyncio as redis_async
+
+from app.core.redis_runtime import AsyncRedisManager, pipeline, scan_keys
+from app.services.ai_metering import AIMeteringService
+from app.services.observability import BusinessEvent, EventType, ObservabilityService
+from app.services.reliability_guard import ReliabilityGuard
+from app.services.revenue_attribution import (
+    AttributionEvent,
+    AttributionEventType,
+    RevenueAttributionEngine,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_pipeline_and_scan_helpers():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def scenario():
+        async with pipeline(client) as pipe:
+            pipe.set("a:1", "x")
+            pipe.set("a:2", "y")
+            pipe.set("b:1", "z")
+        return sorted(await scan_keys(client, "a:*"))
+
+    assert run(scenario()) == ["a:1", "a:2"]
+
+
+def test_manager_shares_client_per_loop_and_backs_off():
+    manager = AsyncRedisManager()
+    url = "redis://127.0.0.1:1/0"  # nothing listens on port 1
+
+    async def scenario():
+        first = manager.get_client(url)
+        assert manager.get_client(url) is first
+        assert await manager.acquire(url) is None
+        # Within the retry window no client is handed out at all
+        assert manager.get_client(url) is None
+        return first
+
+    first = run(scenario())
+    manager._unavailable_until.clear()
+
+    async def next_loop():
+        return manager.get_client(url)
+
+    # Connections are bound to their event loop, so each loop gets its own
+    assert run(next_loop()) is not first
+
+
+def test_services_use_async_client():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    attribution = RevenueAttributionEngine(redis_client=client)
+    metering = AIMeteringService(redis_client=client)
+    observability = ObservabilityService(
+        redis_client=client, enable_structured_logging=False
+    )
+    guard = ReliabilityGuard(redis_client=client)
+
+    async def ok():
+        return "ok"
+
+    async def scenario():
+        for event_type in (AttributionEventType.OUTFIT_IMPRESSION,
+                           AttributionEventType.ORDER_COMPLETED):
+            assert await attribution.track_event(AttributionEvent(
+                event_type=event_type, shop_id="s1", outfit_id="o1", revenue=20.0
+            ))
+        revenue = await attribution.calculate_revenue_influenced("s1")
+
+        assert await metering.record_usage("s1", "ai_request")
+        usage = await metering.get_usage_metrics("s1")
+
+        assert await observability.log_event(
+            BusinessEvent(event_type=EventType.OUTFIT_VIEWED, shop_id="s1")
+        )
+        await observability.flush()
+        counts = await observability.get_event_counts("s1", days=1)
+
+        result = await guard.execute_with_circuit_breaker("ai", ok)
+        return revenue, usage, counts, result
+
+    revenue, usage, counts, result = run(scenario())
+
+    assert revenue["total_revenue_influenced"] == 20.0
+    assert usage.ai_requests == 1
+    assert counts == {"outfit_viewed": 1}
+    assert result == "ok"
+
+
+def test_revenue_counters_are_exact_under_concurrency():
+    # A small blocking pool, like the shared one, so workers queue for it
+    client = fakeredis.FakeAsyncRedis(
+        decode_responses=True,
+        connection_pool_class=redis_async.BlockingConnectionPool,
+        max_connections=8,
+    )
+    engines = [RevenueAttributionEngine(redis_client=client) for _ in range(4)]
+
+    def event(i, event_type, **kwargs):
+        return AttributionEvent(
+            event_type=event_type, shop_id="s1", outfit_id=f"o{i % 2}", **kwargs
+        )
+
+    async def scenario():
+        events = (
+            [event(i, AttributionEventType.OUTFIT_IMPRESSION) for i in range(200)]
+            + [event(i, AttributionEventType.OUTFIT_CLICK) for i in range(50)]
+            + [event(i, AttributionEventType.ORDER_COMPLETED, revenue=12.5)
+               for i in range(10)]
+        )
+        # Several "workers" tracking the same shop at once
+        await asyncio.gather(*(
+            engines[i % len(engines)].track_event(e) for i, e in enumerate(events)
+        ))
+        return (
+            await engines[0].get_metrics("s1"),
+            await engines[0].get_outfit_performance("s1"),
+        )
+
+    metrics, outfits = run(scenario())
+
+    assert metrics.total_impressions == 200
+    assert metrics.total_clicks == 50
+    assert metrics.total_orders == 10
+    assert metrics.total_revenue_influenced == 125.0
+    assert metrics.click_through_rate == 0.25
+    assert metrics.average_order_value == 12.5
+    assert sorted(o["outfit_id"] for o in outfits) == ["o0", "o1"]
+    assert sum(o["impressions"] for o in outfits) == 200
+    assert sum(o["revenue"] for o in outfits) == 125.0
+
+
+def test_observability_buffers_and_flushes_in_batches():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    service = ObservabilityService(
+        redis_client=client,
+        enable_structured_logging=False,
+        buffer_size=50,
+        flush_batch_size=20,
+        flush_interval=60,
+    )
+
+    def viewed(i):
+        return BusinessEvent(
+            event_type=EventType.OUTFIT_VIEWED,
+            shop_id="s1",
+            event_data={"outfit_id": f"o{i % 3}"},
+        )
+
+    async def scenario():
+        accepted = [await service.log_event(viewed(i)) for i in range(60)]
+        # A full batch wakes the flusher without waiting for the interval
+        await asyncio.sleep(0.05)
+        early = service.get_stats()
+        await service.close()
+        return accepted, early, await service.get_outfit_performance("s1")
+
+    accepted, early, outfits = run(scenario())
+    stats = service.get_stats()
+
+    assert early["flushed"] >= 20
+    assert stats["buffered"] == 0
+    assert stats["accepted"] == sum(accepted)
+    assert stats["flushed"] == stats["accepted"]
+    assert stats["dropped"] == 60 - sum(accepted)
+    assert sum(o["events"]["outfit_viewed"] for o in outfits) == stats["flushed"]
+
+
+def test_observability_drops_when_buffer_is_full():
+    service = ObservabilityService(
+        redis_client=fakeredis.FakeAsyncRedis(decode_responses=True),
+        enable_structured_logging=False,
+        buffer_size=5,
+        flush_batch_size=100,
+        flush_interval=60,
+    )
+
+    async def scenario():
+        return [
+            await service.log_event(
+                BusinessEvent(event_type=EventType.PAGE_VIEW, shop_id="s1")
+            )
+            for _ in range(8)
+        ]
+
+    assert run(scenario()) == [True] * 5 + [False] * 3
+    assert service.get_stats()["dropped"] == 3
+
+
+def test_observability_drops_only_unserializable_events():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    service = ObservabilityService(
+        redis_client=client,
+        enable_structured_logging=False,
+        flush_batch_size=100,
+        flush_interval=60,
+    )
+
+    async def scenario():
+        accepted = [
+            await service.log_event(
+                BusinessEvent(
+                    event_type=EventType.PAGE_VIEW,
+                    shop_id="s1",
+                    event_data={"value": value},
+                )
+            )
+            for value in (1, object(), 2)
+        ]
+        await service.close()
+        return accepted, await service.get_event_counts("s1", days=1)
+
+    accepted, counts = run(scenario())
+
+    assert accepted == [True, False, True]
+    assert service.get_stats()["flushed"] == 2
+    assert service.get_stats()["dropped"] == 1
+    assert counts == {"page_view": 2}
+
+
+class CountingRedis:
+    """Counts commands sent to the wrapped client, pipelined or not."""
+
+    def __init__(self, client):
+        self._client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if name in ("pipeline", "pubsub"):
+            return method
+
+        async def call(*args, **kwargs):
+            self.commands.append(name)
+            return await method(*args, **kwargs)
+        return call
+
+    def pipeline(self, transaction=False):
+        pipe = self._client.pipeline(transaction=transaction)
+        execute = pipe.execute
+
+        async def counted_execute(*args, **kwargs):
+            self.commands.extend(args[0].lower() for args, _ in pipe.command_stack)
+            return await execute(*args, **kwargs)
+        pipe.execute = counted_execute
+        return pipe
+
+
+def test_circuit_state_is_shared_across_workers():
+    server = fakeredis.FakeServer()
+    workers = [
+        ReliabilityGuard(
+            redis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+            shared_state=True,
+            local_ttl=60,
+        )
+        for _ in range(2)
+    ]
+    calls = []
+
+    async def failing():
+        raise RuntimeError("down")
+
+    async def ok():
+        calls.append("ok")
+        return "ok"
+
+    async def fallback():
+        return "fallback"
+
+    async def scenario():
+        # Both workers cache a closed circuit and start listening
+        for worker in workers:
+            await worker.get_circuit_state("ai")
+        await asyncio.sleep(0.05)
+
+        # Failures from either worker count towards the same threshold
+        for i in range(4):
+            await workers[i % 2].execute_with_circuit_breaker(
+                "ai", failing, fallback_func=fallback
+            )
+        # The call that trips the circuit surfaces its error
+        with pytest.raises(RuntimeError):
+            await workers[0].execute_with_circuit_breaker(
+                "ai", failing, fallback_func=fallback
+            )
+        await asyncio.sleep(0.05)
+        tripped = [
+            await worker.execute_with_circuit_breaker("ai", ok, fallback_func=fallback)
+            for worker in workers
+        ]
+
+        # A successful recovery probe closes the circuit everywhere
+        workers[0].circuit_breakers["ai"].next_attempt_time = None
+        await workers[0].execute_with_circuit_breaker("ai", ok)
+        await asyncio.sleep(0.05)
+        recovered = workers[1].circuit_breakers["ai"].state
+        for worker in workers:
+            await worker.close()
+        return tripped, recovered
+
+    tripped, recovered = run(scenario())
+
+    assert tripped == ["fallback", "fallback"]
+    assert calls == ["ok"]
+    assert recovered.value == "closed"
+
+
+def test_successes_on_any_worker_reset_shared_failures():
+    server = fakeredis.FakeServer()
+    workers = [
+        ReliabilityGuard(
+            redis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+            shared_state=True,
+            local_ttl=60,
+        )
+        for _ in range(2)
+    ]
+
+    async def failing():
+        raise RuntimeError("down")
+
+    async def ok():
+        return "ok"
+
+    async def fallback():
+        return "fallback"
+
+    async def scenario():
+        for worker in workers:
+            await worker.get_circuit_state("ai")
+        await asyncio.sleep(0.05)
+
+        # Failures on one worker, interleaved with successes on the other
+        for _ in range(3):
+            for _ in range(3):
+                await workers[1].execute_with_circuit_breaker(
+                    "ai", failing, fallback_func=fallback
+                )
+            await asyncio.sleep(0.05)
+            await workers[0].execute_with_circuit_breaker("ai", ok)
+            await asyncio.sleep(0.05)
+        failures = await workers[0].redis_client.get("circuit:ai:failures")
+        states = [worker.circuit_breakers["ai"].state for worker in workers]
+        for worker in workers:
+            await worker.close()
+        return failures, states
+
+    failures, states = run(scenario())
+
+    # Never 5 consecutive failures, so the circuit never opened
+    assert failures is None
+    assert [state.value for state in states] == ["closed", "closed"]
+
+
+def test_successful_calls_do_not_write_circuit_state():
+    client = CountingRedis(fakeredis.FakeAsyncRedis(decode_responses=True))
+    guard = ReliabilityGuard(redis_client=client, shared_state=True, local_ttl=60)
+
+    async def ok():
+        return "ok"
+
+    async def scenario():
+        for _ in range(50):
+            await guard.execute_with_circuit_breaker("ai", ok)
+        await guard.close()
+
+    run(scenario())
+
+    # One cache fill plus one throttled health snapshot for 50 calls
+    assert client.commands.count("set") == 1
+    assert not {"hset", "incrby", "publish", "del"} & set(client.commands)
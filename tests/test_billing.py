@@ -4,6 +4,7 @@ from fastapi.testclient import TestClient
 
 from app.main import app
 from app.services.billing_service import InMemoryStore, BillingService
+from app.services.entitlement_cache import EntitlementCache, entitlement_cache
 from app.models.billing import SubscriptionRecord
 
 
@@ -91,3 +92,88 @@ def test_local_billing_endpoints_use_debug_store():
         assert status_after.status_code == 200
         assert status_after.json()["status"] == "active"
         assert status_after.json()["plan"] == "growth"
+
+
+def test_entitlement_cache_serves_stale_and_refreshes_once():
+    cache = EntitlementCache(ttl=0.05, stale_ttl=60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return True
+
+    async def scenario():
+        # Concurrent misses share one load
+        first = await asyncio.gather(*(cache.is_entitled("s", loader) for _ in range(10)))
+        assert await cache.is_entitled("s", loader) is True
+        await asyncio.sleep(0.06)
+        # Expired but allowed: answered from cache while one refresh runs
+        stale = await asyncio.gather(*(cache.is_entitled("s", loader) for _ in range(10)))
+        await asyncio.sleep(0.03)
+        return first, stale
+
+    first, stale = run(scenario())
+    assert all(first) and all(stale)
+    assert len(loads) == 2
+
+
+def test_entitlement_cache_never_serves_stale_denials():
+    cache = EntitlementCache(ttl=0, stale_ttl=60)
+    results = iter([False, True])
+
+    async def loader():
+        return next(results)
+
+    async def scenario():
+        return [await cache.is_entitled("s", loader) for _ in range(2)]
+
+    assert run(scenario()) == [False, True]
+
+
+def test_entitlement_cache_discards_loads_raced_by_invalidation():
+    cache = EntitlementCache(ttl=60, stale_ttl=60)
+    state = {"active": True}
+
+    async def loader():
+        allowed = state["active"]
+        await asyncio.sleep(0.02)
+        return allowed
+
+    async def scenario():
+        pending = asyncio.ensure_future(cache.is_entitled("s", loader))
+        await asyncio.sleep(0.005)
+        # Cancelled while the first load is still reading the old state
+        state["active"] = False
+        cache.invalidate("s")
+        assert await cache.is_entitled("s", loader) is False
+        assert await pending is True
+        return await cache.is_entitled("s", loader)
+
+    assert run(scenario()) is False
+
+
+def test_billing_middleware_caches_entitlement_until_cancelled(client, mock_ai_service, tenant_headers_a, monkeypatch):
+    shop = tenant_headers_a["x-shopify-shop-domain"]
+    calls = []
+    original = BillingService.is_active_or_in_trial
+
+    async def counting(self):
+        calls.append(self.shop_domain)
+        return await original(self)
+
+    monkeypatch.setattr(BillingService, "is_active_or_in_trial", counting)
+    payload = {"prompt": "hello", "max_tokens": 5}
+
+    for _ in range(5):
+        assert client.post("/api/ai/infer", json=payload, headers=tenant_headers_a).status_code == 200
+    assert calls == [shop]
+
+    run(BillingService(shop, "", app.state.store).cancel_subscription())
+    app.state.store.subs[shop].trial_ends_at = None
+
+    res = client.post("/api/ai/infer", json=payload, headers=tenant_headers_a)
+    assert res.status_code == 402
+    assert res.headers["X-Request-ID"]
+    assert calls == [shop, shop]
+    assert entitlement_cache._entries[shop][0] is False
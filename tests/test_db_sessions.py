@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import app.db.models as models
+import app.db.session as db_session
+from app.db.models import Shop
+from app.db.session import LazySession
+
+
+@pytest.fixture
+def opened_sessions(monkeypatch):
+    opened = []
+    factory = db_session.SessionLocal
+
+    def counting_factory():
+        session = factory()
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(db_session, "SessionLocal", counting_factory)
+    return opened
+
+
+def test_requests_without_db_work_open_no_session(client, opened_sessions, tenant_headers_a):
+    assert client.get("/health").status_code == 200
+    # Billing runs on the in-memory store in tests
+    assert client.get("/api/billing/status", headers=tenant_headers_a).status_code == 200
+    assert opened_sessions == []
+
+
+def test_dependency_reuses_the_request_session(client, opened_sessions):
+    # The webhook looks the shop up through get_db; unknown shops 404
+    res = client.post(
+        "/api/billing/webhook",
+        json={"topic": "app/subscriptions/update"},
+        headers={"x-shopify-shop-domain": "nobody.myshopify.com", "authorization": "Bearer tok"},
+    )
+    assert res.status_code == 404
+    assert len(opened_sessions) == 1
+
+
+def test_lazy_session_is_a_noop_until_used(opened_sessions):
+    lazy = LazySession()
+    lazy.commit()
+    lazy.rollback()
+    lazy.close()
+    assert not lazy.started and opened_sessions == []
+
+    assert lazy.query(Shop).filter(Shop.domain == "nobody.myshopify.com").first() is None
+    assert lazy.started and len(opened_sessions) == 1
+    lazy.close()
+    assert not lazy.started
+
+
+def test_pool_reports_checkout_wait_and_timeouts(tmp_path, monkeypatch):
+    metrics = []
+    monkeypatch.setattr(models, "emit_metric", lambda name, payload: metrics.append(name))
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.05")
+    url = f"sqlite:///{tmp_path}/pool.db"
+    engine = create_engine(url, **models._engine_options(url))
+
+    held = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    held.close()
+    engine.dispose()
+
+    assert metrics.count("db_pool_checkout") == 2
+    assert metrics.count("db_pool_timeout") == 1
+
+
+def test_in_memory_sqlite_keeps_its_pool_uninstrumented(monkeypatch):
+    metrics = []
+    monkeypatch.setattr(models, "emit_metric", lambda name, payload: metrics.append(name))
+    engine = create_engine("sqlite://", **models._engine_options("sqlite://"))
+    models._instrument_pool(engine)
+
+    models.Base.metadata.create_all(bind=engine)
+    with engine.connect():
+        pass
+    engine.dispose()
+
+    assert "db_pool_checked_out" not in metrics
@@ -1,3 +1,5 @@
+import pytest
+
 from app.utils.logging import PIISafeFormatter
 
 
@@ -8,3 +10,52 @@ def test_logging_redacts_tokens():
     assert "abc123" not in redacted
     assert "xyz" not in redacted
     assert "***REDACTED***" in redacted
+
+
+# (message, expected) pairs; also checked against the secrets they contain
+REDACTION_CORPUS = [
+    ("Authorization: Bearer abc.def.ghi", "Authorization: ***REDACTED***"),
+    ("authorization: Basic dXNlcjpwYXNz", "Authorization: ***REDACTED***"),
+    ("sent bearer tok_123 upstream", "sent Bearer ***REDACTED*** upstream"),
+    ("X-API-Key: k-987 rejected", "X-API-Key: ***REDACTED*** rejected"),
+    ("api-key=zzz, retrying", "api_key: ***REDACTED***, retrying"),
+    ("APIKEY: 'q1w2'", "api_key: ***REDACTED***"),
+    ("password=hunter2 user=bob", "password: ***REDACTED*** user=bob"),
+    ('{"secret": "s3cr3t", "n": 1}', '{"secret: ***REDACTED***, "n": 1}'),
+    ("access-token: shpat_1 ok", "access_token: ***REDACTED*** ok"),
+    ("refresh_token=r1", "refresh_token: ***REDACTED***"),
+    ("contact jane.doe+x@example.co.uk", "contact j***@example.co.uk"),
+    ("owner bob@store.myshopify.com", "owner b***@sto**.myshopify.com"),
+    ("install for coolstore.myshopify.com", "install for coo******.myshopify.com"),
+    ("shop ab.myshopify.com", "shop a*.myshopify.com"),
+    ("my-shop.myshopify.com", "my-****.myshopify.com"),
+    ("card 4111 1111 1111 1111 charged", "card ****-****-****-**** charged"),
+    ("card 4111-1111-1111-1111", "card ****-****-****-****"),
+    ("ssn 123-45-6789", "ssn ***-**-6789"),
+    # Nothing to redact: must come back untouched
+    ("order 42 shipped in 3 days", "order 42 shipped in 3 days"),
+    ("Processing recommendations", "Processing recommendations"),
+    ("ratio=0.5 at 2024-01-01T00:00:00", "ratio=0.5 at 2024-01-01T00:00:00"),
+]
+
+SECRETS = [
+    "abc.def.ghi", "dXNlcjpwYXNz", "tok_123", "k-987", "zzz", "q1w2",
+    "hunter2", "s3cr3t", "shpat_1", "r1", "jane.doe", "coolstore", "4111",
+    "123-45",
+]
+
+
+@pytest.mark.parametrize("message,expected", REDACTION_CORPUS)
+def test_redaction_corpus(message, expected):
+    assert PIISafeFormatter.sanitize(message) == expected
+
+
+def test_no_secret_survives_combined_message():
+    redacted = PIISafeFormatter.sanitize(" ".join(m for m, _ in REDACTION_CORPUS))
+    for secret in SECRETS:
+        assert secret not in redacted
+
+
+def test_non_string_messages_are_sanitized():
+    assert PIISafeFormatter.sanitize({"token": "abc"}) == "{'token: ***REDACTED***"
+    assert PIISafeFormatter.sanitize(42) == "42"
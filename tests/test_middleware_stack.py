@@ -0,0 +1,86 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.tenant import ShopifyTenantMiddleware
+from app.middleware.context import RequestContextMiddleware, get_context
+from app.middleware.rate_limiter import RateLimitDecision, RateLimitMiddleware
+from app.middleware.timeout import TimeoutMiddleware
+
+HEADERS = {"x-shopify-shop-domain": "store-a.myshopify.com", "authorization": "Bearer token-a"}
+
+
+class StubLimiter:
+    def __init__(self, allowed=True):
+        self.allowed = allowed
+
+    async def acquire(self, shop_id, ip, category="public"):
+        if self.allowed:
+            return RateLimitDecision(True, 300, 299)
+        return RateLimitDecision(False, 300, 0, 12)
+
+
+def build_app(limiter=None, timeout=5.0, context=True):
+    app = FastAPI()
+
+    @app.get("/api/whoami")
+    def whoami(request: Request):
+        ctx = get_context(request.scope)
+        return {
+            "shop": request.state.tenant.shop_domain,
+            "same_context": ctx is not None and ctx.tenant is request.state.tenant,
+            "request_id": getattr(request.state, "request_id", None),
+        }
+
+    @app.get("/api/slow")
+    async def slow():
+        await asyncio.sleep(5)
+        return {}
+
+    app.add_middleware(TimeoutMiddleware, timeout=timeout)
+    app.add_middleware(RateLimitMiddleware, limiter=limiter or StubLimiter())
+    app.add_middleware(ShopifyTenantMiddleware)
+    if context:
+        app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+def test_stack_shares_context_and_sets_response_headers():
+    res = TestClient(build_app()).get("/api/whoami", headers=HEADERS)
+
+    assert res.status_code == 200
+    body = res.json()
+    assert body["shop"] == "store-a.myshopify.com"
+    assert body["same_context"] is True
+    assert res.headers["X-Request-ID"] == body["request_id"]
+    assert float(res.headers["X-Request-Latency-ms"]) >= 0
+    assert res.headers["X-RateLimit-Remaining"] == "299"
+
+
+def test_rejections_carry_a_single_request_id():
+    res = TestClient(build_app()).get("/api/whoami")
+
+    assert res.status_code == 401
+    assert res.headers.get_list("X-Request-ID") == [res.json()["request_id"]]
+
+
+def test_rate_limit_without_context_middleware():
+    client = TestClient(build_app(context=False))
+    assert client.get("/api/whoami", headers=HEADERS).headers["X-RateLimit-Limit"] == "300"
+
+    denied = TestClient(build_app(limiter=StubLimiter(allowed=False))).get("/api/whoami", headers=HEADERS)
+    assert denied.status_code == 429
+    assert denied.headers["Retry-After"] == "12"
+
+
+def test_timeout_returns_504_before_the_response_starts():
+    # Leave headroom for GC pauses: the follow-up request must beat it too
+    client = TestClient(build_app(timeout=0.5))
+
+    res = client.get("/api/slow", headers=HEADERS)
+
+    assert res.status_code == 504
+    assert res.json() == {"error": "request_timeout"}
+    # The next request on the same worker is unaffected
+    assert client.get("/api/whoami", headers=HEADERS).status_code == 200
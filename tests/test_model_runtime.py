@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.ai.pipelines import text_pipeline
+from app.ai.services.ai_service import AIService
+from app.ai.services.model_runtime import InferenceExecutor, InferenceQueueFull, ModelRuntime, model_runtime
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_cold_loads_share_one_load():
+    calls = []
+
+    def loader(name):
+        calls.append((name, threading.current_thread().name))
+        time.sleep(0.05)
+        if len(calls) == 1:
+            raise RuntimeError("download failed")
+        return object()
+
+    runtime = ModelRuntime(InferenceExecutor(max_workers=2))
+
+    async def scenario():
+        failed = await asyncio.gather(*(runtime.get("m", loader) for _ in range(5)), return_exceptions=True)
+        loaded = await asyncio.gather(*(runtime.get("m", loader) for _ in range(5)))
+        return failed, loaded
+
+    failed, loaded = run(scenario())
+    runtime.executor.shutdown()
+
+    # The failed load is shared, then retried once rather than cached
+    assert all(isinstance(exc, RuntimeError) for exc in failed)
+    assert len(calls) == 2
+    assert all(model is loaded[0] for model in loaded)
+    assert runtime.loaded("m")
+    # Loads run on the inference threads, not the event loop
+    assert all(thread.startswith("ai-inference") for _, thread in calls)
+
+
+def test_executor_rejects_past_max_pending():
+    executor = InferenceExecutor(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        jobs = [asyncio.ensure_future(executor.run(release.wait, 1)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(InferenceQueueFull):
+            await executor.run(lambda: None)
+        release.set()
+        await asyncio.gather(*jobs)
+        # Finished jobs give their slots back
+        return await executor.run(lambda: "ok")
+
+    assert run(scenario()) == "ok"
+    executor.shutdown()
+
+
+def test_abandoned_queued_jobs_are_dropped():
+    executor = InferenceExecutor(max_workers=1, max_pending=4)
+    ran = []
+
+    async def scenario():
+        busy = asyncio.ensure_future(executor.run(time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run(ran.append, "late"), timeout=0.01)
+        await busy
+        await asyncio.sleep(0.05)
+
+    run(scenario())
+    executor.shutdown()
+
+    assert ran == []
+    assert executor._slots.acquire(blocking=False)
+
+
+def test_warm_up_loads_once_and_full_queue_sheds_requests(monkeypatch):
+    loads = []
+
+    class FakePipeline:
+        def __call__(self, inputs, max_length=None, batch_size=None):
+            return [{"generated_text": f"{inputs}!"}]
+
+    def loader(name):
+        loads.append(name)
+        return FakePipeline()
+
+    monkeypatch.setattr(text_pipeline, "_load_text_pipeline", loader)
+    busy = InferenceExecutor(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        warmed = await AIService(model_name="warm-fake", max_batch_size=1).warm_up()
+        # The executor's only slot is taken, so the request is shed
+        blocker = asyncio.ensure_future(busy.run(release.wait, 1))
+        await asyncio.sleep(0.01)
+        shed = await AIService(model_name="warm-fake", max_batch_size=1, executor=busy).infer("hi")
+        release.set()
+        await blocker
+        return warmed, shed
+
+    try:
+        warmed, shed = run(scenario())
+    finally:
+        model_runtime.evict("warm-fake")
+        busy.shutdown()
+
+    assert warmed is True
+    assert loads == ["warm-fake"]
+    assert shed["text"] == "[busy]"
@@ -52,7 +52,7 @@ def test_callback_uses_cookie_state_fallback_when_redis_is_unavailable(client, m
             self.shop_domain = shop_domain
             self.access_token = access_token
 
-        def request(self, method, path, json=None, params=None, timeout=None, idempotency_key=None):
+        async def request(self, method, path, json=None, params=None, timeout=None, idempotency_key=None):
             class FakeResponse:
                 status_code = 201
                 ok = True
@@ -79,7 +79,7 @@ def test_callback_uses_cookie_state_fallback_when_redis_is_unavailable(client, m
 
         return FakeTokenResponse()
 
-    monkeypatch.setattr("app.api.oauth.ShopifyClient", FakeShopifyClient)
+    monkeypatch.setattr("app.api.oauth.AsyncShopifyClient", FakeShopifyClient)
     monkeypatch.setattr("requests.post", fake_requests_post)
 
     params = {
@@ -22,7 +22,7 @@ def test_oauth_callback_registers_all_required_compliance_webhooks(client, monke
             self.shop_domain = shop_domain
             self.access_token = access_token
 
-        def request(self, method, path, json=None, params=None, timeout=None, idempotency_key=None):
+        async def request(self, method, path, json=None, params=None, timeout=None, idempotency_key=None):
             registrations.append({"method": method, "path": path, "json": json})
 
             class FakeResponse:
@@ -51,7 +51,7 @@ def test_oauth_callback_registers_all_required_compliance_webhooks(client, monke
 
         return FakeTokenResponse()
 
-    monkeypatch.setattr("app.api.oauth.ShopifyClient", FakeShopifyClient)
+    monkeypatch.setattr("app.api.oauth.AsyncShopifyClient", FakeShopifyClient)
     monkeypatch.setattr("requests.post", fake_requests_post)
 
     params = {
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("lupa")  # fakeredis needs it to run Lua scripts
+import fakeredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.middleware.rate_limiter import RateLimitConfig, RateLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_limiter(**config_kwargs):
+    config = RateLimitConfig(redis_url="redis://unused", **config_kwargs)
+    config.AI_HEAVY_RPM = 5
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return RateLimiter(config, redis_client=client)
+
+
+async def take(limiter, count, shop_id="shop-1", category="ai_heavy"):
+    return [await limiter.acquire(shop_id, "1.2.3.4", category) for _ in range(count)]
+
+
+def test_limit_enforced_per_shop_and_category():
+    limiter = make_limiter()
+
+    async def scenario():
+        decisions = await take(limiter, 6)
+        other_category = await limiter.acquire("shop-1", "1.2.3.4", "public")
+        other_shop = await limiter.acquire("shop-2", "1.2.3.4", "ai_heavy")
+        return decisions, other_category, other_shop
+
+    decisions, other_category, other_shop = run(scenario())
+
+    assert [d.allowed for d in decisions] == [True] * 5 + [False]
+    assert [d.remaining for d in decisions[:5]] == [4, 3, 2, 1, 0]
+    # One token frees up every 60s / 5 = 12s
+    assert decisions[-1].retry_after == 12
+    assert other_category.allowed and other_category.remaining == 299
+    assert other_shop.allowed
+    assert limiter.get_stats()["redis_calls"] == 8
+
+
+def test_local_leases_never_over_admit():
+    limiter = make_limiter(local_lease_size=10)
+
+    decisions = run(take(limiter, 310, category="public"))
+    stats = limiter.get_stats()
+
+    assert sum(d.allowed for d in decisions) == 300
+    assert [d.remaining for d in decisions[:3]] == [299, 298, 297]
+    assert stats["local_hits"] > stats["redis_calls"]
+    # Denials are cached locally until the retry time
+    assert stats["redis_calls"] < 50
+
+
+def test_local_state_is_bounded_for_spoofed_ips():
+    limiter = make_limiter(local_lease_size=10)
+    limiter.config.local_max_keys = 50
+
+    async def scenario():
+        for i in range(500):
+            await limiter.acquire(None, f"10.0.{i // 256}.{i % 256}", "public")
+        # A denied bucket is cached alongside the leases, also bounded
+        await take(limiter, 6, shop_id="shop-1")
+
+    run(scenario())
+
+    assert len(limiter._leases) == 50
+    assert len(limiter._denied_until) == 1
+    assert "ratelimit:public:ip:10.0.1.243" in limiter._leases
+
+
+def test_check_limit_and_remaining():
+    limiter = make_limiter()
+
+    async def scenario():
+        await take(limiter, 2)
+        remaining = await limiter.get_remaining("shop-1", "1.2.3.4", "ai_heavy")
+        await take(limiter, 3)
+        return remaining, await limiter.check_limit("shop-1", "1.2.3.4", "ai_heavy")
+
+    remaining, result = run(scenario())
+
+    assert remaining == 3
+    assert result == (False, 12)
+
+
+class BrokenRedis:
+    def register_script(self, script):
+        async def call(keys, args, client=None):
+            raise RedisConnectionError("connection refused")
+        return call
+
+
+def test_fails_open_and_backs_off_when_redis_unavailable():
+    config = RateLimitConfig(redis_url="redis://unused")
+    limiter = RateLimiter(config, redis_client=BrokenRedis())
+
+    decisions = run(take(limiter, 3))
+
+    assert all(d.allowed for d in decisions)
+    assert limiter.get_stats()["errors"] == 1
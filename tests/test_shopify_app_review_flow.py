@@ -146,7 +146,7 @@ def test_oauth_flow_rejection_and_replay(client: TestClient, monkeypatch):
             self.shop_domain = shop_domain
             self.access_token = access_token
 
-        def request(self, method, path, json=None, params=None, timeout=None, idempotency_key=None):
+        async def request(self, method, path, json=None, params=None, timeout=None, idempotency_key=None):
             class FakeResp:
                 status_code = 201
                 ok = True
@@ -158,7 +158,7 @@ def test_oauth_flow_rejection_and_replay(client: TestClient, monkeypatch):
 
             return FakeResp()
 
-    monkeypatch.setattr("app.api.oauth.ShopifyClient", FakeShopifyClient)
+    monkeypatch.setattr("app.api.oauth.AsyncShopifyClient", FakeShopifyClient)
 
     def fake_requests_post(url, json, timeout):
         class FakeResp:
@@ -0,0 +1,171 @@
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from fastapi.testclient import TestClient
+
+from app.db.models import SessionLocal, Shop
+from app.optimizations.api import app as optimizations_app
+from app.services.shopify_client import (
+    ShopifyBulkOperationError,
+    ShopifyClient,
+    _assemble_bulk_objects,
+)
+
+SHOP = "fake-shop.myshopify.com"
+
+
+def product_lines(count):
+    for i in range(1, count + 1):
+        product_id = f"gid://shopify/Product/{i}"
+        yield {"id": product_id, "title": f"Product {i}", "tags": ["summer"]}
+        for v in range(2):
+            yield {"id": f"gid://shopify/ProductVariant/{i}{v}", "sku": f"SKU-{i}-{v}", "__parentId": product_id}
+        yield {"id": f"gid://shopify/ProductImage/{i}", "url": f"https://cdn/{i}.jpg", "__parentId": product_id}
+
+
+class FakeShopify:
+    """Local stand-in for the Admin GraphQL API and the bulk result storage."""
+
+    def __init__(self, products=3, polls_before_done=2, final_status="COMPLETED"):
+        self.products = products
+        self.polls_left = polls_before_done
+        self.final_status = final_status
+        self.queries = []
+        self.result_headers = None
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                assert self.headers["X-Shopify-Access-Token"] == "token"
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                self._json(fake.graphql(payload))
+
+            def do_GET(self):
+                fake.result_headers = dict(self.headers)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/jsonl")
+                self.end_headers()
+                for line in product_lines(fake.products):
+                    self.wfile.write(json.dumps(line).encode() + b"\n")
+
+            def _json(self, body):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def graphql(self, payload):
+        query = payload["query"]
+        self.queries.append(payload)
+        op = {"id": "gid://shopify/BulkOperation/1"}
+        if "bulkOperationRunQuery" in query:
+            return {"data": {"bulkOperationRunQuery": {
+                "bulkOperation": dict(op, status="CREATED"), "userErrors": [],
+            }}}
+        if self.polls_left > 0:
+            self.polls_left -= 1
+            return {"data": {"node": dict(op, status="RUNNING", objectCount="0", url=None)}}
+        return {"data": {"node": dict(
+            op,
+            status=self.final_status,
+            errorCode=None if self.final_status == "COMPLETED" else "INTERNAL_SERVER_ERROR",
+            objectCount=str(self.products * 4),
+            url=f"{self.base_url}/results.jsonl" if self.products else None,
+        )}}
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class LocalShopSession(requests.Session):
+    """Routes https://<shop> to the fake server."""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+
+    def request(self, method, url, *args, **kwargs):
+        return super().request(method, url.replace(f"https://{SHOP}", self.base_url), *args, **kwargs)
+
+
+def make_client(fake):
+    return ShopifyClient(SHOP, "token", session=LocalShopSession(fake.base_url))
+
+
+def test_bulk_products_are_streamed_and_nested():
+    with FakeShopify(products=25) as fake:
+        products = list(make_client(fake).iter_bulk_products(poll_interval=0.01))
+
+    assert len(products) == 25
+    assert products[0]["title"] == "Product 1"
+    assert [v["sku"] for v in products[0]["variants"]] == ["SKU-1-0", "SKU-1-1"]
+    assert products[-1]["images"] == [{"id": "gid://shopify/ProductImage/25", "url": "https://cdn/25.jpg"}]
+    # The submitted query is the bulk mutation wrapping the products query
+    assert "products" in fake.queries[0]["variables"]["query"]
+    # Two RUNNING polls, then COMPLETED
+    assert len(fake.queries) == 4
+    # The signed result URL never sees the shop's access token
+    assert "X-Shopify-Access-Token" not in fake.result_headers
+
+
+def test_empty_bulk_result_yields_nothing():
+    with FakeShopify(products=0, polls_before_done=0) as fake:
+        assert list(make_client(fake).iter_bulk_products(poll_interval=0.01)) == []
+
+
+def test_failed_bulk_operation_raises():
+    with FakeShopify(final_status="FAILED", polls_before_done=0) as fake:
+        with pytest.raises(ShopifyBulkOperationError, match="failed"):
+            list(make_client(fake).iter_bulk_products(poll_interval=0.01))
+
+
+def test_assembly_is_lazy():
+    # An endless result stream: products must come out one at a time
+    lines = (json.dumps(line).encode() for line in product_lines(10 ** 9))
+
+    first = list(itertools.islice(_assemble_bulk_objects(lines), 3))
+
+    assert [p["id"] for p in first] == [f"gid://shopify/Product/{i}" for i in (1, 2, 3)]
+    assert "__parentId" not in first[0]["variants"][0]
+
+
+def test_catalog_optimize_streams_installed_shops(monkeypatch):
+    db = SessionLocal()
+    db.query(Shop).filter(Shop.domain == SHOP).delete()
+    db.add(Shop(domain=SHOP, access_token="tok-bulk"))
+    db.commit()
+    db.close()
+    tokens = []
+
+    def fake_iter_bulk_products(client):
+        tokens.append(client.access_token)
+        return iter([{"id": f"gid://shopify/Product/{i}"} for i in range(1, 8)])
+
+    monkeypatch.setattr(ShopifyClient, "iter_bulk_products", fake_iter_bulk_products)
+    client = TestClient(optimizations_app)
+
+    installed = client.post("/api/optimize/catalog", json={"store_id": SHOP})
+    unknown = client.post("/api/optimize/catalog", json={"store_id": "other-shop.myshopify.com"})
+
+    assert installed.json()["processed"] == 7
+    assert tokens == ["tok-bulk"]
+    # Shops without a stored token fall back to the prototype catalog
+    assert unknown.json()["processed"] == 5
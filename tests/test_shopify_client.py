@@ -54,3 +54,134 @@ def test_no_retry_post_without_idempotency(monkeypatch):
     except requests.HTTPError:
         # expected: raise because POST without idempotency should not retry indefinitely
         pass
+
+
+def make_async_client(handler, max_concurrency=4, **kwargs):
+    import httpx
+
+    from app.services.shopify_client import AsyncShopifyClient, ShopifyConnectionPool
+
+    pool = ShopifyConnectionPool(max_concurrency=max_concurrency, transport=httpx.MockTransport(handler))
+    return AsyncShopifyClient("example.myshopify.com", "token", pool=pool, backoff_base=0.01, **kwargs)
+
+
+def no_blocking_sleep(monkeypatch):
+    def fail(seconds):
+        raise AssertionError("time.sleep blocks the event loop")
+
+    monkeypatch.setattr("time.sleep", fail)
+
+
+def test_leaky_bucket_queues_callers_until_capacity_leaks():
+    import asyncio
+
+    from app.services.shopify_client import LeakyBucket
+
+    async def scenario():
+        bucket = LeakyBucket(capacity=2, leak_rate=20)
+        return [await bucket.acquire() for _ in range(3)]
+
+    waits = asyncio.run(scenario())
+
+    assert max(waits[:2]) < 0.01
+    # The third call waits for one unit to leak: 1 / 20 per second
+    assert 0.03 <= waits[2] < 0.2
+
+
+def test_async_retry_after_pauses_queue_without_blocking(monkeypatch):
+    import asyncio
+
+    import httpx
+
+    no_blocking_sleep(monkeypatch)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.05", "X-Shopify-Shop-Api-Call-Limit": "40/40"})
+        return httpx.Response(200, headers={"X-Shopify-Shop-Api-Call-Limit": "11/40"}, json={"ok": True})
+
+    client = make_async_client(handler)
+
+    async def scenario():
+        start = time.monotonic()
+        resp = await client.request("GET", "/admin/api/2023-10/products.json")
+        return resp, time.monotonic() - start
+
+    resp, elapsed = asyncio.run(scenario())
+
+    assert resp.json() == {"ok": True}
+    assert elapsed >= 0.05
+    assert calls[0].headers["X-Shopify-Access-Token"] == "token"
+    assert str(calls[0].url) == "https://example.myshopify.com/admin/api/2023-10/products.json"
+
+
+def test_async_concurrency_is_bounded_per_shop():
+    import asyncio
+
+    import httpx
+
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(request):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        return httpx.Response(200, json={})
+
+    client = make_async_client(handler, max_concurrency=3)
+
+    async def scenario():
+        await asyncio.gather(*(client.request("GET", "/admin/api/2023-10/shop.json") for _ in range(12)))
+
+    asyncio.run(scenario())
+
+    assert in_flight["max"] == 3
+
+
+def test_async_graphql_requeues_throttled_queries(monkeypatch):
+    import asyncio
+
+    import httpx
+
+    no_blocking_sleep(monkeypatch)
+    responses = [
+        {
+            "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+            "extensions": {"cost": {
+                "requestedQueryCost": 100,
+                "actualQueryCost": None,
+                "throttleStatus": {"maximumAvailable": 1000.0, "currentlyAvailable": 50, "restoreRate": 1000.0},
+            }},
+        },
+        {
+            "data": {"shop": {"name": "Example"}},
+            "extensions": {"cost": {
+                "requestedQueryCost": 100,
+                "actualQueryCost": 12,
+                "throttleStatus": {"maximumAvailable": 1000.0, "currentlyAvailable": 988, "restoreRate": 1000.0},
+            }},
+        },
+    ]
+
+    def handler(request):
+        return httpx.Response(200, json=responses.pop(0))
+
+    metrics = []
+    client = make_async_client(handler, metrics_hook=lambda name, payload: metrics.append(name))
+
+    async def scenario():
+        body = await client.graphql_request("{ shop { name } }", estimated_cost=100)
+        bucket = client.pool.get(client.shop_domain).graphql_bucket
+        return body, bucket.level
+
+    body, level = asyncio.run(scenario())
+
+    assert body["data"]["shop"]["name"] == "Example"
+    assert "shopify_graphql_throttled" in metrics
+    # The second attempt had to wait for 50 points to be restored
+    assert "shopify_throttle_wait" in metrics
+    # Only the actual cost is left in the bucket
+    assert level <= 12